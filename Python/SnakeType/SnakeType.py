@@ -1,15 +1,50 @@
 import random 
 import time
-import threading
 import sys
 import os
 import json
 import sqlite3
 import math
 import shutil
+import bisect
+import zlib
+import unicodedata
+import codecs
+import selectors
+import threading
+import queue
+import atexit
+from array import array
 from collections import deque, defaultdict
 from datetime import datetime, timedelta
 from pathlib import Path
+from functools import lru_cache
+from itertools import accumulate, chain
+from contextlib import contextmanager
+
+try:
+    from .corpus import WordCorpus, compile_corpus, iter_text_words
+    from .achievements import AchievementEngine
+    from .layouts import LAYOUTS, get_layout
+    from . import schema, transfer
+except ImportError:  # Run as a script from inside the package directory
+    from corpus import WordCorpus, compile_corpus, iter_text_words
+    from achievements import AchievementEngine
+    from layouts import LAYOUTS, get_layout
+    import schema
+    import transfer
+
+try:
+    import termios
+    import tty
+except ImportError:  # Windows
+    termios = None
+    tty = None
+
+try:
+    import msvcrt
+except ImportError:  # Unix/Linux/macOS
+    msvcrt = None
 
 try:
     import statistics
@@ -60,6 +95,8 @@ HARD_WORDS = ["programming", "development", "architecture", "implementation", "o
 
 COMMON_WORDS = ["the", "of", "and", "to", "a", "in", "is", "it", "you", "that", "he", "was", "for", "on", "are", "as", "with", "his", "they", "i", "at", "be", "this", "have", "from", "or", "one", "had", "by", "word", "but", "not", "what", "all", "were", "we", "when", "your", "can", "said", "there", "each", "which", "she", "do", "how", "their", "if", "will", "up", "other", "about", "out", "many", "then", "them", "these", "so", "some", "her", "would", "make", "like", "into", "him", "has", "two", "more", "very", "after", "words", "first", "where", "been", "who", "its", "now", "find", "long", "down", "way", "may", "come", "could", "people", "my", "than", "water", "part", "time", "work", "right", "new", "take", "get", "place", "made", "live", "where", "after", "back", "little", "only", "round", "man", "year", "came", "show", "every", "good", "me", "give", "our", "under", "name", "very", "through", "just", "form", "sentence", "great", "think", "say", "help", "low", "line", "differ", "turn", "cause", "much", "mean", "before", "move", "right", "boy", "old", "too", "same", "tell", "does", "set", "three", "want", "air", "well", "also", "play", "small", "end", "put", "home", "read", "hand", "port", "large", "spell", "add", "even", "land", "here", "must", "big", "high", "such", "follow", "act", "why", "ask", "men", "change", "went", "light", "kind", "off", "need", "house", "picture", "try", "us", "again", "animal", "point", "mother", "world", "near", "build", "self", "earth", "father", "head", "stand", "own", "page", "should", "country", "found", "answer", "school", "grow", "study", "still", "learn", "plant", "cover", "food", "sun", "four", "between", "state", "keep", "eye", "never", "last", "let", "thought", "city", "tree", "cross", "farm", "hard", "start", "might", "story", "saw", "far", "sea", "draw", "left", "late", "run", "don't", "while", "press", "close", "night", "real", "life", "few", "north", "open", "seem", "together", "next", "white", "children", "begin", "got", "walk", "example", "ease", "paper", "group", "always", "music", "those", "both", "mark", "often", "letter", "until", "mile", "river", "car", "feet", "care", "second", "book", "carry", "took", "science", "eat", "room", "friend", "began", "idea", "fish", "mountain", "stop", "once", "base", "hear", "horse", "cut", "sure", "watch", "color", "face", "wood", "main", "enough", "plain", "girl", "usual", "young", "ready", "above", "ever", "red", "list", "though", "feel", "talk", "bird", "soon", "body", "dog", "family", "direct", "pose", "leave", "song", "measure", "door", "product", "black", "short", "numeral", "class", "wind", "question", "happen", "complete", "ship", "area", "half", "rock", "order", "fire", "south", "problem", "piece", "told", "knew", "pass", "since", "top", "whole", "king", "space", "heard", "best", "hour", "better", "during", "hundred", "five", "remember", "step", "early", "hold", "west", "ground", "interest", "reach", "fast", "verb", "sing", "listen", "six", "table", "travel", "less", "morning", "ten", "simple", "several", "vowel", "toward", "war", "lay", "against", "pattern", "slow", "center", "love", "person", "money", "serve", "appear", "road", "map", "rain", "rule", "govern", "pull", "cold", "notice", "voice", "unit", "power", "town", "fine", "certain", "fly", "fall", "lead", "cry", "dark", "machine", "note", "wait", "plan", "figure", "star", "box", "noun", "field", "rest", "correct", "able", "pound", "done", "beauty", "drive", "stood", "contain", "front", "teach", "week", "final", "gave", "green", "oh", "quick", "develop", "ocean", "warm", "free", "minute", "strong", "special", "mind", "behind", "clear", "tail", "produce", "fact", "street", "inch", "multiply", "nothing", "course", "stay", "wheel", "full", "force", "blue", "object", "decide", "surface", "deep", "moon", "island", "foot", "system", "busy", "test", "record", "boat", "common", "gold", "possible", "plane", "stead", "dry", "wonder", "laugh", "thousands", "ago", "ran", "check", "game", "shape", "equate", "hot", "miss", "brought", "heat", "snow", "tire", "bring", "yes", "distant", "fill", "east", "paint", "language", "among"]
 
+WORD_POOLS = {"easy": EASY_WORDS, "medium": MEDIUM_WORDS, "hard": HARD_WORDS, "common": COMMON_WORDS}
+
 ACHIEVEMENTS = {
     "speed_demon": {"name": "Speed Demon", "desc": "Reach 80+ WPM", "icon": "🚀"},
     "accuracy_master": {"name": "Accuracy Master", "desc": "Maintain 98%+ accuracy", "icon": "🎯"},
@@ -75,76 +112,202 @@ ACHIEVEMENTS = {
     "weekend_warrior": {"name": "Weekend Warrior", "desc": "Practice on weekends", "icon": "🎮"}
 }
 
+def _encode_varints(values, out):
+    """Append unsigned LEB128 varints for values to a bytearray"""
+    for value in values:
+        while value >= 0x80:
+            out.append((value & 0x7f) | 0x80)
+            value >>= 7
+        out.append(value)
+    return out
+
+def _decode_varints(data, offset, count):
+    """Decode count unsigned LEB128 varints starting at offset; returns (values, new_offset)"""
+    values = []
+    for _ in range(count):
+        value = 0
+        shift = 0
+        while True:
+            byte = data[offset]
+            offset += 1
+            value |= (byte & 0x7f) << shift
+            if byte < 0x80:
+                break
+            shift += 7
+        values.append(value)
+    return values, offset
+
+def scripted_keystream(typed, interval_ms=100, start_ns=None):
+    """Yield evenly spaced (perf_counter_ns, key) pairs for a scripted string of keys"""
+    timestamp_ns = time.perf_counter_ns() if start_ns is None else start_ns
+    for char in typed:
+        timestamp_ns += int(interval_ms * 1_000_000)
+        yield timestamp_ns, char
+
+class KeystrokeLog:
+    """Per-keystroke (ns delta, codepoint, action) events held in compact parallel arrays"""
+    ACTION_TYPE = 0
+    ACTION_BACKSPACE = 1
+    ACTION_PAUSE = 2
+    
+    def __init__(self):
+        self.deltas = array('Q')
+        self.codepoints = array('I')
+        self.actions = array('B')
+        self.last_ns = None
+    
+    def __len__(self):
+        return len(self.actions)
+    
+    def __iter__(self):
+        return zip(self.deltas, map(chr, self.codepoints), self.actions)
+    
+    def record(self, timestamp_ns, char, action):
+        """Record a key by its delta from the previous key's monotonic timestamp"""
+        delta = 0 if self.last_ns is None else max(0, timestamp_ns - self.last_ns)
+        self.last_ns = timestamp_ns
+        self.deltas.append(delta)
+        self.codepoints.append(ord(char) if char else 0)
+        self.actions.append(action)
+    
+    def to_blob(self):
+        """Columnar varint encoding (deltas, codepoints, actions) compressed with zlib"""
+        data = _encode_varints([len(self.actions)], bytearray())
+        _encode_varints(self.deltas, data)
+        _encode_varints(self.codepoints, data)
+        data.extend(self.actions.tobytes())
+        return zlib.compress(bytes(data), 9)
+    
+    def replay(self, start_ns=None):
+        """Yield (perf_counter_ns, key) pairs that reproduce the recorded keystream"""
+        keys = {self.ACTION_BACKSPACE: '\x7f', self.ACTION_PAUSE: '\x1b'}
+        timestamp_ns = time.perf_counter_ns() if start_ns is None else start_ns
+        for delta, char, action in self:
+            timestamp_ns += delta
+            yield timestamp_ns, keys.get(action, char)
+    
+    @classmethod
+    def from_blob(cls, blob):
+        data = zlib.decompress(blob)
+        (count,), offset = _decode_varints(data, 0, 1)
+        deltas, offset = _decode_varints(data, offset, count)
+        codepoints, offset = _decode_varints(data, offset, count)
+        log = cls()
+        log.deltas.extend(deltas)
+        log.codepoints.extend(codepoints)
+        log.actions.frombytes(data[offset:offset + count])
+        return log
+
+class TextSegmentReader:
+    """Serves a text file of any size as consecutive word segments addressed by byte offset"""
+    def __init__(self, file_path):
+        self.file_path = file_path
+        stat = os.stat(file_path)
+        self.size = stat.st_size
+        self.mtime = stat.st_mtime
+    
+    def read_segment(self, start_offset=0, word_count=100):
+        """Next word_count words after start_offset, with the offset the following segment resumes from"""
+        words = []
+        end_offset = start_offset
+        eof = True
+        with open(self.file_path, 'rb') as file:
+            for word, offset in iter_text_words(file, start_offset):
+                if len(words) >= word_count:
+                    eof = False  # Peeked one word past the segment
+                    break
+                words.append(word)
+                end_offset = offset
+        
+        return {
+            'words': words,
+            'start_offset': start_offset,
+            'end_offset': end_offset,
+            'eof': eof,
+            'progress': end_offset / self.size * 100 if self.size else 100.0
+        }
+
+class NgramIndex:
+    """Inverted index from each bigram and trigram to the ids of the words that contain it"""
+    def __init__(self, words, sizes=(2, 3)):
+        self.words = list(dict.fromkeys(words))
+        index = defaultdict(list)
+        for word_id, word in enumerate(self.words):
+            grams = {word[i:i + n] for n in sizes for i in range(len(word) - n + 1)}
+            for gram in grams:
+                index[gram].append(word_id)
+        self.index = dict(index)
+    
+    def sample(self, weak_ngrams, k, rng=random):
+        """k words drawn in proportion to the weight of the (ngram, weight) pair they contain; [] if none match"""
+        grams = [(gram, weight) for gram, weight in weak_ngrams if weight > 0 and gram in self.index]
+        if not grams or k <= 0:
+            return []
+        
+        picks = rng.choices([gram for gram, _ in grams], cum_weights=list(accumulate(w for _, w in grams)), k=k)
+        return [self.words[rng.choice(self.index[gram])] for gram in picks]
+
+@lru_cache(maxsize=None)
+def get_ngram_index(pool_name):
+    """Shared NgramIndex for one of the WORD_POOLS, built on first use"""
+    return NgramIndex(WORD_POOLS[pool_name])
+
+def load_analytics():
+    """The analytics module, imported on first use so NumPy never slows down startup"""
+    try:
+        from . import analytics
+    except ImportError:  # Run as a script from inside the package directory
+        import analytics
+    return analytics
+
 class DatabaseManager:
     def __init__(self, db_path="typing_stats.db"):
         self.db_path = db_path
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections = set()
+        self._generation = 0
         self.init_database()
     
     def get_connection(self):
-        """Get database connection with timeout and safety checks"""
+        """Get this thread's persistent connection, opening it (and applying pragmas) on first use"""
+        local = self._local
+        conn = getattr(local, 'conn', None)
+        if conn is not None and local.generation == self._generation:
+            return conn
+        
         try:
-            conn = sqlite3.connect(self.db_path, timeout=30.0)
+            # Each thread only ever uses its own connection; close() may run on any thread
+            conn = sqlite3.connect(self.db_path, timeout=30.0, check_same_thread=False, cached_statements=256)
             conn.execute("PRAGMA foreign_keys = ON")  # Enable foreign key constraints
             conn.execute("PRAGMA journal_mode = WAL")  # Better concurrency
-            return conn
+            conn.execute("PRAGMA synchronous = NORMAL")  # Safe with WAL, avoids an fsync per commit
         except sqlite3.Error as e:
             print(f"Database connection error: {e}")
             raise
+        
+        with self._lock:
+            self._connections.add(conn)
+            local.conn = conn
+            local.generation = self._generation
+        return conn
+    
+    def close(self):
+        """Close every thread's connection; the next call on any thread reconnects"""
+        with self._lock:
+            connections = list(self._connections)
+            self._connections.clear()
+            self._generation += 1
+        for conn in connections:
+            try:
+                conn.close()
+            except sqlite3.Error as e:
+                print(f"Error closing database connection: {e}")
     
     def init_database(self):
-        """Initialize database with improved error handling"""
+        """Bring the database up to the shared schema version; a no-op apart from one PRAGMA when current"""
         try:
-            with self.get_connection() as conn:
-                cursor = conn.cursor()
-                
-                cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS test_results (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        wpm REAL NOT NULL CHECK(wpm >= 0),
-                        accuracy REAL NOT NULL CHECK(accuracy >= 0 AND accuracy <= 100),
-                        mistakes INTEGER NOT NULL CHECK(mistakes >= 0),
-                        test_duration REAL NOT NULL CHECK(test_duration > 0),
-                        difficulty TEXT NOT NULL,
-                        word_count INTEGER NOT NULL CHECK(word_count > 0),
-                        characters_typed INTEGER NOT NULL CHECK(characters_typed >= 0),
-                        correct_characters INTEGER NOT NULL CHECK(correct_characters >= 0)
-                    )
-                ''')
-                
-                cursor.execute('CREATE INDEX IF NOT EXISTS idx_test_results_date ON test_results(date)')
-                
-                cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS achievements (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        achievement_id TEXT NOT NULL,
-                        date_earned TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        UNIQUE(achievement_id)
-                    )
-                ''')
-                
-                cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS error_patterns (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        test_id INTEGER NOT NULL,
-                        character_intended TEXT NOT NULL,
-                        character_typed TEXT NOT NULL,
-                        position INTEGER NOT NULL CHECK(position >= 0),
-                        word_context TEXT,
-                        FOREIGN KEY (test_id) REFERENCES test_results (id) ON DELETE CASCADE
-                    )
-                ''')
-                
-                cursor.execute('CREATE INDEX IF NOT EXISTS idx_error_patterns_chars ON error_patterns(character_intended, character_typed)')
-                
-                cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS daily_streaks (
-                        date DATE PRIMARY KEY,
-                        tests_completed INTEGER DEFAULT 0 CHECK(tests_completed >= 0)
-                    )
-                ''')
-                
-                conn.commit()
+            schema.migrate(self.get_connection())
         except sqlite3.Error as e:
             print(f"Database initialization error: {e}")
             try:
@@ -155,65 +318,107 @@ class DatabaseManager:
                 pass
             raise
     
-    def save_test_result(self, result_data):
-        """Save test result with improved error handling and validation"""
+    def rebuild_confusion_matrix(self):
+        """Recompute confusion_matrix from every stored error row; returns the number of cells"""
         try:
-            wpm, accuracy, mistakes, duration, difficulty, word_count, chars_typed, correct_chars = result_data
-            
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('DELETE FROM confusion_matrix')
+                schema.fill_confusion_matrix(cursor)
+                cursor.execute('SELECT COUNT(*) FROM confusion_matrix')
+                return cursor.fetchone()[0]
+        except sqlite3.Error as e:
+            print(f"Error rebuilding confusion matrix: {e}")
+            return 0
+    
+    def save_completed_test(self, record):
+        """Write a finished test's result, errors, keystroke log, streak and achievements in one transaction"""
+        try:
+            wpm, accuracy, mistakes, duration = record['result'][:4]
             if wpm < 0 or accuracy < 0 or accuracy > 100 or mistakes < 0 or duration <= 0:
                 raise ValueError("Invalid test result data")
             
-            with self.get_connection() as conn:
+            keystroke_log = record.get('keystroke_log')
+            conn = self.get_connection()
+            with conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     INSERT INTO test_results 
-                    (wpm, accuracy, mistakes, test_duration, difficulty, word_count, characters_typed, correct_characters)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                ''', result_data)
+                    (wpm, accuracy, mistakes, test_duration, difficulty, word_count, characters_typed, correct_characters, epoch)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, CAST(strftime('%s', 'now') AS INTEGER))
+                ''', record['result'])
                 test_id = cursor.lastrowid
                 
-                today = datetime.now().date()
+                cursor.executemany('''
+                    INSERT INTO error_patterns 
+                    (test_id, character_intended, character_typed, position, word_context)
+                    VALUES (?, ?, ?, ?, ?)
+                ''', [(test_id,) + error for error in record.get('errors', [])])
+                
+                if keystroke_log:
+                    cursor.execute('''
+                        INSERT OR REPLACE INTO keystroke_logs (test_id, key_count, events)
+                        VALUES (?, ?, ?)
+                    ''', (test_id, len(keystroke_log), keystroke_log.to_blob()))
+                
+                today = record.get('date') or datetime.now().date()
                 cursor.execute('''
                     INSERT OR REPLACE INTO daily_streaks (date, tests_completed)
                     VALUES (?, COALESCE((SELECT tests_completed FROM daily_streaks WHERE date = ?) + 1, 1))
                 ''', (today, today))
+                schema.advance_streak(cursor, today)
                 
-                conn.commit()
-                return test_id
+                achievements = record.get('achievements', [])
+                check_streak = record.get('check_streak')
+                if check_streak:
+                    # The streak as stored once this test advanced it; extended in place so the
+                    # results screen holding this list can announce streak unlocks too
+                    achievements.extend(check_streak(schema.read_streak(cursor)['current']))
+                cursor.executemany('INSERT OR IGNORE INTO achievements (achievement_id) VALUES (?)',
+                                   [(achievement_id,) for achievement_id in achievements])
+            return test_id
         except (sqlite3.Error, ValueError) as e:
-            print(f"Error saving test result: {e}")
+            print(f"Error saving test: {e}")
             return None
     
-    def save_error_pattern(self, test_id, errors):
-        """Save error patterns with batch processing for better performance"""
-        if not test_id or not errors:
-            return
-            
+    def get_keystroke_log(self, test_id):
+        """Load and decode one test's keystroke log, or None if it has none"""
         try:
             with self.get_connection() as conn:
                 cursor = conn.cursor()
-                cursor.executemany('''
-                    INSERT INTO error_patterns 
-                    (test_id, character_intended, character_typed, position, word_context)
-                    VALUES (?, ?, ?, ?, ?)
-                ''', [(test_id,) + error for error in errors])
-                conn.commit()
-        except sqlite3.Error as e:
-            print(f"Error saving error patterns: {e}")
+                cursor.execute('SELECT events FROM keystroke_logs WHERE test_id = ?', (test_id,))
+                result = cursor.fetchone()
+                return KeystrokeLog.from_blob(result[0]) if result else None
+        except (sqlite3.Error, zlib.error) as e:
+            print(f"Error loading keystroke log: {e}")
+            return None
     
-    def unlock_achievement(self, achievement_id):
-        """Unlock achievement with better error handling"""
+    def get_text_offset(self, file_path, file_size, file_mtime):
+        """Byte offset to resume a custom text from; 0 if it is new or changed on disk"""
         try:
             with self.get_connection() as conn:
                 cursor = conn.cursor()
-                cursor.execute('INSERT INTO achievements (achievement_id) VALUES (?)', (achievement_id,))
+                cursor.execute('''
+                    SELECT next_offset FROM text_progress
+                    WHERE file_path = ? AND file_size = ? AND file_mtime = ?
+                ''', (file_path, file_size, file_mtime))
+                result = cursor.fetchone()
+                return result[0] if result else 0
+        except sqlite3.Error as e:
+            print(f"Error loading text progress: {e}")
+            return 0
+    
+    def save_text_offset(self, file_path, file_size, file_mtime, next_offset):
+        """Remember where the next segment of a custom text starts"""
+        try:
+            with self.get_connection() as conn:
+                conn.execute('''
+                    INSERT OR REPLACE INTO text_progress (file_path, file_size, file_mtime, next_offset, updated)
+                    VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)
+                ''', (file_path, file_size, file_mtime, next_offset))
                 conn.commit()
-                return True
-        except sqlite3.IntegrityError:
-            return False  # Already unlocked
         except sqlite3.Error as e:
-            print(f"Error unlocking achievement: {e}")
-            return False
+            print(f"Error saving text progress: {e}")
     
     def get_achievements(self):
         """Get achievements with error handling"""
@@ -226,6 +431,40 @@ class DatabaseManager:
             print(f"Error getting achievements: {e}")
             return []
     
+    def get_achievement_counters(self):
+        """Seed values for AchievementEngine: unlocked ids, test count and the last 10 results"""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('SELECT achievement_id FROM achievements')
+                unlocked = [row[0] for row in cursor.fetchall()]
+                cursor.execute('SELECT COALESCE(SUM(test_count), 0) FROM daily_rollup')
+                total_tests = cursor.fetchone()[0]
+                cursor.execute('SELECT wpm, accuracy FROM test_results ORDER BY epoch DESC LIMIT 10')
+                recent_results = cursor.fetchall()[::-1]  # Oldest first
+        except sqlite3.Error as e:
+            print(f"Error loading achievement counters: {e}")
+            return {}
+        
+        return {
+            'unlocked': unlocked,
+            'total_tests': total_tests,
+            'recent_results': recent_results
+        }
+    
+    def iter_export_records(self, batch_size=1000):
+        """Yield every stored result, error, keystroke log, achievement and setting as a flat dict"""
+        return transfer.iter_export_records(self, batch_size)
+    
+    def import_records(self, records, batch_size=5000):
+        """Insert exported records in one transaction, skipping results already stored; returns counts or None"""
+        return transfer.import_records(self, records, batch_size)
+    
+    @staticmethod
+    def epoch_cutoff(days):
+        """Unix time days ago, for filters on the indexed epoch column"""
+        return int(time.time()) - int(days * 86400)
+    
     def get_statistics(self, days=30):
         """Get statistics with parameterized queries for security"""
         try:
@@ -233,53 +472,359 @@ class DatabaseManager:
                 cursor = conn.cursor()
                 cursor.execute('''
                     SELECT * FROM test_results 
-                    WHERE date >= datetime('now', '-' || ? || ' days')
-                    ORDER BY date DESC
-                ''', (days,))
+                    WHERE epoch >= ?
+                    ORDER BY epoch DESC
+                ''', (self.epoch_cutoff(days),))
                 return cursor.fetchall()
         except sqlite3.Error as e:
             print(f"Error getting statistics: {e}")
             return []
     
+    def get_result_history(self, days=None):
+        """(wpm, accuracy, epoch) of every test in the last days days (all when None), oldest first"""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    SELECT wpm, accuracy, epoch FROM test_results
+                    WHERE epoch >= ?
+                    ORDER BY epoch
+                ''', (self.epoch_cutoff(days) if days is not None else 0,))
+                return cursor.fetchall()
+        except sqlite3.Error as e:
+            print(f"Error getting result history: {e}")
+            return []
+    
+    def get_recent_results(self, days=30, limit=10):
+        """Newest test_results rows (same shape as get_statistics), at most limit of them"""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    SELECT * FROM test_results 
+                    WHERE epoch >= ?
+                    ORDER BY epoch DESC
+                    LIMIT ?
+                ''', (self.epoch_cutoff(days), limit))
+                return cursor.fetchall()
+        except sqlite3.Error as e:
+            print(f"Error getting recent results: {e}")
+            return []
+    
+    def get_rollup_summary(self, days=30):
+        """Count, mean, stdev and best WPM/accuracy over the last days calendar days, read from daily_rollup"""
+        since = (datetime.now().date() - timedelta(days=days - 1)).isoformat()
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    SELECT COALESCE(SUM(test_count), 0), SUM(wpm_sum), SUM(wpm_sumsq),
+                           SUM(accuracy_sum), SUM(accuracy_sumsq), MAX(best_wpm), MAX(best_accuracy),
+                           SUM(total_duration)
+                    FROM daily_rollup
+                    WHERE day >= ?
+                ''', (since,))
+                count, wpm_sum, wpm_sumsq, acc_sum, acc_sumsq, best_wpm, best_acc, duration = cursor.fetchone()
+        except sqlite3.Error as e:
+            print(f"Error getting daily rollup: {e}")
+            count = 0
+        
+        if not count:
+            return {'tests': 0, 'avg_wpm': 0, 'wpm_stdev': 0, 'best_wpm': 0,
+                    'avg_accuracy': 0, 'accuracy_stdev': 0, 'best_accuracy': 0, 'total_duration': 0}
+        
+        def stdev(total, total_sq):
+            return math.sqrt(max(0.0, (total_sq - total * total / count) / (count - 1))) if count > 1 else 0
+        
+        return {
+            'tests': count,
+            'avg_wpm': wpm_sum / count,
+            'wpm_stdev': stdev(wpm_sum, wpm_sumsq),
+            'best_wpm': best_wpm,
+            'avg_accuracy': acc_sum / count,
+            'accuracy_stdev': stdev(acc_sum, acc_sumsq),
+            'best_accuracy': best_acc,
+            'total_duration': duration
+        }
+    
+    def get_tests_today(self):
+        """Number of tests completed today (local date)"""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('SELECT COALESCE(SUM(test_count), 0) FROM daily_rollup WHERE day = ?',
+                               (datetime.now().date().isoformat(),))
+                return cursor.fetchone()[0]
+        except sqlite3.Error as e:
+            print(f"Error getting today's tests: {e}")
+            return 0
+    
     def get_error_analysis(self, days=30):
-        """Get error analysis with improved query"""
+        """Top (intended, typed, frequency) confusions over the last days calendar days"""
         try:
             with self.get_connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
-                    SELECT character_intended, character_typed, COUNT(*) as frequency
-                    FROM error_patterns ep
-                    JOIN test_results tr ON ep.test_id = tr.id
-                    WHERE tr.date >= datetime('now', '-' || ? || ' days')
-                    GROUP BY character_intended, character_typed
+                    SELECT intended, typed, SUM(count) as frequency
+                    FROM confusion_matrix
+                    WHERE day >= ?
+                    GROUP BY intended, typed
                     ORDER BY frequency DESC
                     LIMIT 10
-                ''', (days,))
+                ''', ((datetime.now().date() - timedelta(days=days - 1)).isoformat(),))
                 return cursor.fetchall()
         except sqlite3.Error as e:
             print(f"Error getting error analysis: {e}")
             return []
     
+    def get_weak_ngrams(self, days=30, limit=20):
+        """Most often mistyped bigrams and trigrams as (ngram, count), read from stored error contexts"""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    SELECT ep.position, ep.word_context
+                    FROM error_patterns ep
+                    JOIN test_results tr ON ep.test_id = tr.id
+                    WHERE tr.epoch >= ?
+                ''', (self.epoch_cutoff(days),))
+                rows = cursor.fetchall()
+        except sqlite3.Error as e:
+            print(f"Error getting weak n-grams: {e}")
+            return []
+        
+        counts = defaultdict(int)
+        for position, context in rows:
+            if not context:
+                continue
+            context = context.lower()
+            error_index = min(position, 2)  # Contexts hold up to two characters before the error
+            for n in (2, 3):
+                for start in range(max(0, error_index - n + 1), error_index + 1):
+                    gram = context[start:start + n]
+                    if len(gram) == n and gram.isalpha():
+                        counts[gram] += 1
+        
+        return sorted(counts.items(), key=lambda item: item[1], reverse=True)[:limit]
+    
+    def get_streak_info(self):
+        """Current and longest run of consecutive days with a test, read from the cached streak row"""
+        try:
+            with self.get_connection() as conn:
+                return schema.read_streak(conn.cursor())
+        except sqlite3.Error as e:
+            print(f"Error getting streak info: {e}")
+            return {'current': 0, 'longest': 0, 'last_day': None}
+    
     def get_streak_count(self):
-        """Get streak count with better error handling"""
+        """Current consecutive-day streak"""
+        return self.get_streak_info()['current']
+    
+    def get_menu_summary(self):
+        """Everything the main menu shows, read from the cached summary rows in one round trip"""
         try:
             with self.get_connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
-                    SELECT COUNT(*) FROM daily_streaks 
-                    WHERE date >= date('now', '-7 days') AND tests_completed > 0
-                ''')
-                result = cursor.fetchone()
-                return result[0] if result else 0
+                    SELECT (SELECT COALESCE(SUM(test_count), 0) FROM daily_rollup WHERE day = ?),
+                           (SELECT current_streak FROM streak_state WHERE id = 1),
+                           (SELECT last_day FROM streak_state WHERE id = 1),
+                           (SELECT AVG(wpm) FROM (SELECT wpm FROM test_results ORDER BY epoch DESC LIMIT 5)),
+                           (SELECT COUNT(*) FROM achievements)
+                ''', (datetime.now().date().isoformat(),))
+                tests_today, streak, last_day, recent_wpm, achievement_count = cursor.fetchone()
+                cursor.execute('SELECT achievement_id FROM achievements ORDER BY date_earned DESC LIMIT 3')
+                recent_achievements = [row[0] for row in cursor.fetchall()]
         except sqlite3.Error as e:
-            print(f"Error getting streak count: {e}")
+            print(f"Error getting menu summary: {e}")
+            return {'tests_today': 0, 'streak': 0, 'recent_wpm': None, 'achievements': 0, 'recent_achievements': []}
+        
+        return {
+            'tests_today': tests_today,
+            'streak': schema.live_streak(streak, last_day),
+            'recent_wpm': recent_wpm,
+            'achievements': achievement_count,
+            'recent_achievements': recent_achievements
+        }
+
+class ResultWriter:
+    """Write-behind queue that persists finished tests on one background thread"""
+    def __init__(self, db_manager, maxsize=32):
+        self.db_manager = db_manager
+        self.queue = queue.Queue(maxsize)
+        self.thread = None
+        self.lock = threading.Lock()
+        self.written = 0
+        self.failed = 0
+        self.max_depth = 0
+        atexit.register(self.close)  # Once, however often the writer thread is restarted
+    
+    def submit(self, record, summary=None):
+        """Queue a save_completed_test record; the writer fills summary['test_id'] once it is committed"""
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name="snaketype-writer", daemon=True)
+                self.thread.start()
+        self.queue.put((record, summary))  # Blocks only if the writer falls maxsize tests behind
+        self.max_depth = max(self.max_depth, self.queue.qsize())
+    
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            try:
+                if item is None:
+                    return
+                record, summary = item
+                test_id = self.db_manager.save_completed_test(record)
+                if test_id is None:
+                    self.failed += 1
+                else:
+                    self.written += 1
+                if summary is not None:
+                    summary['test_id'] = test_id
+            except Exception as e:
+                self.failed += 1
+                print(f"Error in result writer: {e}")
+            finally:
+                self.queue.task_done()
+    
+    def depth(self):
+        return self.queue.qsize()
+    
+    def flush(self):
+        """Block until every queued test has been written"""
+        if self.thread is not None:
+            self.queue.join()
+    
+    def close(self):
+        """Flush outstanding writes and stop the writer thread"""
+        with self.lock:
+            thread, self.thread = self.thread, None
+        if thread is not None and thread.is_alive():
+            self.queue.put(None)
+            thread.join()
+    
+    def get_stats(self):
+        return {
+            'depth': self.depth(),
+            'max_depth': self.max_depth,
+            'written': self.written,
+            'failed': self.failed
+        }
+
+class TimestampRingBuffer:
+    """Fixed-capacity, array-backed ring buffer of timestamps with head eviction"""
+    
+    def __init__(self, capacity=1024):
+        self.capacity = capacity
+        self.data = array('d', [0.0]) * capacity
+        self.head = 0
+        self.count = 0
+    
+    def __len__(self):
+        return self.count
+    
+    def __getitem__(self, index):
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError("ring buffer index out of range")
+        return self.data[(self.head + index) % self.capacity]
+    
+    def append(self, value):
+        """Append a timestamp, overwriting the oldest one when full"""
+        if self.count == self.capacity:
+            self.head = (self.head + 1) % self.capacity
+            self.count -= 1
+        self.data[(self.head + self.count) % self.capacity] = value
+        self.count += 1
+    
+    def evict_older_than(self, cutoff):
+        """Drop timestamps at or before cutoff from the head"""
+        while self.count and self.data[self.head] <= cutoff:
+            self.head = (self.head + 1) % self.capacity
+            self.count -= 1
+    
+    def clear(self):
+        self.head = 0
+        self.count = 0
+
+class SortedWindow:
+    """Sliding window kept both in arrival order and sorted, for O(log n) order statistics"""
+    
+    def __init__(self, maxlen):
+        self.maxlen = maxlen
+        self.values = deque()
+        self.sorted_values = []
+        self.total = 0.0
+        self.total_squares = 0.0
+    
+    def __len__(self):
+        return len(self.values)
+    
+    def __iter__(self):
+        return iter(self.values)
+    
+    def __getitem__(self, index):
+        return self.values[index]
+    
+    def append(self, value):
+        """Add a value, evicting the oldest one once the window is full"""
+        if len(self.values) == self.maxlen:
+            oldest = self.values.popleft()
+            del self.sorted_values[bisect.bisect_left(self.sorted_values, oldest)]
+            self.total -= oldest
+            self.total_squares -= oldest * oldest
+        self.values.append(value)
+        bisect.insort(self.sorted_values, value)
+        self.total += value
+        self.total_squares += value * value
+    
+    def recent(self, count):
+        """Iterate over the newest values, newest first"""
+        for i in range(1, min(count, len(self.values)) + 1):
+            yield self.values[-i]
+    
+    def quartiles(self):
+        """Q1, median and Q3, matching statistics.quantiles(n=4) (exclusive method)"""
+        data = self.sorted_values
+        ld = len(data)
+        if ld < 2:
+            return [0, 0, 0]
+        m = ld + 1
+        result = []
+        for i in range(1, 4):
+            j = i * m // 4
+            j = 1 if j < 1 else ld - 1 if j > ld - 1 else j
+            delta = i * m - j * 4
+            result.append((data[j - 1] * (4 - delta) + data[j] * delta) / 4)
+        return result
+    
+    def median(self):
+        data = self.sorted_values
+        n = len(data)
+        if n == 0:
+            return 0
+        return data[n//2] if n % 2 else (data[n//2-1] + data[n//2]) / 2
+    
+    def mean(self):
+        return self.total / len(self.values) if self.values else 0
+    
+    def stdev(self):
+        """Sample standard deviation from running sums"""
+        n = len(self.values)
+        if n < 2:
             return 0
+        variance = (self.total_squares - self.total * self.total / n) / (n - 1)
+        return math.sqrt(max(0.0, variance))
 
 class PerformanceTracker:
-    def __init__(self):
-        self.wpm_samples = deque(maxlen=50)  # For real-time WPM calculation
+    def __init__(self, layout=None):
+        self.layout = layout or get_layout()  # Compiled keyboard layout for finger analysis
+        self.wpm_samples = SortedWindow(50)  # For real-time WPM calculation
+        self.iqr_window = SortedWindow(20)  # Last 20 samples for outlier filtering
         self.last_update_time = None
-        self.keystroke_times = []
+        self.keystroke_times = TimestampRingBuffer()  # Sliding 10 s window
         self.pause_threshold = 2.0  # seconds
         self.smoothing_factor = 0.3  # For exponential smoothing
         self.velocity_history = deque(maxlen=20)  # For rhythm analysis
@@ -289,8 +834,7 @@ class PerformanceTracker:
         """Add a keystroke sample for real-time WPM calculation with enhanced smoothing"""
         self.keystroke_times.append(timestamp)
         
-        cutoff_time = timestamp - 10
-        self.keystroke_times = [t for t in self.keystroke_times if t > cutoff_time]
+        self.keystroke_times.evict_older_than(timestamp - 10)
         
         if len(self.keystroke_times) >= 2:
             time_span = self.keystroke_times[-1] - self.keystroke_times[0]
@@ -306,19 +850,33 @@ class PerformanceTracker:
                 
                 if self._is_valid_sample(smoothed_wpm):
                     self.wpm_samples.append(smoothed_wpm)
+                    self.iqr_window.append(smoothed_wpm)
                     
                     if len(self.wpm_samples) >= 2:
                         velocity_change = self.wpm_samples[-1] - self.wpm_samples[-2]
                         self.velocity_history.append(velocity_change)
     
+    def add_idle_sample(self, timestamp):
+        """Add a sample with no new keystroke so the live WPM decays while the typist pauses"""
+        if not self.wpm_samples:
+            return
+        
+        self.keystroke_times.evict_older_than(timestamp - 10)
+        time_span = timestamp - self.keystroke_times[0] if self.keystroke_times else 0
+        raw_wpm = (len(self.keystroke_times) / time_span * 60) / 5 if time_span > 0 else 0
+        smoothed_wpm = (self.smoothing_factor * raw_wpm) + \
+                       ((1 - self.smoothing_factor) * self.wpm_samples[-1])
+        
+        # A pause is a real slowdown, not an outlier, so it skips the IQR filter
+        self.wpm_samples.append(smoothed_wpm)
+        self.iqr_window.append(smoothed_wpm)
+    
     def _is_valid_sample(self, wpm_value):
         """Filter outliers using Interquartile Range (IQR) method"""
         if len(self.wpm_samples) < 5:
             return True  # Not enough data for outlier detection
         
-        recent_samples = list(self.wpm_samples)[-20:]  # Use last 20 samples
-        q1 = statistics.quantiles(recent_samples, n=4)[0]  # 25th percentile
-        q3 = statistics.quantiles(recent_samples, n=4)[2]  # 75th percentile
+        q1, _, q3 = self.iqr_window.quartiles()  # 25th/75th percentile of last 20 samples
         iqr = q3 - q1
         
         lower_bound = q1 - 1.5 * iqr
@@ -331,13 +889,12 @@ class PerformanceTracker:
         if not self.wpm_samples:
             return 0
         
-        recent_samples = list(self.wpm_samples)[-10:]
-        if len(recent_samples) < 3:
-            return statistics.median(recent_samples)
+        if len(self.wpm_samples) < 3:
+            return self.wpm_samples.median()
         
-        weights = [i + 1 for i in range(len(recent_samples))]
-        weighted_sum = sum(sample * weight for sample, weight in zip(recent_samples, weights))
-        total_weight = sum(weights)
+        count = min(10, len(self.wpm_samples))
+        weighted_sum = sum(sample * (count - i) for i, sample in enumerate(self.wpm_samples.recent(count)))
+        total_weight = count * (count + 1) // 2
         
         return weighted_sum / total_weight if total_weight > 0 else 0
     
@@ -346,11 +903,11 @@ class PerformanceTracker:
         if len(self.wpm_samples) < 5:
             return 0
         
-        mean_wpm = statistics.mean(self.wpm_samples)
+        mean_wpm = self.wpm_samples.mean()
         if mean_wpm == 0:
             return 0
         
-        std_dev = statistics.stdev(self.wpm_samples)
+        std_dev = self.wpm_samples.stdev()
         coefficient_of_variation = (std_dev / mean_wpm) * 100
         
         consistency_score = max(0, 100 - coefficient_of_variation)
@@ -384,9 +941,7 @@ class PerformanceTracker:
                 
                 patterns['substitution_errors'][f"{target}->{typed}"] += 1
                 
-                finger = self._map_char_to_finger(target.lower())
-                if finger:
-                    patterns['finger_errors'][finger] += 1
+                patterns['finger_errors'][self._map_char_to_finger(target)] += 1
                 
                 self.error_clusters[i // 10].append(i)  # Group by 10-character windows
         
@@ -410,21 +965,7 @@ class PerformanceTracker:
     
     def _map_char_to_finger(self, char):
         """Map characters to specific fingers for targeted training"""
-        finger_map = {
-            'left_pinky': 'qaz1',
-            'left_ring': 'wsx2',
-            'left_middle': 'edc3',
-            'left_index': 'rfvtgb45',
-            'right_index': 'yhnujm67',
-            'right_middle': 'ik,8',
-            'right_ring': 'ol.9',
-            'right_pinky': 'p;/0-=[]\\\'"`'
-        }
-        
-        for finger, chars in finger_map.items():
-            if char in chars:
-                return finger
-        return 'unknown'
+        return self.layout.finger(char)
     
     def _analyze_error_clusters(self):
         """Analyze spatial clustering of errors for pattern recognition"""
@@ -605,16 +1146,376 @@ class Colors:
     REVERSE = '\033[7m'
     END = '\033[0m'
 
+@lru_cache(maxsize=4096)
+def _cell_width(cell):
+    """Terminal column width of a cell (wide glyphs take 2, combining marks 0)"""
+    width = 0
+    for char in cell:
+        if unicodedata.combining(char) or char in '\u200d\ufe0e\ufe0f':
+            continue
+        width += 2 if unicodedata.east_asian_width(char) in ('W', 'F') else 1
+    return width
+
+def _text_cells(text, style=""):
+    """Split text into (style, glyph) cells, folding zero-width marks into the previous glyph"""
+    cells = []
+    for char in text:
+        if cells and _cell_width(char) == 0:
+            cells[-1] = (style, cells[-1][1] + char)
+        else:
+            cells.append((style, char))
+    return cells
+
+TEXT_WINDOW_LINES = 8  # Target text lines shown on the live test screen
+
+@lru_cache(maxsize=4)
+def _wrap_text(text, width):
+    """Start and end offsets of each display line; the space a line breaks at belongs to neither"""
+    starts, ends = [], []
+    line_start = 0
+    line_length = 0
+    for i, char in enumerate(text):
+        if char == ' ' and line_length > width - 10:
+            starts.append(line_start)
+            ends.append(i)
+            line_start = i + 1
+            line_length = 0
+        else:
+            line_length += 1
+    if line_length:
+        starts.append(line_start)
+        ends.append(len(text))
+    return starts, ends
+
+class FrameRenderer:
+    """Diff-based terminal renderer that repaints only the cells changed since the last frame"""
+    
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+        self.previous_frame = None
+        self.current_style = ""
+        self.frames_rendered = 0
+        self.bytes_written = 0
+        self.last_frame_bytes = 0
+        self.total_frame_time = 0.0
+        self.max_frame_time = 0.0
+    
+    def invalidate(self):
+        """Force a full repaint on the next frame (after anything else wrote to the screen)"""
+        self.previous_frame = None
+    
+    def render(self, frame):
+        """Render a frame given as a list of lines, each a list of (style, glyph) cells"""
+        frame_start = time.perf_counter()
+        out = []
+        previous = self.previous_frame
+        if previous is None:
+            out.append('\033[2J\033[H')  # Clear screen and home cursor on first paint
+            previous = []
+        
+        self.current_style = ""
+        for row, line in enumerate(frame):
+            old_line = previous[row] if row < len(previous) else []
+            if line != old_line:
+                self._diff_line(row + 1, old_line, line, out)
+        
+        if len(frame) < len(previous):
+            out.append(f'\033[{len(frame) + 1};1H\033[J')
+        
+        if out:
+            if self.current_style:
+                out.append(Colors.END)
+            out.append(f'\033[{len(frame) + 1};1H')  # Park cursor below the frame
+            data = "".join(out)
+            self.stream.write(data)
+            self.stream.flush()
+            self.last_frame_bytes = len(data.encode('utf-8'))
+        else:
+            self.last_frame_bytes = 0
+        
+        self.previous_frame = frame
+        frame_time = time.perf_counter() - frame_start
+        self.frames_rendered += 1
+        self.bytes_written += self.last_frame_bytes
+        self.total_frame_time += frame_time
+        self.max_frame_time = max(self.max_frame_time, frame_time)
+    
+    def _diff_line(self, row, old_line, new_line, out):
+        """Emit cursor moves and glyphs for the cells of one line that differ"""
+        col = 1
+        cursor_col = None
+        for i, cell in enumerate(new_line):
+            width = _cell_width(cell[1])
+            if i < len(old_line) and old_line[i] == cell:
+                col += width
+                continue
+            
+            if cursor_col != col:
+                out.append(f'\033[{row};{col}H')
+            self._emit(cell, out)
+            col += width
+            cursor_col = col
+            
+            if i >= len(old_line) or _cell_width(old_line[i][1]) != width:
+                # Every following cell moved column, so repaint the rest of the line
+                for rest in new_line[i + 1:]:
+                    self._emit(rest, out)
+                out.append('\033[K')
+                return
+        
+        if len(new_line) < len(old_line):
+            if cursor_col != col:
+                out.append(f'\033[{row};{col}H')
+            out.append('\033[K')
+    
+    def _emit(self, cell, out):
+        """Append a single cell, switching SGR style only when it changes"""
+        style, glyph = cell
+        if style != self.current_style:
+            out.append(Colors.END + style)
+            self.current_style = style
+        out.append(glyph)
+    
+    def get_stats(self):
+        """Bytes-per-frame and frame-time counters for measuring renderer cost"""
+        frames = self.frames_rendered
+        return {
+            'frames': frames,
+            'total_bytes': self.bytes_written,
+            'avg_bytes_per_frame': self.bytes_written / frames if frames else 0,
+            'last_frame_bytes': self.last_frame_bytes,
+            'avg_frame_ms': (self.total_frame_time / frames) * 1000 if frames else 0,
+            'max_frame_ms': self.max_frame_time * 1000
+        }
+
+class KeyboardReader:
+    """Session-scoped raw-mode keyboard reader that timestamps keys as they are read"""
+    ESCAPE_TIMEOUT = 0.05  # Seconds to wait for the rest of an escape sequence split across reads
+    
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdin
+        self.fd = None
+        self.old_settings = None
+        self.selector = None
+        self.decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        self.pending = deque()  # (perf_counter_ns, key) pairs already read but not consumed
+        self.buffer = ""  # Start of an escape sequence whose remaining bytes have not arrived yet
+        self.buffer_ns = None  # When that partial sequence started arriving
+    
+    def __enter__(self):
+        self.start()
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+    
+    def start(self):
+        """Enter raw mode once for the whole session"""
+        if termios is None or self.old_settings is not None:
+            return
+        try:
+            self.fd = self.stream.fileno()
+            self.old_settings = termios.tcgetattr(self.fd)
+            tty.setraw(self.fd)
+        except (termios.error, OSError, ValueError, AttributeError):
+            self.old_settings = None  # Not a terminal; get_char falls back to line input
+            return
+        self.selector = selectors.DefaultSelector()
+        self.selector.register(self.fd, selectors.EVENT_READ)
+    
+    def stop(self):
+        """Restore the terminal settings saved by start()"""
+        if self.old_settings is not None:
+            termios.tcsetattr(self.fd, termios.TCSADRAIN, self.old_settings)
+            self.old_settings = None
+        if self.selector is not None:
+            self.selector.close()
+            self.selector = None
+    
+    @contextmanager
+    def paused(self):
+        """Temporarily return to cooked mode, e.g. for an input() prompt"""
+        was_raw = self.old_settings is not None
+        self.stop()
+        try:
+            yield
+        finally:
+            if was_raw:
+                self.start()
+    
+    def read_key(self, timeout=None):
+        """Return the next (perf_counter_ns, key) pair, or None if timeout expires"""
+        if self.pending:
+            return self.pending.popleft()
+        
+        if msvcrt is not None:
+            return self._read_key_windows(timeout)
+        if self.selector is None:
+            raise OSError("KeyboardReader is not in raw mode")
+        
+        while not self.pending:
+            wait = timeout
+            if self.buffer:  # Give the rest of a split escape sequence a moment before treating ESC as a key
+                wait = self.escape_wait() if timeout is None else min(timeout, self.escape_wait())
+            if not self.selector.select(wait):
+                if not self.buffer or self.escape_wait() > 0:
+                    return None
+                self._flush_buffer()
+                break
+            if not self._read_available():
+                break
+        
+        return self.pending.popleft() if self.pending else None
+    
+    def escape_wait(self):
+        """Seconds left before a buffered partial escape sequence is given up on"""
+        if self.buffer_ns is None:
+            return 0.0
+        return max(0.0, (self.buffer_ns - time.perf_counter_ns()) / 1e9 + self.ESCAPE_TIMEOUT)
+    
+    def _read_available(self):
+        """Read and split everything the terminal has ready; returns False at end of input"""
+        while True:
+            chunk = os.read(self.fd, 1024)
+            timestamp_ns = time.perf_counter_ns()
+            if not chunk:
+                return False
+            self.buffer += self.decoder.decode(chunk)
+            self._split_keys(timestamp_ns)
+            if not self.selector.select(0):
+                return True
+    
+    def _flush_buffer(self):
+        """Emit a partial escape sequence that never completed as individual keys, a lone ESC included"""
+        self.pending.extend((self.buffer_ns, char) for char in self.buffer)
+        self.buffer = ""
+        self.buffer_ns = None
+    
+    def _split_keys(self, timestamp_ns):
+        """Move complete keys and escape sequences from the buffer to the pending queue"""
+        buffer = self.buffer
+        i = 0
+        while i < len(buffer):
+            if buffer[i] == '\x1b' and i + 1 == len(buffer):
+                break  # A lone ESC or the first byte of a sequence split across reads
+            if buffer[i] == '\x1b' and buffer[i + 1] in '[O':
+                end = i + 2
+                while end < len(buffer) and not ('@' <= buffer[end] <= '~'):
+                    end += 1
+                if end >= len(buffer):
+                    break  # Incomplete escape sequence, wait for the rest
+                self.pending.append((timestamp_ns, buffer[i:end + 1]))
+                i = end + 1
+            else:
+                self.pending.append((timestamp_ns, buffer[i]))
+                i += 1
+        self.buffer = buffer[i:]
+        if not self.buffer:
+            self.buffer_ns = None
+        elif i or self.buffer_ns is None:
+            self.buffer_ns = timestamp_ns  # The partial sequence started in this read
+    
+    def _read_key_windows(self, timeout):
+        """Read one key through msvcrt, polling kbhit when a timeout is given"""
+        if timeout is not None:
+            deadline = time.perf_counter() + timeout
+            while not msvcrt.kbhit():
+                if time.perf_counter() >= deadline:
+                    return None
+                time.sleep(0.005)
+        
+        char = msvcrt.getwch()
+        timestamp_ns = time.perf_counter_ns()
+        if char in ('\x00', '\xe0'):  # Function/arrow key prefix
+            char += msvcrt.getwch()
+        return timestamp_ns, char
+
+class IncrementalScorer:
+    """Correct/mistake accounting updated in O(1) per typed character or backspace"""
+    
+    def __init__(self, target_text=""):
+        self.reset(target_text)
+    
+    def reset(self, target_text=None):
+        """Clear typed state, optionally switching to a new target text"""
+        if target_text is not None:
+            self.target_text = target_text
+        self.typed = []
+        self.correct_chars = 0
+        self.errors = {}  # position -> (expected, typed); tail-only edits keep it position-ordered
+    
+    @property
+    def typed_length(self):
+        return len(self.typed)
+    
+    @property
+    def mistakes(self):
+        return len(self.errors)
+    
+    def append(self, char):
+        """Score one newly typed character"""
+        position = len(self.typed)
+        self.typed.append(char)
+        if position < len(self.target_text):
+            expected = self.target_text[position]
+            if char == expected:
+                self.correct_chars += 1
+            else:
+                self.errors[position] = (expected, char)
+    
+    def backspace(self):
+        """Undo the score of the last typed character"""
+        if not self.typed:
+            return
+        position = len(self.typed) - 1
+        char = self.typed.pop()
+        if position < len(self.target_text):
+            if char == self.target_text[position]:
+                self.correct_chars -= 1
+            else:
+                del self.errors[position]
+    
+    def rebuild(self, user_input):
+        """Rescore a whole input string (used when input was changed outside the scorer)"""
+        self.reset()
+        for char in user_input:
+            self.append(char)
+    
+    def get_accuracy(self):
+        """Accuracy percentage over all typed characters"""
+        if not self.typed:
+            return 100
+        return (self.correct_chars / len(self.typed)) * 100
+    
+    def get_error_positions(self):
+        """Materialize the error list in the format used by the results screens"""
+        text = self.target_text
+        return [
+            {
+                'position': i,
+                'expected': expected,
+                'typed': typed,
+                'context': text[max(0, i-2):i+3]
+            } for i, (expected, typed) in self.errors.items()
+        ]
+
 class TypingGame:
-    def __init__(self):
+    def __init__(self, db_path="typing_stats.db"):
         self.current_text = ""
-        self.user_input = ""
+        self._user_input = ""
+        self._scorer_synced = True  # False once user_input is replaced outside type_char/backspace
         self.start_time = None
         self.end_time = None
         self.is_running = False
         
-        self.performance_tracker = PerformanceTracker()
-        self.db_manager = DatabaseManager()
+        self.keyboard_layout = get_layout()
+        self.performance_tracker = PerformanceTracker(self.keyboard_layout)
+        self.renderer = FrameRenderer()
+        self.scorer = IncrementalScorer()
+        self.keystroke_log = KeystrokeLog()
+        self.db_path = db_path
+        self.result_writer = ResultWriter(None)
+        self._db_manager = None  # Opened on first use
         self.difficulty_adjuster = DifficultyAdjuster()
         
         self.wpm_history = deque(maxlen=50)
@@ -629,64 +1530,67 @@ class TypingGame:
         
         self.daily_goal = 5  # tests per day
         self.current_streak = 0
-        self.achievements_unlocked = set()
+        self.achievement_engine = AchievementEngine()
+        self.achievements_unlocked = self.achievement_engine.unlocked
+        self.user_data_loaded = False  # History and achievement counters load before the first save
         self.total_tests = 0
         self.total_time_typed = 0
         
         self.auto_difficulty = True
         self.show_live_wpm = True
+        self.show_render_stats = False
         self.text_wrap_width = 80
-        
-        self.load_user_data()
-        
-        self.wpm_update_thread = None
-        self.stop_wpm_thread = False
+        self.custom_segment_words = 100  # words per custom text segment
+        self.weak_ngram_ratio = 0.5  # share of adaptive words chosen for the user's weak n-grams
+        corpus_path = os.environ.get("SNAKETYPE_CORPUS")
+        self.word_corpus = WordCorpus(corpus_path) if corpus_path else None  # mapped on first use
+        layout_name = os.environ.get("SNAKETYPE_LAYOUT")
+        if layout_name:
+            self.set_keyboard_layout(layout_name)
+        
+        self.headless = False
+        self.keyboard = None
+        self.idle_tick_interval = 0.5  # seconds between live refreshes while no keys arrive
+        self.last_key_time = None
+    
+    @property
+    def db_manager(self):
+        """The DatabaseManager, opened (and migrated) on first access"""
+        if self._db_manager is None:
+            self.db_manager = DatabaseManager(self.db_path)
+        return self._db_manager
+    
+    @db_manager.setter
+    def db_manager(self, db_manager):
+        self._db_manager = db_manager
+        self.result_writer.db_manager = db_manager
     
     def load_user_data(self):
         """Load user statistics and achievements from database"""
         try:
-            achievements = self.db_manager.get_achievements()
-            self.achievements_unlocked = {ach[0] for ach in achievements}
+            self.load_achievement_engine()
             
-            recent_stats = self.db_manager.get_statistics(days=30)
-            if recent_stats:
-                self.total_tests = len(recent_stats)
-                self.wpm_history.extend([stat[2] for stat in recent_stats[-10:]])
-                self.accuracy_history.extend([stat[3] for stat in recent_stats[-10:]])
+            self.total_tests = self.db_manager.get_rollup_summary(days=30)['tests']
+            recent_stats = self.db_manager.get_recent_results(days=30, limit=10)[::-1]  # Oldest first
+            self.wpm_history.clear()
+            self.accuracy_history.clear()
+            self.wpm_history.extend([stat[2] for stat in recent_stats])
+            self.accuracy_history.extend([stat[3] for stat in recent_stats])
             
             self.current_streak = self.db_manager.get_streak_count()
+            self.user_data_loaded = True
             
         except Exception as e:
             print(f"Error loading user data: {e}")
     
+    def ensure_user_data(self):
+        """Load history and achievement counters the first time something needs them"""
+        if not self.user_data_loaded:
+            self.load_user_data()
+    
     def clear_screen(self):
         os.system('cls' if os.name == 'nt' else 'clear')
     
-    def start_real_time_wpm_thread(self):
-        """Start thread for real-time WPM updates"""
-        self.stop_wpm_thread = False
-        if self.wpm_update_thread and self.wpm_update_thread.is_alive():
-            self.stop_wpm_thread = True
-            self.wpm_update_thread.join(timeout=1)
-        
-        self.wpm_update_thread = threading.Thread(target=self.update_live_wpm)
-        self.wpm_update_thread.daemon = True
-        self.wpm_update_thread.start()
-    
-    def update_live_wpm(self):
-        """Update live WPM in real-time"""
-        while not self.stop_wpm_thread and self.is_running:
-            if self.start_time and self.user_input:
-                current_time = time.time()
-                elapsed_time = current_time - self.start_time
-                if elapsed_time > 0:
-                    chars_typed = len(self.user_input)
-                    self.live_wpm = (chars_typed / 5) / (elapsed_time / 60)
-                    
-                    self.performance_tracker.add_keystroke(current_time, chars_typed)
-            
-            time.sleep(0.1)  # Update 10 times per second
-    
     def get_adaptive_word_list(self, word_count=50):
         """Generate word list based on adaptive difficulty"""
         if not self.auto_difficulty:
@@ -699,10 +1603,13 @@ class TypingGame:
         medium_count = int(word_count * medium_ratio)
         hard_count = word_count - easy_count - medium_count
         
+        weak_ngrams = self.db_manager.get_weak_ngrams()
+        
         words = []
-        words.extend(random.choices(EASY_WORDS, k=easy_count))
-        words.extend(random.choices(MEDIUM_WORDS, k=medium_count))
-        words.extend(random.choices(HARD_WORDS, k=hard_count))
+        for pool_name, count in (("easy", easy_count), ("medium", medium_count), ("hard", hard_count)):
+            targeted = get_ngram_index(pool_name).sample(weak_ngrams, int(count * self.weak_ngram_ratio))
+            words.extend(targeted)
+            words.extend(random.choices(WORD_POOLS[pool_name], k=count - len(targeted)))
         
         random.shuffle(words)
         return words
@@ -717,29 +1624,66 @@ class TypingGame:
         elif difficulty == "adaptive":
             return self.get_adaptive_word_list(word_count)
         else:  # Common words mode
+            if self.word_corpus:
+                try:
+                    return self.word_corpus.sample(word_count)
+                except (OSError, ValueError) as e:
+                    print(f"Error loading word corpus: {e}")
+                    self.word_corpus = None
             return random.choices(COMMON_WORDS, k=word_count)
     
-    def load_custom_text(self, file_path):
-        """Load custom text from file"""
+    def load_custom_text(self, file_path, word_count=100):
+        """Load the first word_count words of a custom text file"""
         try:
-            with open(file_path, 'r', encoding='utf-8') as file:
-                content = file.read().strip()
-                words = []
-                current_word = ""
-                for char in content.lower():
-                    if char.isalnum():
-                        current_word += char
-                    else:
-                        if current_word:
-                            words.append(current_word)
-                            current_word = ""
-                if current_word:
-                    words.append(current_word)
-                return words[:100]  # Limit to 100 words
+            return TextSegmentReader(file_path).read_segment(0, word_count)['words'] or None
         except Exception as e:
             print(f"Error loading custom text: {e}")
             return None
     
+    def practice_custom_text(self, file_path):
+        """Practice a text file as consecutive segments, resuming where the last session stopped"""
+        try:
+            source = TextSegmentReader(os.path.abspath(file_path))
+        except OSError as e:
+            print(f"Error loading custom text: {e}")
+            source = None
+        
+        offset = self.db_manager.get_text_offset(source.file_path, source.size, source.mtime) if source else 0
+        while source:
+            try:
+                segment = source.read_segment(offset, self.custom_segment_words)
+            except OSError as e:
+                print(f"Error loading custom text: {e}")
+                break
+            
+            if not segment['words'] and offset:
+                offset = 0  # Finished the file last time; start over
+                continue
+            if not segment['words']:
+                break
+            
+            print(f"Loaded {len(segment['words'])} words from custom file "
+                  f"({segment['progress']:.1f}% through {os.path.basename(source.file_path)})")
+            time.sleep(1)
+            self.run_test(segment['words'])
+            
+            if self.end_time is None:
+                return  # Quit mid-segment; resume it next time
+            offset = 0 if segment['eof'] else segment['end_offset']
+            self.db_manager.save_text_offset(source.file_path, source.size, source.mtime, offset)
+            
+            if segment['eof']:
+                print(f"{Colors.GREEN}🎉 You've typed the whole text!{Colors.END}")
+                time.sleep(1)
+                return
+            if input("Continue with the next segment? (y/n): ").strip().lower() != 'y':
+                return
+        
+        print("Failed to load custom text. Using default words.")
+        time.sleep(1)
+        words = self.get_word_list("4")
+        self.run_test(words)
+    
     def display_menu(self):
         self.clear_screen()
         
@@ -747,15 +1691,20 @@ class TypingGame:
         print(f"║                           SNAKETYPE                            ║")
         print(f"╚════════════════════════════════════════════════════════════════╝{Colors.END}")
         
-        tests_today = len([t for t in self.db_manager.get_statistics(days=1)])
+        self.result_writer.flush()  # The test just finished may still be queued; returns at once when idle
+        summary = self.db_manager.get_menu_summary()
+        tests_today = summary['tests_today']
+        self.current_streak = summary['streak']
         progress_bar = "█" * tests_today + "░" * max(0, self.daily_goal - tests_today)
         
         print(f"\n{Colors.YELLOW}📊 Today: {tests_today}/{self.daily_goal} {progress_bar[:self.daily_goal]} | ")
-        print(f"🔥 Streak: {self.current_streak} days | 🏆 Achievements: {len(self.achievements_unlocked)}{Colors.END}")
+        print(f"🔥 Streak: {self.current_streak} days | 🏆 Achievements: {summary['achievements']}{Colors.END}")
         
         if self.wpm_history:
             avg_wpm = sum(list(self.wpm_history)[-5:]) / min(5, len(self.wpm_history))
             print(f"{Colors.GRAY}Recent Average: {avg_wpm:.1f} WPM{Colors.END}")
+        elif summary['recent_wpm'] is not None:
+            print(f"{Colors.GRAY}Recent Average: {summary['recent_wpm']:.1f} WPM{Colors.END}")
         
         print(f"\n{Colors.YELLOW}🎯 Choose your test mode:{Colors.END}")
         print(f"{Colors.WHITE}1. Easy Words (3-5 letters){Colors.END}")
@@ -771,172 +1720,194 @@ class TypingGame:
         print(f"{Colors.WHITE}11. 🎮 Typing Lessons{Colors.END}")
         print(f"{Colors.WHITE}12. Quit{Colors.END}")
         
-        self.show_recent_achievements()
+        self.show_recent_achievements(summary['recent_achievements'])
         
         return input(f"\n{Colors.CYAN}Enter your choice (1-12): {Colors.END}")
     
-    def show_recent_achievements(self):
-        """Show recently unlocked achievements"""
-        recent_achievements = self.db_manager.get_achievements()
-        if recent_achievements:
-            recent = recent_achievements[:3]  # Show last 3
+    def show_recent_achievements(self, recent):
+        """Show the last few unlocked achievements, newest first"""
+        if recent:
             print(f"\n{Colors.MAGENTA}🎉 Recent Achievements:{Colors.END}")
-            for ach_id, date in recent:
+            for ach_id in recent:
                 if ach_id in ACHIEVEMENTS:
                     ach = ACHIEVEMENTS[ach_id]
                     print(f"{Colors.YELLOW}{ach['icon']} {ach['name']}: {ach['desc']}{Colors.END}")
     
     def display_text_with_progress(self):
-        self.clear_screen()
+        """Render the live test screen through the diff renderer"""
+        if self.headless:
+            return
         
-        elapsed = (time.time() - self.start_time) if self.start_time else 0
+        elapsed = (time.perf_counter() - self.start_time) if self.start_time else 0
+        header_style = f"{Colors.CYAN}{Colors.BOLD}"
         
-        print(f"{Colors.CYAN}{Colors.BOLD}╔═══════════════════════════════════════════════════════════════════════════╗")
-        print(f"║          WPM: {self.live_wpm:6.1f}  │  Accuracy: {self.current_accuracy:5.1f}%  │  Time: {elapsed:5.1f}s                ║")
-        print(f"╚═══════════════════════════════════════════════════════════════════════════╝{Colors.END}")
-        print()
+        frame = [
+            _text_cells("╔═══════════════════════════════════════════════════════════════════════════╗", header_style),
+            _text_cells(f"║          WPM: {self.live_wpm:6.1f}  │  Accuracy: {self.current_accuracy:5.1f}%  │  Time: {elapsed:5.1f}s                ║", header_style),
+            _text_cells("╚═══════════════════════════════════════════════════════════════════════════╝", header_style),
+            []
+        ]
         
-        self.display_enhanced_text()
+        frame.extend(self.display_enhanced_text())
         
-        self.display_animated_progress_bar()
+        frame.extend(self.display_animated_progress_bar())
         
-        self.show_contextual_tips()
+        frame.extend(self.show_contextual_tips())
+        
+        if not self.start_time:
+            frame.append([])
+            frame.append(_text_cells("🚀 Start typing to begin the test...", Colors.YELLOW))
+            frame.append(_text_cells("Press Ctrl+C to stop the test early | ESC for menu", Colors.GRAY))
+        
+        self.renderer.render(frame)
     
     def display_enhanced_text(self):
-        """Display text with improved color coding and wrapping"""
-        typed_length = len(self.user_input)
-        display_lines = []
-        current_line = ""
-        line_length = 0
+        """Build the color-coded lines of the target text in a window that follows the cursor"""
+        starts, ends = _wrap_text(self.current_text, self.text_wrap_width)
+        if not starts:
+            return [[]]
         
-        for i, char in enumerate(self.current_text):
-            color_code = ""
-            char_display = char
-            
-            if i < typed_length:
-                if self.user_input[i] == char:
-                    if i >= typed_length - 5:  # Recent characters
-                        color_code = f"{Colors.GREEN}{Colors.BOLD}"
+        typed_length = len(self.user_input)
+        cursor_line = bisect.bisect_right(starts, typed_length) - 1
+        # Keep two lines of context above the cursor; only these lines are styled
+        first = max(0, min(cursor_line - 2, len(starts) - TEXT_WINDOW_LINES))
+        last = min(len(starts), first + TEXT_WINDOW_LINES)
+        
+        lines = []
+        for line_index in range(first, last):
+            line = []
+            for i in range(starts[line_index], ends[line_index]):
+                char = self.current_text[i]
+                color_code = ""
+                char_display = char
+                
+                if i < typed_length:
+                    if self.user_input[i] == char:
+                        if i >= typed_length - 5:  # Recent characters
+                            color_code = f"{Colors.GREEN}{Colors.BOLD}"
+                        else:
+                            color_code = Colors.GREEN
                     else:
-                        color_code = Colors.GREEN
-                else:
-                    color_code = f"{Colors.RED}{Colors.BOLD}{Colors.REVERSE}"
+                        color_code = f"{Colors.RED}{Colors.BOLD}{Colors.REVERSE}"
+                        if char == ' ':
+                            char_display = '⎵'  # Better space indicator
+                elif i == typed_length:
+                    color_code = f"{Colors.YELLOW}{Colors.BOLD}{Colors.UNDERLINE}{Colors.BLINK}"
                     if char == ' ':
-                        char_display = '⎵'  # Better space indicator
-            elif i == typed_length:
-                color_code = f"{Colors.YELLOW}{Colors.BOLD}{Colors.UNDERLINE}{Colors.BLINK}"
-                if char == ' ':
-                    char_display = '⎵'
-            else:
-                if char == ' ':
-                    char_display = '⎵'
+                        char_display = '⎵'
                 else:
-                    color_code = Colors.GRAY
+                    if char == ' ':
+                        char_display = '⎵'
+                    else:
+                        color_code = Colors.GRAY
+                line.append((color_code, char_display))
             
-            if char == ' ' and line_length > self.text_wrap_width - 10:
-                display_lines.append(current_line)
-                current_line = ""
-                line_length = 0
-            else:
-                current_line += f"{color_code}{char_display}{Colors.END}"
-                line_length += 1
-        
-        if current_line:
-            display_lines.append(current_line)
+            line_num = _text_cells(f"{line_index+1:2d}│", Colors.GRAY) if len(starts) > 1 else _text_cells("  ")
+            lines.append(line_num + [("", " ")] + line)
         
-        for i, line in enumerate(display_lines[:8]):  # Show max 8 lines
-            line_num = f"{Colors.GRAY}{i+1:2d}│{Colors.END}" if len(display_lines) > 1 else "  "
-            print(f"{line_num} {line}")
-        
-        if len(display_lines) > 8:
-            print(f"{Colors.GRAY}   ... {len(display_lines) - 8} more lines ...{Colors.END}")
-        print()
+        if last < len(starts):
+            lines.append(_text_cells(f"   ... {len(starts) - last} more lines ...", Colors.GRAY))
+        lines.append([])
+        return lines
     
     def display_animated_progress_bar(self):
-        """Display animated progress bar with multiple indicators"""
+        """Build the progress bar and trend lines"""
         progress = len(self.user_input) / len(self.current_text) if len(self.current_text) > 0 else 0
         bar_length = 60
         filled_length = int(bar_length * progress)
         
-        filled_part = ""
+        filled_part = []
         for i in range(filled_length):
             if i < filled_length * 0.7:
-                filled_part += f"{Colors.GREEN}█{Colors.END}"
+                filled_part.append((Colors.GREEN, "█"))
             elif i < filled_length * 0.9:
-                filled_part += f"{Colors.YELLOW}█{Colors.END}"
+                filled_part.append((Colors.YELLOW, "█"))
             else:
-                filled_part += f"{Colors.CYAN}█{Colors.END}"
-        
-        empty_part = f"{Colors.GRAY}{'░' * (bar_length - filled_length)}{Colors.END}"
+                filled_part.append((Colors.CYAN, "█"))
         
-        milestone_positions = [bar_length//4, bar_length//2, 3*bar_length//4]
-        bar_display = filled_part + empty_part
+        empty_part = _text_cells('░' * (bar_length - filled_length), Colors.GRAY)
         
-        print(f"Progress: {bar_display} {progress*100:.1f}%")
+        lines = [_text_cells("Progress: ") + filled_part + empty_part + _text_cells(f" {progress*100:.1f}%")]
         
         if len(self.wpm_history) >= 2:
             recent_avg = sum(list(self.wpm_history)[-3:]) / min(3, len(self.wpm_history))
             older_avg = sum(list(self.wpm_history)[-6:-3]) / min(3, len(self.wpm_history) - 3) if len(self.wpm_history) > 3 else recent_avg
             
             if recent_avg > older_avg + 2:
-                trend = f"{Colors.GREEN}📈 Improving{Colors.END}"
+                trend = _text_cells("📈 Improving", Colors.GREEN)
             elif recent_avg < older_avg - 2:
-                trend = f"{Colors.RED}📉 Declining{Colors.END}"
+                trend = _text_cells("📉 Declining", Colors.RED)
             else:
-                trend = f"{Colors.YELLOW}➡️  Stable{Colors.END}"
+                trend = _text_cells("➡️  Stable", Colors.YELLOW)
             
-            print(f"Trend: {trend}")
+            lines.append(_text_cells("Trend: ") + trend)
+        return lines
     
     def show_contextual_tips(self):
-        """Show helpful tips based on current typing performance"""
+        """Build a helpful tip line based on current typing performance"""
         tips = []
         
         if self.current_accuracy < 90:
-            tips.append(f"{Colors.RED}💡 Tip: Slow down and focus on accuracy first{Colors.END}")
+            tips.append(_text_cells("💡 Tip: Slow down and focus on accuracy first", Colors.RED))
         elif self.live_wpm < 30:
-            tips.append(f"{Colors.YELLOW}💡 Tip: Try to maintain a steady rhythm{Colors.END}")
+            tips.append(_text_cells("💡 Tip: Try to maintain a steady rhythm", Colors.YELLOW))
         elif self.mistakes > len(self.user_input) * 0.1:
-            tips.append(f"{Colors.BLUE}💡 Tip: Take a breath and reset your focus{Colors.END}")
+            tips.append(_text_cells("💡 Tip: Take a breath and reset your focus", Colors.BLUE))
         
         if tips:
-            print(f"\n{random.choice(tips)}")
+            return [[], random.choice(tips)]
+        return []
+    
+    @property
+    def user_input(self):
+        return self._user_input
+    
+    @user_input.setter
+    def user_input(self, value):
+        """Replace the input wholesale; the scorer rescans it before its counts are next read"""
+        self._user_input = value
+        self._scorer_synced = False
+    
+    def type_char(self, char):
+        """Append a character to the input and score it"""
+        self._user_input += char
+        self.scorer.append(char)
+    
+    def backspace(self):
+        """Remove the last typed character and undo its score"""
+        if self._user_input:
+            self._user_input = self._user_input[:-1]
+            self.scorer.backspace()
+    
+    def _sync_scorer(self):
+        """The scorer, rescanned once if the input was replaced or the target text changed"""
+        if not self._scorer_synced or self.scorer.target_text is not self.current_text:
+            self.scorer.reset(self.current_text)
+            self.scorer.rebuild(self._user_input)
+            self._scorer_synced = True
+        return self.scorer
     
-    def calculate_stats(self):
+    def calculate_stats(self, now=None):
         if not self.start_time or not self.user_input:
             return
         
-        elapsed_time = time.time() - self.start_time
+        elapsed_time = (now or time.perf_counter()) - self.start_time
         typed_length = len(self.user_input)
         
         if elapsed_time > 0:
             self.current_wpm = (typed_length / 5) / (elapsed_time / 60)
             self.live_wpm = self.performance_tracker.get_current_wpm()
         
-        correct_chars = 0
-        self.error_positions = []
-        
-        for i in range(min(typed_length, len(self.current_text))):
-            if self.user_input[i] == self.current_text[i]:
-                correct_chars += 1
-            else:
-                self.error_positions.append({
-                    'position': i,
-                    'expected': self.current_text[i],
-                    'typed': self.user_input[i],
-                    'context': self.current_text[max(0, i-2):i+3]
-                })
-        
-        self.correct_chars = correct_chars
-        self.mistakes = len(self.error_positions)
-        
-        if typed_length > 0:
-            self.current_accuracy = (correct_chars / typed_length) * 100
-        else:
-            self.current_accuracy = 100
+        scorer = self._sync_scorer()
+        self.correct_chars = scorer.correct_chars
+        self.mistakes = scorer.mistakes
+        self.current_accuracy = scorer.get_accuracy()
     
-    def run_test(self, word_list, test_mode="standard"):
-        self.current_text = " ".join(word_list)
-        self.user_input = ""
+    def start_test(self, text):
+        """Reset all per-test state for a new target text"""
+        self.ensure_user_data()  # Live tips and the achievement check need the history
+        self.current_text = text
+        self._user_input = ""
         self.start_time = None
         self.end_time = None
         self.current_wpm = 0
@@ -944,57 +1915,227 @@ class TypingGame:
         self.live_wpm = 0
         self.mistakes = 0
         self.error_positions = []
+        self.scorer.reset(self.current_text)
+        self._scorer_synced = True
+        self.keystroke_log = KeystrokeLog()
+        self.last_key_time = None
         self.is_running = True
         
-        self.performance_tracker = PerformanceTracker()
+        self.performance_tracker = PerformanceTracker(self.keyboard_layout)
+        self.renderer = FrameRenderer()
+    
+    def run_test(self, word_list, test_mode="standard"):
+        self.start_test(" ".join(word_list))
         
         self.display_text_with_progress()
-        print(f"\n{Colors.YELLOW}🚀 Start typing to begin the test...{Colors.END}")
-        print(f"{Colors.GRAY}Press Ctrl+C to stop the test early | ESC for menu{Colors.END}")
         
-        self.start_real_time_wpm_thread()
+        import asyncio  # Deferred: asyncio dominates import time and only a live test needs it
+        try:
+            asyncio.run(self._run_test_loop())
+        except KeyboardInterrupt:
+            pass
+        
+        self.error_positions = self._sync_scorer().get_error_positions()
         
+        self.is_running = False
+        
+        self.show_enhanced_results()
+    
+    def run_headless(self, target_text, keystream, persist=True):
+        """Run a full test without a TTY from (perf_counter_ns, key) pairs; returns the result dict or None"""
+        self.headless = True
         try:
-            while self.is_running:
-                char = self.get_char()
-                
-                if char == '\x03':  # Ctrl+C
+            self.start_test(target_text)
+            for timestamp_ns, char in keystream:
+                if not self.handle_key(timestamp_ns, char):
                     break
-                elif char == '\x1b':  # ESC
+            
+            self.error_positions = self._sync_scorer().get_error_positions()
+            self.is_running = False
+            if not self.start_time:
+                return None
+            if self.end_time is None:
+                self.end_time = self.last_key_time
+            
+            summary = self.summarize_test()
+            if not persist:
+                return summary
+            self.save_test(summary)
+            self.result_writer.flush()  # Callers read test_id straight away
+            return summary
+        finally:
+            self.headless = False
+    
+    async def _run_test_loop(self):
+        """Drive keyboard input, idle ticks and rendering from one event loop and clock"""
+        import asyncio
+        loop = asyncio.get_running_loop()
+        ticker = asyncio.create_task(self._idle_ticker())
+        try:
+            with KeyboardReader() as keyboard:
+                self.keyboard = keyboard
+                while self.is_running:
+                    timestamp_ns, char = await self._next_key(loop)
+                    if not self.handle_key(timestamp_ns, char):
+                        break
+        finally:
+            ticker.cancel()
+            self.keyboard = None
+    
+    async def _next_key(self, loop):
+        """Wait for the next key without blocking the event loop"""
+        keyboard = self.keyboard
+        if keyboard.pending:
+            return keyboard.pending.popleft()
+        
+        if keyboard.selector is None or msvcrt is not None:
+            # No raw terminal to watch (Windows or piped stdin): read in a worker thread
+            return await loop.run_in_executor(None, self.get_char)
+        
+        future = loop.create_future()
+        timer = None
+        
+        def on_readable():
+            nonlocal timer
+            if future.done():
+                return
+            key = keyboard.read_key(0)
+            if key is not None:
+                future.set_result(key)
+            elif keyboard.buffer:
+                # Part of an escape sequence: look again once the rest is overdue, ESC alone sends no more bytes
+                timer = loop.call_later(keyboard.escape_wait(), on_readable)
+        
+        loop.add_reader(keyboard.fd, on_readable)
+        if keyboard.buffer:
+            on_readable()
+        try:
+            return await future
+        finally:
+            loop.remove_reader(keyboard.fd)
+            if timer is not None:
+                timer.cancel()
+    
+    async def _idle_ticker(self):
+        """Refresh the live WPM and timer only when no key arrived during the last interval"""
+        import asyncio
+        while self.is_running:
+            await asyncio.sleep(self.idle_tick_interval)
+            now = time.perf_counter()
+            if not self.start_time or not self.user_input:
+                continue
+            if self.last_key_time and now - self.last_key_time < self.idle_tick_interval:
+                continue  # A keystroke already refreshed the screen
+            
+            elapsed_time = now - self.start_time
+            if elapsed_time > 0:
+                # Same smoothed figure calculate_stats shows, decayed by the keyless interval
+                self.current_wpm = (len(self.user_input) / 5) / (elapsed_time / 60)
+                self.performance_tracker.add_idle_sample(now)
+                self.live_wpm = self.performance_tracker.get_current_wpm()
+            self.display_text_with_progress()
+    
+    def handle_key(self, timestamp_ns, char):
+        """Apply one key to the test state; returns False when the test should stop"""
+        timestamp = timestamp_ns / 1e9
+        
+        if char == '\x03':  # Ctrl+C
+            return False
+        elif char == '\x1b':  # ESC
+            if not self.headless:
+                with self.keyboard.paused():
                     print(f"\n{Colors.YELLOW}Test paused. Press Enter to continue or 'q' to quit...{Colors.END}")
                     choice = input()
-                    if choice.lower() == 'q':
-                        break
-                    continue
-                elif char == '\r' or char == '\n':  # Enter
-                    if self.user_input.strip():
-                        self.user_input += " "
-                elif char == '\x08' or char == '\x7f':  # Backspace
-                    if self.user_input:
-                        self.user_input = self.user_input[:-1]
-                elif char.isprintable():
-                    if not self.start_time:
-                        self.start_time = time.time()
-                    
-                    self.user_input += char
-                
-                self.calculate_stats()
-                self.display_text_with_progress()
-                
-                if len(self.user_input) >= len(self.current_text):
-                    self.end_time = time.time()
-                    break
+                if choice.lower() == 'q':
+                    return False
+                self.renderer.invalidate()
+            if self.start_time:
+                self.keystroke_log.record(timestamp_ns, char, KeystrokeLog.ACTION_PAUSE)
+            self.display_text_with_progress()
+            return True
+        elif char == '\r' or char == '\n':  # Enter
+            if self.user_input.strip():
+                self.type_char(" ")
+                self.keystroke_log.record(timestamp_ns, " ", KeystrokeLog.ACTION_TYPE)
+        elif char == '\x08' or char == '\x7f':  # Backspace
+            if self.user_input and self.start_time:
+                self.keystroke_log.record(timestamp_ns, self.user_input[-1], KeystrokeLog.ACTION_BACKSPACE)
+            self.backspace()
+        elif char.isprintable():
+            if not self.start_time:
+                self.start_time = timestamp
+            
+            self.type_char(char)
+            self.keystroke_log.record(timestamp_ns, char, KeystrokeLog.ACTION_TYPE)
+        else:
+            return True  # Unhandled control key or escape sequence
         
-        except KeyboardInterrupt:
-            pass
+        if self.start_time:
+            self.last_key_time = timestamp
+            self.performance_tracker.add_keystroke(timestamp, len(self.user_input))
+        
+        self.calculate_stats(timestamp)
+        self.display_text_with_progress()
         
-        self.stop_wpm_thread = True
-        if self.wpm_update_thread:
-            self.wpm_update_thread.join(timeout=1)
+        if len(self.user_input) >= len(self.current_text):
+            self.end_time = timestamp
+            return False
+        return True
+    
+    def summarize_test(self):
+        """Collect the finished test's metrics and error patterns without touching the database"""
+        test_duration = (self.end_time or time.perf_counter()) - self.start_time
         
-        self.is_running = False
+        enhanced_patterns = None
+        if self.error_positions:
+            enhanced_patterns = self.performance_tracker.detect_typing_patterns(self.user_input, self.current_text)
         
-        self.show_enhanced_results()
+        return {
+            'duration': test_duration,
+            'wpm': self.current_wpm,
+            'accuracy': self.current_accuracy,
+            'mistakes': self.mistakes,
+            'words_typed': len(self.user_input.split()),
+            'characters_typed': len(self.user_input),
+            'correct_characters': self.correct_chars,
+            'consistency': self.performance_tracker.calculate_consistency_score(),
+            'insights': self.performance_tracker.get_performance_insights(),
+            'error_positions': self.error_positions,
+            'patterns': enhanced_patterns,
+            'test_id': None,
+            'new_achievements': []
+        }
+    
+    def save_test(self, summary):
+        """Queue a summarized test for the background writer and update session history, difficulty and achievements"""
+        test_duration = summary['duration']
+        result_data = (
+            self.current_wpm, self.current_accuracy, self.mistakes,
+            test_duration, "adaptive" if self.auto_difficulty else "manual",
+            summary['words_typed'], summary['characters_typed'], self.correct_chars
+        )
+        error_data = [
+            (error['expected'], error['typed'], error['position'], error['context'])
+            for error in self.error_positions
+        ]
+        
+        self.wpm_history.append(self.current_wpm)
+        self.accuracy_history.append(self.current_accuracy)
+        self.total_tests += 1
+        self.total_time_typed += test_duration
+        
+        self.difficulty_adjuster.add_performance(self.current_wpm, self.current_accuracy)
+        
+        summary['new_achievements'] = self.check_achievements(test_duration)
+        self.result_writer.submit({
+            'result': result_data,
+            'errors': error_data,
+            'keystroke_log': self.keystroke_log,
+            'achievements': summary['new_achievements'],
+            'check_streak': self.achievement_engine.check_streak,
+            'date': datetime.now().date()
+        }, summary)
+        return summary
     
     def show_enhanced_results(self):
         self.clear_screen()
@@ -1007,21 +2148,18 @@ class TypingGame:
             input(f"\n{Colors.CYAN}Press Enter to continue...{Colors.END}")
             return
         
-        test_duration = (self.end_time or time.time()) - self.start_time
-        words_typed = len(self.user_input.split())
-        chars_typed = len(self.user_input)
-        
-        performance_insights = self.performance_tracker.get_performance_insights()
+        summary = self.summarize_test()
+        self.save_test(summary)  # Queued now so leaving the results screen early can't lose the test
+        performance_insights = summary['insights']
         
-        print(f"\n{Colors.YELLOW}⏱️  Time: {Colors.END}{test_duration:.1f} seconds")
+        print(f"\n{Colors.YELLOW}⏱️  Time: {Colors.END}{summary['duration']:.1f} seconds")
         print(f"{Colors.YELLOW}🏃 WPM: {Colors.END}{self.current_wpm:.1f}")
         print(f"{Colors.YELLOW}🎯 Accuracy: {Colors.END}{self.current_accuracy:.1f}%")
         print(f"{Colors.YELLOW}❌ Mistakes: {Colors.END}{self.mistakes}")
-        print(f"{Colors.YELLOW}📝 Words Typed: {Colors.END}{words_typed}")
-        print(f"{Colors.YELLOW}🔤 Characters: {Colors.END}{chars_typed}")
+        print(f"{Colors.YELLOW}📝 Words Typed: {Colors.END}{summary['words_typed']}")
+        print(f"{Colors.YELLOW}🔤 Characters: {Colors.END}{summary['characters_typed']}")
         
-        consistency = self.performance_tracker.calculate_consistency_score()
-        print(f"{Colors.YELLOW}📊 Consistency: {Colors.END}{consistency:.1f}%")
+        print(f"{Colors.YELLOW}📊 Consistency: {Colors.END}{summary['consistency']:.1f}%")
         
         if performance_insights.get('status') != 'insufficient_data':
             rhythm_data = performance_insights.get('rhythm_analysis', {})
@@ -1030,44 +2168,27 @@ class TypingGame:
                 rhythm_score = rhythm_data.get('velocity_consistency', 0)
                 print(f"{Colors.YELLOW}🎵 Rhythm: {Colors.END}{rhythm_category.replace('_', ' ').title()} ({rhythm_score:.1f}%)")
         
+        if self.show_render_stats:
+            render_stats = self.renderer.get_stats()
+            print(f"{Colors.GRAY}🖥️  Render: {render_stats['frames']} frames, "
+                  f"{render_stats['avg_bytes_per_frame']:.0f} B/frame, "
+                  f"{render_stats['avg_frame_ms']:.2f} ms/frame (max {render_stats['max_frame_ms']:.2f} ms){Colors.END}")
+            writer_stats = self.result_writer.get_stats()
+            print(f"{Colors.GRAY}💾 Writes: {writer_stats['written']} saved, {writer_stats['failed']} failed, "
+                  f"queue depth {writer_stats['depth']} (max {writer_stats['max_depth']}){Colors.END}")
+        
         input(f"\n{Colors.CYAN}📊 Core metrics displayed. Press Enter to see performance analysis...{Colors.END}")
         
         self.display_enhanced_performance_analysis(performance_insights)
         
         input(f"\n{Colors.CYAN}📈 Performance analysis complete. Press Enter to continue...{Colors.END}")
         
-        result_data = (
-            self.current_wpm, self.current_accuracy, self.mistakes,
-            test_duration, "adaptive" if self.auto_difficulty else "manual",
-            words_typed, chars_typed, self.correct_chars
-        )
-        test_id = self.db_manager.save_test_result(result_data)
-        
-        if self.error_positions:
-            enhanced_patterns = self.performance_tracker.detect_typing_patterns(self.user_input, self.current_text)
-            
-            error_data = []
-            for error in self.error_positions:
-                error_data.append((
-                    error['expected'], error['typed'], 
-                    error['position'], error['context']
-                ))
-            self.db_manager.save_error_pattern(test_id, error_data)
-            
-            self.display_enhanced_error_analysis(enhanced_patterns)
+        if summary['patterns']:
+            self.display_enhanced_error_analysis(summary['patterns'])
         
-        self.wpm_history.append(self.current_wpm)
-        self.accuracy_history.append(self.current_accuracy)
-        self.total_tests += 1
-        self.total_time_typed += test_duration
-        
-        self.difficulty_adjuster.add_performance(self.current_wpm, self.current_accuracy)
-        
-        self.check_achievements(test_duration)
-        
-        if hasattr(self, '_new_achievements_displayed') and self._new_achievements_displayed:
+        if summary['new_achievements']:
+            self.display_new_achievements(summary['new_achievements'])
             input(f"\n{Colors.CYAN}🎉 Achievement notifications shown. Press Enter for recommendations...{Colors.END}")
-            self._new_achievements_displayed = False
         
         self.show_enhanced_performance_feedback(performance_insights)
         
@@ -1246,49 +2367,21 @@ class TypingGame:
             for error_type, count in sorted(common_errors.items(), key=lambda x: x[1], reverse=True)[:3]:
                 print(f"    {error_type}: {count} times")
     
+    def load_achievement_engine(self):
+        """Seed the achievement engine's counters from the database"""
+        self.achievement_engine = AchievementEngine(**self.db_manager.get_achievement_counters())
+        self.achievements_unlocked = self.achievement_engine.unlocked
+    
     def check_achievements(self, test_duration):
-        """Check and unlock achievements"""
-        new_achievements = []
-        
-        if self.current_wpm >= 100 and "speed_machine" not in self.achievements_unlocked:
-            if self.db_manager.unlock_achievement("speed_machine"):
-                new_achievements.append("speed_machine")
-        elif self.current_wpm >= 80 and "speed_demon" not in self.achievements_unlocked:
-            if self.db_manager.unlock_achievement("speed_demon"):
-                new_achievements.append("speed_demon")
-        
-        if self.current_accuracy == 100 and "perfectionist" not in self.achievements_unlocked:
-            if self.db_manager.unlock_achievement("perfectionist"):
-                new_achievements.append("perfectionist")
-        elif self.current_accuracy >= 98 and "accuracy_master" not in self.achievements_unlocked:
-            if self.db_manager.unlock_achievement("accuracy_master"):
-                new_achievements.append("accuracy_master")
-        
-        if test_duration >= 300 and "marathon" not in self.achievements_unlocked:  # 5 minutes
-            if self.db_manager.unlock_achievement("marathon"):
-                new_achievements.append("marathon")
-        
-        if self.total_tests >= 10 and "persistent" not in self.achievements_unlocked:
-            if self.db_manager.unlock_achievement("persistent"):
-                new_achievements.append("persistent")
-        
-        current_hour = datetime.now().hour
-        if current_hour < 8 and "early_bird" not in self.achievements_unlocked:
-            if self.db_manager.unlock_achievement("early_bird"):
-                new_achievements.append("early_bird")
-        elif current_hour >= 22 and "night_owl" not in self.achievements_unlocked:
-            if self.db_manager.unlock_achievement("night_owl"):
-                new_achievements.append("night_owl")
-        
-        if new_achievements:
-            print(f"\n{Colors.MAGENTA}{Colors.BOLD}🎉 NEW ACHIEVEMENTS UNLOCKED! 🎉{Colors.END}")
-            for ach_id in new_achievements:
-                ach = ACHIEVEMENTS[ach_id]
-                print(f"{Colors.YELLOW}{ach['icon']} {ach['name']}: {ach['desc']}{Colors.END}")
-                self.achievements_unlocked.add(ach_id)
-            self._new_achievements_displayed = True
-        else:
-            self._new_achievements_displayed = False
+        """Newly earned achievement ids for the last test; the result writer persists them"""
+        return self.achievement_engine.record(self.current_wpm, self.current_accuracy, test_duration)
+    
+    def display_new_achievements(self, new_achievements):
+        """Announce achievements unlocked by the last test"""
+        print(f"\n{Colors.MAGENTA}{Colors.BOLD}🎉 NEW ACHIEVEMENTS UNLOCKED! 🎉{Colors.END}")
+        for ach_id in new_achievements:
+            ach = ACHIEVEMENTS[ach_id]
+            print(f"{Colors.YELLOW}{ach['icon']} {ach['name']}: {ach['desc']}{Colors.END}")
     
     def show_performance_feedback(self):
         """Show personalized performance feedback and recommendations"""
@@ -1321,58 +2414,27 @@ class TypingGame:
     
     def analyze_finger_errors(self):
         """Analyze which fingers are making the most errors"""
-        finger_map = {
-            'left_pinky': 'qaz',
-            'left_ring': 'wsx',
-            'left_middle': 'edc',
-            'left_index': 'rfvtgb',
-            'right_index': 'yhnujm',
-            'right_middle': 'ik,',
-            'right_ring': 'ol.',
-            'right_pinky': 'p;/[\']'
-        }
-        
         finger_errors = defaultdict(int)
         for error in self.error_positions:
-            char = error['expected'].lower()
-            for finger, chars in finger_map.items():
-                if char in chars:
-                    finger_errors[finger] += 1
-                    break
+            key = self.keyboard_layout.lookup(error['expected'])
+            if key:
+                finger_errors[key['finger']] += 1
         
         problem_fingers = sorted(finger_errors.items(), key=lambda x: x[1], reverse=True)[:2]
         return [finger.replace('_', ' ') for finger, count in problem_fingers if count > 1]
     
     def get_char(self):
-        """Get a single character input with robust error handling"""
+        """Get the next key with its read-time perf_counter_ns timestamp"""
         try:
-            if os.name == 'nt':  # Windows
-                import msvcrt
-                char = msvcrt.getch()
-                if isinstance(char, bytes):
-                    try:
-                        return char.decode('utf-8')
-                    except UnicodeDecodeError:
-                        try:
-                            return char.decode('cp1252')  # Windows fallback
-                        except UnicodeDecodeError:
-                            return char.decode('ascii', errors='ignore')
-                return char
-            else:  # Unix/Linux/macOS
-                import termios, tty
-                fd = sys.stdin.fileno()
-                old_settings = termios.tcgetattr(fd)
-                try:
-                    tty.setraw(sys.stdin.fileno())
-                    char = sys.stdin.read(1)
-                    return char
-                finally:
-                    termios.tcsetattr(fd, termios.TCSADRAIN, old_settings)
-        except (UnicodeDecodeError, ImportError, OSError, AttributeError) as e:
+            key = self.keyboard.read_key()
+            if key is not None:
+                return key
+            raise OSError("Keyboard input closed")
+        except (UnicodeDecodeError, OSError, AttributeError) as e:
             try:
-                return input("Press Enter and type a character: ")[:1]
+                return time.perf_counter_ns(), input("Press Enter and type a character: ")[:1]
             except (EOFError, KeyboardInterrupt):
-                return '\x03'  # Return Ctrl+C signal
+                return time.perf_counter_ns(), '\x03'  # Return Ctrl+C signal
     
     def show_advanced_statistics(self):
         """Display comprehensive statistics and analytics"""
@@ -1381,31 +2443,27 @@ class TypingGame:
         print(f"║                    ADVANCED STATISTICS                       ║")
         print(f"╚═══════════════════════════════════════════════════════════════╝{Colors.END}")
         
-        stats_30d = self.db_manager.get_statistics(days=30)
-        stats_7d = self.db_manager.get_statistics(days=7)
+        self.result_writer.flush()  # Include tests still queued for writing
+        summary_30d = self.db_manager.get_rollup_summary(days=30)
+        summary_7d = self.db_manager.get_rollup_summary(days=7)
         
-        if not stats_30d:
+        if not summary_30d['tests']:
             print(f"\n{Colors.YELLOW}No test results yet. Take some tests first!{Colors.END}")
             input(f"\n{Colors.CYAN}Press Enter to continue...{Colors.END}")
             return
         
-        wpm_scores = [stat[2] for stat in stats_30d]
-        accuracy_scores = [stat[3] for stat in stats_30d]
-        
         print(f"\n{Colors.YELLOW}📊 30-Day Performance Summary:{Colors.END}")
-        print(f"  Tests completed: {len(stats_30d)}")
-        print(f"  Average WPM: {statistics.mean(wpm_scores):.1f}")
-        print(f"  Best WPM: {max(wpm_scores):.1f}")
-        print(f"  WPM Standard Deviation: {statistics.stdev(wpm_scores) if len(wpm_scores) > 1 else 0:.1f}")
-        print(f"  Average Accuracy: {statistics.mean(accuracy_scores):.1f}%")
-        print(f"  Best Accuracy: {max(accuracy_scores):.1f}%")
-        
-        if stats_7d:
-            week_wpm = [stat[2] for stat in stats_7d]
-            week_acc = [stat[3] for stat in stats_7d]
+        print(f"  Tests completed: {summary_30d['tests']}")
+        print(f"  Average WPM: {summary_30d['avg_wpm']:.1f}")
+        print(f"  Best WPM: {summary_30d['best_wpm']:.1f}")
+        print(f"  WPM Standard Deviation: {summary_30d['wpm_stdev']:.1f}")
+        print(f"  Average Accuracy: {summary_30d['avg_accuracy']:.1f}%")
+        print(f"  Best Accuracy: {summary_30d['best_accuracy']:.1f}%")
+        
+        if summary_7d['tests']:
             print(f"\n{Colors.BLUE}📈 This Week vs Last 30 Days:{Colors.END}")
-            print(f"  Weekly WPM: {statistics.mean(week_wpm):.1f} (Δ{statistics.mean(week_wpm) - statistics.mean(wpm_scores):+.1f})")
-            print(f"  Weekly Accuracy: {statistics.mean(week_acc):.1f}% (Δ{statistics.mean(week_acc) - statistics.mean(accuracy_scores):+.1f}%)")
+            print(f"  Weekly WPM: {summary_7d['avg_wpm']:.1f} (Δ{summary_7d['avg_wpm'] - summary_30d['avg_wpm']:+.1f})")
+            print(f"  Weekly Accuracy: {summary_7d['avg_accuracy']:.1f}% (Δ{summary_7d['avg_accuracy'] - summary_30d['avg_accuracy']:+.1f}%)")
         
         print(f"\n{Colors.RED}🔍 Error Analysis:{Colors.END}")
         error_patterns = self.db_manager.get_error_analysis(days=30)
@@ -1416,12 +2474,14 @@ class TypingGame:
         else:
             print("  No error data available")
         
-        self.show_performance_trends(stats_30d)
+        self.show_performance_trends(self.db_manager.get_recent_results(days=30, limit=10))
+        self.show_history_analysis()
         
-        streak = self.db_manager.get_streak_count()
+        streak = self.db_manager.get_streak_info()
         print(f"\n{Colors.MAGENTA}🔥 Streak Information:{Colors.END}")
-        print(f"  Current streak: {streak} days")
-        print(f"  Daily goal progress: {len(self.db_manager.get_statistics(days=1))}/{self.daily_goal} tests today")
+        print(f"  Current streak: {streak['current']} days")
+        print(f"  Longest streak: {streak['longest']} days")
+        print(f"  Daily goal progress: {self.db_manager.get_tests_today()}/{self.daily_goal} tests today")
         
         input(f"\n{Colors.CYAN}Press Enter to continue...{Colors.END}")
     
@@ -1449,17 +2509,32 @@ class TypingGame:
     
     def calculate_trend_slope(self, x, y):
         """Calculate simple linear regression slope"""
-        n = len(x)
-        if n < 2:
-            return 0
-        
-        x_mean = sum(x) / n
-        y_mean = sum(y) / n
-        
-        numerator = sum((x[i] - x_mean) * (y[i] - y_mean) for i in range(n))
-        denominator = sum((x[i] - x_mean) ** 2 for i in range(n))
+        return load_analytics().slope(y, x)
+    
+    def show_history_analysis(self):
+        """Distribution, long-term trend and week-over-week change across the whole history"""
+        analytics = load_analytics()
+        summary = analytics.summarize(analytics.ResultSeries.from_rows(self.db_manager.get_result_history()))
+        if not summary:
+            return
         
-        return numerator / denominator if denominator != 0 else 0
+        wpm = summary['wpm']
+        rolling = summary['rolling_wpm']
+        print(f"\n{Colors.CYAN}📐 All-Time Analysis ({summary['tests']} tests):{Colors.END}")
+        print(f"  WPM median: {wpm['p50']:.1f} | 75th percentile: {wpm['p75']:.1f} | 90th percentile: {wpm['p90']:.1f}")
+        print(f"  Accuracy median: {summary['accuracy']['p50']:.1f}% | 25th percentile: {summary['accuracy']['p25']:.1f}%")
+        print(f"  Rolling {analytics.ROLLING_WINDOW}-test WPM: {rolling['latest']:.1f} (best {rolling['best']:.1f})")
+        print(f"  Long-term trend: {summary['wpm_per_week']:+.2f} WPM per week")
+        
+        print("  Week over week:")
+        for week in summary['weekly']:
+            weeks_ago = week['weeks_ago']
+            label = "This week" if not weeks_ago else f"{weeks_ago} week{'s' if weeks_ago > 1 else ''} ago"
+            if not week['tests']:
+                print(f"    {label:12} no tests")
+                continue
+            delta = f" (Δ{week['wpm_delta']:+.1f})" if week['wpm_delta'] is not None else ""
+            print(f"    {label:12} {week['wpm']:.1f} WPM{delta}, {week['accuracy']:.1f}% over {week['tests']} tests")
     
     def show_achievements_menu(self):
         """Display achievements menu with progress tracking"""
@@ -1468,6 +2543,7 @@ class TypingGame:
         print(f"║                         ACHIEVEMENTS                         ║")
         print(f"╚═══════════════════════════════════════════════════════════════╝{Colors.END}")
         
+        self.result_writer.flush()  # Include achievements still queued for writing
         unlocked_achievements = self.db_manager.get_achievements()
         unlocked_ids = {ach[0] for ach in unlocked_achievements}
         
@@ -1496,15 +2572,15 @@ class TypingGame:
     
     def show_achievement_progress(self, unlocked_ids):
         """Show progress towards unlocking achievements"""
-        stats = self.db_manager.get_statistics(days=30)
+        summary = self.db_manager.get_rollup_summary(days=30)
         
-        if not stats:
+        if not summary['tests']:
             print("  Complete some tests to see progress!")
             return
         
-        best_wpm = max(stat[2] for stat in stats) if stats else 0
-        best_acc = max(stat[3] for stat in stats) if stats else 0
-        test_count = len(stats)
+        best_wpm = summary['best_wpm']
+        best_acc = summary['best_accuracy']
+        test_count = summary['tests']
         
         if "speed_demon" not in unlocked_ids:
             progress = min(100, (best_wpm / 80) * 100)
@@ -1537,9 +2613,15 @@ class TypingGame:
             print(f"4. Daily Goal: {self.daily_goal} tests")
             print(f"5. Reset All Statistics")
             print(f"6. Export Statistics")
-            print(f"7. Back to Main Menu")
+            print(f"7. Import Statistics")
+            print(f"8. Render Stats Display: {Colors.GREEN + 'ON' if self.show_render_stats else Colors.RED + 'OFF'}{Colors.END}")
+            corpus_name = os.path.basename(self.word_corpus.corpus_path) if self.word_corpus else "built-in"
+            print(f"9. Common Words Corpus: {corpus_name}")
+            print(f"10. Keyboard Layout: {self.keyboard_layout.name}")
+            print(f"11. Rebuild Error Statistics")
+            print(f"12. Back to Main Menu")
             
-            choice = input(f"\n{Colors.CYAN}Choose setting to change (1-7): {Colors.END}")
+            choice = input(f"\n{Colors.CYAN}Choose setting to change (1-12): {Colors.END}")
             
             if choice == "1":
                 self.auto_difficulty = not self.auto_difficulty
@@ -1576,61 +2658,149 @@ class TypingGame:
             elif choice == "6":
                 self.export_statistics()
             elif choice == "7":
+                self.import_statistics()
+            elif choice == "8":
+                self.show_render_stats = not self.show_render_stats
+                print(f"Render stats display {'enabled' if self.show_render_stats else 'disabled'}")
+                time.sleep(1)
+            elif choice == "9":
+                self.choose_word_corpus()
+            elif choice == "10":
+                self.choose_keyboard_layout()
+            elif choice == "11":
+                cells = self.db_manager.rebuild_confusion_matrix()
+                print(f"Confusion matrix rebuilt ({cells} entries)")
+                time.sleep(1)
+            elif choice == "12":
                 break
             else:
                 print("Invalid choice")
                 time.sleep(1)
     
+    def choose_word_corpus(self):
+        """Switch Common Words mode to a compiled corpus, compiling plain frequency lists first"""
+        path = input("Enter path to a word list or .stc corpus (blank for built-in): ").strip()
+        if not path:
+            self.word_corpus = None
+            print("Using the built-in common words")
+            time.sleep(1)
+            return
+        
+        try:
+            if not path.endswith(".stc"):
+                corpus_path = os.path.splitext(path)[0] + ".stc"
+                print(f"Compiled {compile_corpus(path, corpus_path)} words into {corpus_path}")
+                path = corpus_path
+            corpus = WordCorpus(path)
+            print(f"Loaded corpus with {len(corpus)} words")
+            self.word_corpus = corpus
+        except (OSError, ValueError) as e:
+            print(f"Error loading word corpus: {e}")
+        time.sleep(1)
+    
+    def set_keyboard_layout(self, name):
+        """Use a built-in layout name or a JSON layout file for finger analysis; False if it cannot be loaded"""
+        try:
+            self.keyboard_layout = get_layout(name.lower() if name.lower() in LAYOUTS else name)
+        except (OSError, ValueError) as e:
+            print(f"Error loading keyboard layout: {e}")
+            return False
+        self.performance_tracker.layout = self.keyboard_layout
+        return True
+    
+    def choose_keyboard_layout(self):
+        """Pick the keyboard layout that finger error analysis assumes"""
+        name = input(f"Enter a layout ({', '.join(LAYOUTS)}) or path to a JSON layout file: ").strip()
+        if name and self.set_keyboard_layout(name):
+            print(f"Using the {self.keyboard_layout.name} layout")
+        time.sleep(1)
+    
     def reset_statistics(self):
         """Reset all user statistics"""
         try:
-            os.remove("typing_stats.db")
-            self.db_manager = DatabaseManager()  # Recreate database
+            self.result_writer.flush()
+            self.db_manager.close()
+            os.remove(self.db_manager.db_path)
+            self.db_manager = DatabaseManager(self.db_manager.db_path)  # Recreate database; the setter repoints the writer
             self.wpm_history.clear()
             self.accuracy_history.clear()
-            self.achievements_unlocked.clear()
+            self.user_data_loaded = False
             self.total_tests = 0
             self.current_streak = 0
         except Exception as e:
             print(f"Error resetting statistics: {e}")
     
+    def export_settings(self):
+        """Current game settings as export records"""
+        settings = {
+            "auto_difficulty": self.auto_difficulty,
+            "show_live_wpm": self.show_live_wpm,
+            "text_wrap_width": self.text_wrap_width,
+            "daily_goal": self.daily_goal,
+            "keyboard_layout": self.keyboard_layout.source
+        }
+        return [{"type": "setting", "setting_key": key, "setting_value": json.dumps(value)} for key, value in settings.items()]
+    
     def export_statistics(self):
-        """Export statistics to JSON file"""
+        """Stream every result, error pattern, keystroke log, achievement and setting to an NDJSON or CSV file"""
+        export_format = "csv" if input("Export format - 1. NDJSON  2. CSV (1-2): ").strip() == "2" else "ndjson"
+        filename = f"typing_stats_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{'csv' if export_format == 'csv' else 'ndjson'}"
         try:
-            stats = self.db_manager.get_statistics(days=365)  # Last year
-            achievements = self.db_manager.get_achievements()
+            self.result_writer.flush()  # Include tests still queued for writing
+            records = chain(
+                [{"type": "export", "export_date": datetime.now().isoformat()}],
+                self.db_manager.iter_export_records(),
+                self.export_settings()
+            )
             
-            export_data = {
-                "export_date": datetime.now().isoformat(),
-                "total_tests": len(stats),
-                "statistics": [
-                    {
-                        "date": stat[1],
-                        "wpm": stat[2],
-                        "accuracy": stat[3],
-                        "mistakes": stat[4],
-                        "duration": stat[5],
-                        "difficulty": stat[6]
-                    } for stat in stats
-                ],
-                "achievements": [
-                    {
-                        "achievement_id": ach[0],
-                        "date_earned": ach[1]
-                    } for ach in achievements
-                ]
-            }
-            
-            filename = f"typing_stats_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-            with open(filename, 'w') as f:
-                json.dump(export_data, f, indent=2)
+            with open(filename, 'w', encoding='utf-8', newline='') as f:
+                rows = transfer.write_export(records, f, export_format)
             
-            print(f"Statistics exported to {filename}")
+            print(f"Exported {rows} records to {filename}")
             time.sleep(2)
         except Exception as e:
             print(f"Error exporting statistics: {e}")
+            if os.path.exists(filename):
+                os.remove(filename)  # Never leave a truncated export behind
             time.sleep(2)
     
+    def apply_settings(self, settings):
+        """Restore game settings from exported JSON-encoded values, ignoring unknown or invalid ones"""
+        for key, value in settings.items():
+            try:
+                value = json.loads(value)
+            except (TypeError, ValueError):
+                continue
+            if key in ("auto_difficulty", "show_live_wpm") and isinstance(value, bool):
+                setattr(self, key, value)
+            elif key == "text_wrap_width" and isinstance(value, int):
+                self.text_wrap_width = max(40, min(120, value))
+            elif key == "daily_goal" and isinstance(value, int):
+                self.daily_goal = max(1, min(20, value))
+            elif key == "keyboard_layout" and isinstance(value, str):
+                self.set_keyboard_layout(value)
+    
+    def import_statistics(self):
+        """Import an NDJSON or CSV export, skipping tests that are already stored"""
+        path = input("Enter path to an exported statistics file: ").strip()
+        if not path:
+            return
+        
+        try:
+            self.result_writer.flush()  # Queued tests must be stored before duplicates are checked
+            with open(path, 'r', encoding='utf-8', newline='') as f:
+                counts = self.db_manager.import_records(transfer.iter_import_records(f))
+        except OSError as e:
+            print(f"Error reading {path}: {e}")
+            counts = None
+        
+        if counts:
+            self.apply_settings(counts["settings"])
+            self.user_data_loaded = False  # History and achievement counters reload before the next test
+            print(f"Imported {counts['results']} tests ({counts['duplicates']} already present), "
+                  f"{counts['errors']} error records and {counts['achievements']} achievements")
+        time.sleep(2)
+    
     def show_typing_lessons(self):
         """Display typing lessons menu"""
         self.clear_screen()
@@ -1697,8 +2867,6 @@ class TypingGame:
     def run(self):
         """Main game loop with enhanced menu system"""
         print(f"{Colors.GREEN}Welcome to SNAKETYPE - Enhanced Typing Trainer!{Colors.END}")
-        print(f"{Colors.GRAY}Loading your profile...{Colors.END}")
-        time.sleep(1)
         
         while True:
             choice = self.display_menu()
@@ -1734,16 +2902,7 @@ class TypingGame:
                         self.run_test(words)
                 elif choice == "7":
                     file_path = input("Enter path to text file: ").strip()
-                    custom_words = self.load_custom_text(file_path)
-                    if custom_words:
-                        print(f"Loaded {len(custom_words)} words from custom file")
-                        time.sleep(1)
-                        self.run_test(custom_words)
-                    else:
-                        print("Failed to load custom text. Using default words.")
-                        time.sleep(1)
-                        words = self.get_word_list("4")
-                        self.run_test(words)
+                    self.practice_custom_text(file_path)
                 elif choice == "8":
                     self.show_advanced_statistics()
                 elif choice == "9":
@@ -1767,8 +2926,13 @@ class TypingGame:
                 print(f"{Colors.RED}An error occurred: {e}{Colors.END}")
                 print(f"{Colors.GRAY}Please try again or restart the application.{Colors.END}")
                 time.sleep(2)
+        
+        self.result_writer.close()
+        if self._db_manager is not None:
+            self._db_manager.close()
 
-if __name__ == "__main__":
+def main():
+    """Console entry point: start SnakeType with the database in the current directory"""
     try:
         game = TypingGame()
         game.run()
@@ -1776,4 +2940,7 @@ if __name__ == "__main__":
         print(f"\n{Colors.CYAN}Goodbye! Happy typing!{Colors.END}")
     except Exception as e:
         print(f"Fatal error: {e}")
-        print("Please check your Python installation and try again.")
\ No newline at end of file
+        print("Please check your Python installation and try again.")
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
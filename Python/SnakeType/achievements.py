@@ -0,0 +1,91 @@
+import operator
+import threading
+from collections import deque
+from datetime import datetime
+
+# Achievement id, aggregate it depends on, comparison, threshold
+ACHIEVEMENT_RULES = (
+    ("speed_demon", "wpm", operator.ge, 80),
+    ("speed_machine", "wpm", operator.ge, 100),
+    ("accuracy_master", "accuracy", operator.ge, 98),
+    ("perfectionist", "accuracy", operator.eq, 100),
+    ("marathon", "duration", operator.ge, 300),  # 5 minutes
+    ("persistent", "total_tests", operator.ge, 10),
+    ("consistent", "accurate_run", operator.ge, 5),
+    ("improver", "wpm_gain", operator.ge, 20),
+    ("streak_master", "streak", operator.ge, 7),
+    ("early_bird", "hour", operator.lt, 8),
+    ("night_owl", "hour", operator.ge, 22),
+    ("weekend_warrior", "weekday", operator.ge, 5),
+)
+
+CONSISTENT_ACCURACY = 90  # Accuracy a test must beat to extend accurate_run
+IMPROVER_WINDOW = 5  # wpm_gain compares the last N tests with the N before them
+
+
+class AchievementEngine:
+    """Evaluates ACHIEVEMENT_RULES once per test against counters that are updated incrementally"""
+    def __init__(self, unlocked=(), total_tests=0, recent_results=()):
+        self.lock = threading.Lock()  # The terminal's result writer checks the streak on its own thread
+        self.unlocked = set(unlocked)
+        self.pending = [rule for rule in ACHIEVEMENT_RULES if rule[0] not in self.unlocked]
+        self.total_tests = total_tests
+        self.recent_wpm = deque(maxlen=2 * IMPROVER_WINDOW)
+        self.accurate_run = 0
+        for wpm, accuracy in recent_results:  # Oldest first
+            self._count_result(wpm, accuracy)
+
+    def _count_result(self, wpm, accuracy):
+        self.recent_wpm.append(wpm)
+        self.accurate_run = self.accurate_run + 1 if accuracy > CONSISTENT_ACCURACY else 0
+
+    def wpm_gain(self):
+        """Average WPM of the latest window minus the window before it, 0 until both are full"""
+        if len(self.recent_wpm) < self.recent_wpm.maxlen:
+            return 0
+        recent = list(self.recent_wpm)
+        return (sum(recent[IMPROVER_WINDOW:]) - sum(recent[:IMPROVER_WINDOW])) / IMPROVER_WINDOW
+
+    def check(self, aggregates):
+        """Pending rules satisfied by the given aggregates; rules on other aggregates are left pending"""
+        with self.lock:
+            unlocked = [rule[0] for rule in self.pending
+                        if rule[1] in aggregates and rule[2](aggregates[rule[1]], rule[3])]
+            if unlocked:
+                self.unlocked.update(unlocked)
+                self.pending = [rule for rule in self.pending if rule[0] not in self.unlocked]
+        return unlocked
+
+    def record(self, wpm, accuracy, duration, when=None):
+        """Fold one finished test into the counters; returns newly unlocked ids (streak rules wait for check_streak)"""
+        when = when or datetime.now()
+        self.total_tests += 1
+        self._count_result(wpm, accuracy)
+        if not self.pending:
+            return []
+
+        return self.check({
+            "wpm": wpm,
+            "accuracy": accuracy,
+            "duration": duration,
+            "total_tests": self.total_tests,
+            "accurate_run": self.accurate_run,
+            "wpm_gain": self.wpm_gain(),
+            "hour": when.hour,
+            "weekday": when.weekday()
+        })
+
+    def check_streak(self, streak):
+        """Achievement ids newly unlocked by the current streak, read from streak_state after a save"""
+        return self.check({"streak": streak}) if self.pending else []
+
+
+def earned_by_history(results, longest_streak, unlocked=()):
+    """Achievement ids a stored history earns beyond unlocked, from (wpm, accuracy, duration, when) rows oldest first"""
+    engine = AchievementEngine(unlocked)
+    earned = []
+    for wpm, accuracy, duration, when in results:
+        earned += engine.record(wpm, accuracy, duration, when)
+        if not engine.pending:
+            break
+    return earned + engine.check_streak(longest_streak)
@@ -0,0 +1,183 @@
+# Shared by the terminal game and the web app; NumPy is optional and only changes the speed
+import os
+import math
+import time
+from array import array
+from itertools import chain
+
+try:
+    import numpy as np
+except ImportError:  # Optional: the pure-Python backend below gives the same numbers
+    np = None
+
+if os.environ.get("SNAKETYPE_ANALYTICS") == "python":  # Force the fallback, e.g. to compare backends
+    np = None
+
+BACKEND = "numpy" if np is not None else "python"
+WEEK_SECONDS = 7 * 86400
+PERCENTILES = (25, 50, 75, 90)
+ROLLING_WINDOW = 10  # Tests per rolling WPM average
+RECENT_WINDOW = 5  # wpm_recent_delta compares the last N tests with the N before them
+WEEKS = 4  # Weeks reported in the week-over-week table
+
+
+class ResultSeries:
+    """WPM, accuracy and epoch columns of a test history, oldest first, in contiguous arrays"""
+    def __init__(self, wpm=(), accuracy=(), epoch=()):
+        if np is not None:
+            self.wpm = np.asarray(wpm, dtype=np.float64)
+            self.accuracy = np.asarray(accuracy, dtype=np.float64)
+            self.epoch = np.asarray(epoch, dtype=np.float64)
+        else:
+            self.wpm = array('d', wpm)
+            self.accuracy = array('d', accuracy)
+            self.epoch = array('d', epoch)
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Build from (wpm, accuracy, epoch) rows without materializing per-column lists"""
+        if np is not None:
+            flat = np.fromiter(chain.from_iterable(rows), dtype=np.float64)
+        else:
+            flat = array('d', chain.from_iterable(rows))
+        return cls(flat[0::3], flat[1::3], flat[2::3])
+
+    def __len__(self):
+        return len(self.wpm)
+
+
+def slope(y, x=None):
+    """Least-squares slope of y against x (default: 0, 1, 2, ...), 0 when it is undefined"""
+    n = len(y)
+    if n < 2:
+        return 0
+    if np is not None:
+        y = np.asarray(y, dtype=np.float64)
+        x = np.arange(n, dtype=np.float64) if x is None else np.asarray(x, dtype=np.float64)
+        dx = x - x.mean()
+        denominator = float(dx @ dx)
+        return float(dx @ (y - y.mean())) / denominator if denominator else 0
+
+    x = range(n) if x is None else x
+    x_mean = math.fsum(x) / n
+    y_mean = math.fsum(y) / n
+    numerator = math.fsum((xi - x_mean) * (yi - y_mean) for xi, yi in zip(x, y))
+    denominator = math.fsum((xi - x_mean) ** 2 for xi in x)
+    return numerator / denominator if denominator else 0
+
+
+def _describe_numpy(values):
+    percentiles = np.percentile(values, PERCENTILES)
+    summary = {
+        'mean': float(values.mean()),
+        'stdev': float(values.std(ddof=1)) if len(values) > 1 else 0,
+        'min': float(values.min()),
+        'max': float(values.max())
+    }
+    summary.update((f"p{p}", float(value)) for p, value in zip(PERCENTILES, percentiles))
+    return summary
+
+
+def _describe_python(values):
+    ordered = sorted(values)  # One sort serves every percentile
+    n = len(ordered)
+    mean = math.fsum(ordered) / n
+    summary = {
+        'mean': mean,
+        'stdev': math.sqrt(math.fsum((v - mean) ** 2 for v in ordered) / (n - 1)) if n > 1 else 0,
+        'min': ordered[0],
+        'max': ordered[-1]
+    }
+    for p in PERCENTILES:
+        # Linear interpolation between closest ranks, NumPy's default method
+        rank = (n - 1) * p / 100
+        low = int(rank)
+        high = min(low + 1, n - 1)
+        summary[f"p{p}"] = ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+    return summary
+
+
+def _rolling_numpy(values, window):
+    sums = np.cumsum(values)
+    sums[window:] = sums[window:] - sums[:-window]
+    rolling = sums[window - 1:] / window
+    return float(rolling[-1]), float(rolling.max())
+
+
+def _rolling_python(values, window):
+    total = math.fsum(values[:window])
+    best = total
+    for i in range(window, len(values)):
+        total += values[i] - values[i - window]
+        best = max(best, total)
+    return total / window, best / window
+
+
+def _weekly_numpy(series, now):
+    weeks_ago = ((now - series.epoch) // WEEK_SECONDS).astype(np.int64)
+    recent = (weeks_ago >= 0) & (weeks_ago < WEEKS)
+    weeks_ago = weeks_ago[recent]
+    counts = np.bincount(weeks_ago, minlength=WEEKS)
+    wpm_sums = np.bincount(weeks_ago, weights=series.wpm[recent], minlength=WEEKS)
+    accuracy_sums = np.bincount(weeks_ago, weights=series.accuracy[recent], minlength=WEEKS)
+    return counts.tolist(), wpm_sums.tolist(), accuracy_sums.tolist()
+
+
+def _weekly_python(series, now):
+    counts = [0] * WEEKS
+    wpm_sums = [0.0] * WEEKS
+    accuracy_sums = [0.0] * WEEKS
+    for wpm, accuracy, epoch in zip(series.wpm, series.accuracy, series.epoch):
+        week = int((now - epoch) // WEEK_SECONDS)
+        if 0 <= week < WEEKS:
+            counts[week] += 1
+            wpm_sums[week] += wpm
+            accuracy_sums[week] += accuracy
+    return counts, wpm_sums, accuracy_sums
+
+
+def _week_over_week(counts, wpm_sums, accuracy_sums):
+    """Per-week averages, newest first, each with its WPM change from the week before"""
+    weeks = [{
+        'weeks_ago': week,
+        'tests': counts[week],
+        'wpm': wpm_sums[week] / counts[week] if counts[week] else None,
+        'accuracy': accuracy_sums[week] / counts[week] if counts[week] else None,
+        'wpm_delta': None
+    } for week in range(WEEKS)]
+    for week, previous in zip(weeks, weeks[1:]):
+        if week['tests'] and previous['tests']:
+            week['wpm_delta'] = week['wpm'] - previous['wpm']
+    return weeks
+
+
+def summarize(series, now=None):
+    """Distribution, trend, rolling and week-over-week figures for a ResultSeries, None if it is empty"""
+    n = len(series)
+    if not n:
+        return None
+    now = time.time() if now is None else now
+    vectorized = np is not None
+    describe = _describe_numpy if vectorized else _describe_python
+    rolling_latest, rolling_best = (_rolling_numpy if vectorized else _rolling_python)(series.wpm, min(ROLLING_WINDOW, n))
+    weekly = (_weekly_numpy if vectorized else _weekly_python)(series, now)
+    weeks = series.epoch / WEEK_SECONDS if vectorized else [epoch / WEEK_SECONDS for epoch in series.epoch]
+
+    if n >= 2 * RECENT_WINDOW:
+        recent_delta = (math.fsum(series.wpm[-RECENT_WINDOW:]) -
+                        math.fsum(series.wpm[-2 * RECENT_WINDOW:-RECENT_WINDOW])) / RECENT_WINDOW
+    else:
+        recent_delta = None
+
+    return {
+        'backend': BACKEND,
+        'tests': n,
+        'wpm': describe(series.wpm),
+        'accuracy': describe(series.accuracy),
+        'wpm_slope': slope(series.wpm),  # Per test
+        'accuracy_slope': slope(series.accuracy),
+        'wpm_per_week': slope(series.wpm, weeks),
+        'rolling_wpm': {'latest': rolling_latest, 'best': rolling_best},
+        'wpm_recent_delta': recent_delta,
+        'weekly': _week_over_week(*weekly)
+    }
@@ -0,0 +1,212 @@
+import io
+import os
+import re
+import sys
+import mmap
+import random
+import struct
+from array import array
+
+CORPUS_MAGIC = b"STWC"
+CORPUS_VERSION = 1
+_HEADER = struct.Struct("<4sHHII")  # magic, version, reserved, word count, word bytes
+
+
+def _read_frequency_list(source_path, limit=None):
+    """Parse 'word' or 'word count' lines into (word, count) pairs sorted by descending count"""
+    counts = {}
+    with open(source_path, "r", encoding="utf-8") as file:
+        for rank, line in enumerate(file, 1):
+            fields = line.split()
+            if not fields or fields[0].startswith("#"):
+                continue
+            word = fields[0]
+            if len(fields) > 1 and fields[1].isdigit():
+                count = int(fields[1])
+            else:
+                count = max(1, 10 ** 9 // rank)  # Plain ranked list: assume Zipf's law
+            counts[word] = counts.get(word, 0) + count
+
+    ranked = sorted(counts.items(), key=lambda item: (-item[1], item[0]))
+    return ranked[:limit] if limit else ranked
+
+
+def _build_alias_table(weights):
+    """Vose alias table with 32-bit integer thresholds; returns (thresholds, aliases) arrays"""
+    n = len(weights)
+    total = float(sum(weights))
+    scaled = [weight * n / total for weight in weights]
+    thresholds = array("I", [0xFFFFFFFF]) * n
+    aliases = array("I", range(n))
+
+    small = [i for i, p in enumerate(scaled) if p < 1.0]
+    large = [i for i, p in enumerate(scaled) if p >= 1.0]
+    while small and large:
+        less, more = small.pop(), large.pop()
+        thresholds[less] = int(scaled[less] * 0x100000000)
+        aliases[less] = more
+        scaled[more] -= 1.0 - scaled[less]
+        (small if scaled[more] < 1.0 else large).append(more)
+    return thresholds, aliases
+
+
+def _little_endian(values):
+    if sys.byteorder == "big":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def compile_corpus(source_path, corpus_path, limit=None):
+    """Compile a text frequency list into the rank-sorted binary corpus format; returns the word count"""
+    ranked = _read_frequency_list(source_path, limit)
+    if not ranked:
+        raise ValueError(f"No words found in {source_path}")
+
+    encoded = [word.encode("utf-8") for word, _ in ranked]
+    frequencies = array("Q", (count for _, count in ranked))
+    offsets = array("I", [0])
+    for word in encoded:
+        offsets.append(offsets[-1] + len(word))
+    thresholds, aliases = _build_alias_table(frequencies)
+
+    temp_path = f"{corpus_path}.tmp"
+    with open(temp_path, "wb") as file:
+        file.write(_HEADER.pack(CORPUS_MAGIC, CORPUS_VERSION, 0, len(encoded), offsets[-1]))
+        for column in (frequencies, offsets, thresholds, aliases):
+            file.write(_little_endian(column))
+        file.write(b"".join(encoded))
+    os.replace(temp_path, corpus_path)
+    return len(encoded)
+
+
+_WORD_BYTES = re.compile(rb'[0-9A-Za-z\x80-\xff]+')
+
+
+def _split_word_token(token, start):
+    """Yield (lowercase word, end byte offset) for the alphanumeric runs in one raw token"""
+    if token.isascii():
+        yield token.lower().decode('ascii'), start + len(token)
+        return
+
+    word = ""
+    offset = start
+    for char in token.decode('utf-8', errors='surrogateescape'):
+        offset += len(char.encode('utf-8', errors='surrogateescape'))
+        if char.isalnum():
+            word += char
+            word_end = offset
+        elif word:
+            yield word.lower(), word_end
+            word = ""
+    if word:
+        yield word.lower(), word_end
+
+
+def iter_text_words(stream, start_offset=0, chunk_size=1 << 16):
+    """Yield (word, end byte offset) from a binary file, memory-mapped when possible, else read in chunks"""
+    try:
+        buffer = mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ)
+    except (AttributeError, OSError, ValueError, io.UnsupportedOperation):
+        buffer = None
+
+    if buffer is not None:
+        try:
+            position = start_offset
+            while True:
+                match = _WORD_BYTES.search(buffer, position)
+                if not match:
+                    break
+                position = match.end()
+                yield from _split_word_token(match.group(), match.start())
+        finally:
+            buffer.close()
+        return
+
+    try:
+        stream.seek(start_offset)
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        stream.read(start_offset)
+    base = start_offset
+    carry = b""
+    while True:
+        chunk = stream.read(chunk_size)
+        data = carry + chunk
+        carry = b""
+        consumed = len(data)
+        for match in _WORD_BYTES.finditer(data):
+            if chunk and match.end() == len(data):
+                carry = match.group()  # May continue in the next chunk
+                consumed = match.start()
+                break
+            yield from _split_word_token(match.group(), base + match.start())
+        base += consumed
+        if not chunk:
+            return
+
+
+class WordCorpus:
+    """Rank-sorted word-frequency list, memory-mapped on first use and sampled in O(1) per word"""
+    def __init__(self, corpus_path):
+        self.corpus_path = corpus_path
+        self._buffer = None
+
+    def _load(self):
+        with open(self.corpus_path, "rb") as file:
+            buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, _, count, word_bytes = _HEADER.unpack_from(buffer)
+        if magic != CORPUS_MAGIC or version != CORPUS_VERSION:
+            buffer.close()
+            raise ValueError(f"{self.corpus_path} is not a SnakeType word corpus")
+
+        view = memoryview(buffer)
+        position = _HEADER.size
+        columns = []
+        for typecode, length in (("Q", count), ("I", count + 1), ("I", count), ("I", count)):
+            size = array(typecode).itemsize * length
+            column = view[position:position + size].cast(typecode)
+            if sys.byteorder == "big":
+                column = array(typecode, column)
+                column.byteswap()
+            columns.append(column)
+            position += size
+
+        self.count = count
+        self.frequencies, self.offsets, self.thresholds, self.aliases = columns
+        self.words = view[position:position + word_bytes]
+        self._buffer = buffer
+
+    def __len__(self):
+        if self._buffer is None:
+            self._load()
+        return self.count
+
+    def word(self, rank):
+        """Word at a 0-based frequency rank"""
+        if self._buffer is None:
+            self._load()
+        return bytes(self.words[self.offsets[rank]:self.offsets[rank + 1]]).decode("utf-8")
+
+    def sample(self, k, rng=random):
+        """k words drawn with probability proportional to their frequency"""
+        if self._buffer is None:
+            self._load()
+        count, thresholds, aliases = self.count, self.thresholds, self.aliases
+        words = []
+        for _ in range(k):
+            rank = rng.randrange(count)
+            if rng.getrandbits(32) >= thresholds[rank]:
+                rank = aliases[rank]
+            words.append(self.word(rank))
+        return words
+
+
+if __name__ == "__main__":
+    import argparse  # Only the command line needs it; kept off the game's startup path
+
+    parser = argparse.ArgumentParser(description="Compile a word-frequency list into a SnakeType corpus")
+    parser.add_argument("source", help="text file with one 'word' or 'word count' per line")
+    parser.add_argument("output", help="path of the compiled corpus (.stc)")
+    parser.add_argument("--limit", type=int, help="keep only the N most frequent words")
+    args = parser.parse_args()
+    print(f"Compiled {compile_corpus(args.source, args.output, args.limit)} words into {args.output}")
@@ -0,0 +1,110 @@
+# Shared by the terminal game and the web app; each layout is compiled once into a codepoint-indexed table
+import os
+import json
+from functools import lru_cache
+
+FINGERS = ("left_pinky", "left_ring", "left_middle", "left_index",
+           "right_index", "right_middle", "right_ring", "right_pinky", "thumb")
+# Finger (index into FINGERS) for each key position of the number, top, home and bottom rows
+ROW_FINGERS = ("0012334456777", "0123344567777", "01233445677", "0123344567")
+SPACE_ROW = len(ROW_FINGERS)
+TABLE_SIZE = 256  # Latin-1 codepoints live in a flat list; anything above goes to a dict
+
+# Layout name -> (unshifted rows, shifted rows), each row listed left to right from its first key
+LAYOUTS = {
+    "qwerty": (
+        ("`1234567890-=", "qwertyuiop[]\\", "asdfghjkl;'", "zxcvbnm,./"),
+        ("~!@#$%^&*()_+", "QWERTYUIOP{}|", 'ASDFGHJKL:"', "ZXCVBNM<>?")
+    ),
+    "dvorak": (
+        ("`1234567890[]", "',.pyfgcrl/=\\", "aoeuidhtns-", ";qjkxbmwvz"),
+        ("~!@#$%^&*(){}", '"<>PYFGCRL?+|', "AOEUIDHTNS_", ":QJKXBMWVZ")
+    ),
+    "colemak": (
+        ("`1234567890-=", "qwfpgjluy;[]\\", "arstdhneio'", "zxcvbkm,./"),
+        ("~!@#$%^&*()_+", "QWFPGJLUY:{}|", 'ARSTDHNEIO"', "ZXCVBKM<>?")
+    ),
+}
+
+
+class KeyboardLayout:
+    """A keyboard layout compiled into O(1) character -> key position lookups"""
+    def __init__(self, name, rows, shifted=None, source=None):
+        self.name = name
+        self.source = source or name  # What get_layout() was given, for saving the choice
+        self.table = [None] * TABLE_SIZE
+        self.extra = {}
+
+        if len(rows) > len(ROW_FINGERS):
+            raise ValueError(f"Layout {name}: {len(rows)} rows given, at most {len(ROW_FINGERS)} are supported")
+        if shifted is None:
+            shifted = ["".join(c.upper() if len(c.upper()) == 1 else c for c in keys) for keys in rows]
+        for row, keys in enumerate(rows):
+            fingers = ROW_FINGERS[row]
+            shifted_keys = shifted[row] if row < len(shifted) else ""
+            if len(keys) > len(fingers) or len(shifted_keys) > len(keys):
+                raise ValueError(f"Layout {name}: row {row} has more keys than the {len(fingers)} it can hold")
+            for column, char in enumerate(keys):
+                finger = FINGERS[int(fingers[column])]
+                key = {'finger': finger, 'hand': finger.split('_')[0], 'row': row, 'column': column}
+                self._add(char, key)
+                if column < len(shifted_keys):
+                    self._add(shifted_keys[column], key)
+        self._add(" ", {'finger': "thumb", 'hand': "either", 'row': SPACE_ROW, 'column': 0})
+
+    def _add(self, char, key):
+        existing = self.lookup(char)
+        if existing is not None and existing is not key:
+            raise ValueError(f"Layout {self.name}: {char!r} is assigned to two keys")
+        code = ord(char)
+        if code < TABLE_SIZE:
+            self.table[code] = key
+        else:
+            self.extra[code] = key
+
+    def lookup(self, char):
+        """Key position dict (finger, hand, row, column) for one character, or None if the layout lacks it"""
+        if len(char) != 1:
+            return None
+        code = ord(char)
+        return self.table[code] if code < TABLE_SIZE else self.extra.get(code)
+
+    def finger(self, char):
+        """Finger name that types char, 'unknown' if the layout lacks it"""
+        key = self.lookup(char)
+        return key['finger'] if key else 'unknown'
+
+
+def load_layout(path):
+    """Compile a JSON layout file: {"name": ..., "rows": [4 strings], "shifted": [4 strings, optional]}"""
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if not isinstance(data, dict):
+        raise ValueError(f"{path}: expected a JSON object with a \"rows\" list")
+    rows = data.get("rows")
+    shifted = data.get("shifted")
+    for value in (rows, shifted):
+        if value is not None and not (isinstance(value, list) and all(isinstance(keys, str) for keys in value)):
+            raise ValueError(f"{path}: \"rows\" and \"shifted\" must be lists of strings")
+    if not rows:
+        raise ValueError(f"{path}: expected a JSON object with a \"rows\" list")
+    name = data.get("name") or os.path.splitext(os.path.basename(path))[0]
+    return KeyboardLayout(str(name), rows, shifted, source=path)
+
+
+@lru_cache(maxsize=None)
+def _builtin_layout(name):
+    rows, shifted = LAYOUTS[name]
+    return KeyboardLayout(name, rows, shifted)
+
+
+@lru_cache(maxsize=16)
+def _file_layout(path, mtime_ns):
+    return load_layout(path)
+
+
+def get_layout(name="qwerty"):
+    """Compiled layout for a built-in name or a JSON layout path; a file is recompiled when it changes on disk"""
+    if name in LAYOUTS:
+        return _builtin_layout(name)
+    return _file_layout(name, os.stat(name).st_mtime_ns)  # The mtime in the key drops stale compilations
@@ -0,0 +1,340 @@
+# Shared by the terminal game and the web app; bump SCHEMA_VERSION with every new migration
+from datetime import date, timedelta
+
+SCHEMA_VERSION = 2
+
+
+def _add_missing_columns(cursor, table, columns):
+    """ALTER in the columns an older database was created without; returns the names added"""
+    cursor.execute(f"PRAGMA table_info({table})")
+    existing = {column[1] for column in cursor.fetchall()}
+    added = []
+    for name, declaration in columns:
+        if name not in existing:
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN {name} {declaration}")
+            added.append(name)
+    return added
+
+
+def _migrate_base_tables(cursor):
+    """Core tables as a union of the terminal and web schemas, including files created by either"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS test_results (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            wpm REAL NOT NULL CHECK(wpm >= 0),
+            accuracy REAL NOT NULL CHECK(accuracy >= 0 AND accuracy <= 100),
+            mistakes INTEGER NOT NULL CHECK(mistakes >= 0),
+            test_duration REAL NOT NULL CHECK(test_duration > 0),
+            difficulty TEXT NOT NULL,
+            word_count INTEGER NOT NULL CHECK(word_count > 0),
+            characters_typed INTEGER NOT NULL CHECK(characters_typed >= 0),
+            correct_characters INTEGER NOT NULL CHECK(correct_characters >= 0),
+            raw_wpm REAL DEFAULT 0,
+            consistency_score REAL DEFAULT 0,
+            test_mode TEXT DEFAULT 'standard',
+            epoch INTEGER DEFAULT (CAST(strftime('%s', 'now') AS INTEGER))
+        )
+    ''')
+    # ALTER TABLE cannot add the expression default, so every insert path passes epoch explicitly
+    added = _add_missing_columns(cursor, "test_results", [
+        ("raw_wpm", "REAL DEFAULT 0"),
+        ("consistency_score", "REAL DEFAULT 0"),
+        ("test_mode", "TEXT DEFAULT 'standard'"),
+        ("epoch", "INTEGER")
+    ])
+    if "epoch" in added:
+        cursor.execute("UPDATE test_results SET epoch = CAST(strftime('%s', date) AS INTEGER)")
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS achievements (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            achievement_id TEXT NOT NULL,
+            date_earned TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE(achievement_id)
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS error_patterns (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            test_id INTEGER NOT NULL,
+            character_intended TEXT NOT NULL,
+            character_typed TEXT NOT NULL,
+            position INTEGER NOT NULL CHECK(position >= 0),
+            word_context TEXT,
+            finger_mapped TEXT,
+            bigram_context TEXT,
+            FOREIGN KEY (test_id) REFERENCES test_results (id) ON DELETE CASCADE
+        )
+    ''')
+    _add_missing_columns(cursor, "error_patterns", [("finger_mapped", "TEXT"), ("bigram_context", "TEXT")])
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS daily_streaks (
+            date DATE PRIMARY KEY,
+            tests_completed INTEGER DEFAULT 0 CHECK(tests_completed >= 0)
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS user_settings (
+            id INTEGER PRIMARY KEY,
+            setting_key TEXT UNIQUE NOT NULL,
+            setting_value TEXT NOT NULL,
+            last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS performance_insights (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            test_id INTEGER NOT NULL,
+            insight_type TEXT NOT NULL,
+            insight_data TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (test_id) REFERENCES test_results (id) ON DELETE CASCADE
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS keystroke_logs (
+            test_id INTEGER PRIMARY KEY,
+            key_count INTEGER NOT NULL CHECK(key_count >= 0),
+            events BLOB NOT NULL,
+            FOREIGN KEY (test_id) REFERENCES test_results (id) ON DELETE CASCADE
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS text_progress (
+            file_path TEXT PRIMARY KEY,
+            file_size INTEGER NOT NULL,
+            file_mtime REAL NOT NULL,
+            next_offset INTEGER NOT NULL CHECK(next_offset >= 0),
+            updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    # The two front ends created these with different column lists; rebuild them as the superset
+    for index in ("idx_test_results_date", "idx_test_results_epoch", "idx_error_patterns_test"):
+        cursor.execute(f"DROP INDEX IF EXISTS {index}")
+    # Range filters and ordering use the integer epoch; the extra columns cover the trend aggregates
+    cursor.execute('''
+        CREATE INDEX idx_test_results_epoch
+        ON test_results(epoch, wpm, accuracy, consistency_score)
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_error_patterns_chars ON error_patterns(character_intended, character_typed)")
+    cursor.execute('''
+        CREATE INDEX idx_error_patterns_test
+        ON error_patterns(test_id, character_intended, character_typed, finger_mapped, bigram_context)
+    ''')
+
+
+def _migrate_summary_tables(cursor):
+    """Derived tables kept current by triggers, rebuilt from the base tables"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS daily_rollup (
+            day DATE NOT NULL,
+            mode TEXT NOT NULL,
+            test_count INTEGER NOT NULL DEFAULT 0,
+            wpm_sum REAL NOT NULL DEFAULT 0,
+            wpm_sumsq REAL NOT NULL DEFAULT 0,
+            accuracy_sum REAL NOT NULL DEFAULT 0,
+            accuracy_sumsq REAL NOT NULL DEFAULT 0,
+            best_wpm REAL NOT NULL DEFAULT 0,
+            best_accuracy REAL NOT NULL DEFAULT 0,
+            total_duration REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, mode)
+        ) WITHOUT ROWID
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS confusion_matrix (
+            day DATE NOT NULL,
+            intended TEXT NOT NULL,
+            typed TEXT NOT NULL,
+            count INTEGER NOT NULL DEFAULT 0 CHECK(count >= 0),
+            finger_mapped TEXT,
+            bigram_context TEXT,
+            PRIMARY KEY (day, intended, typed)
+        ) WITHOUT ROWID
+    ''')
+    _add_missing_columns(cursor, "confusion_matrix", [("finger_mapped", "TEXT"), ("bigram_context", "TEXT")])
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS streak_state (
+            id INTEGER PRIMARY KEY CHECK(id = 1),
+            current_streak INTEGER NOT NULL DEFAULT 0,
+            longest_streak INTEGER NOT NULL DEFAULT 0,
+            last_day DATE
+        )
+    ''')
+
+    drop_summary_triggers(cursor)  # Either front end may have created an older definition
+    rebuild_summaries(cursor)
+
+
+# (version, step) in order; a database at user_version N runs every step above N exactly once
+MIGRATIONS = (
+    (1, _migrate_base_tables),
+    (2, _migrate_summary_tables),
+)
+
+
+def migrate(conn):
+    """Run the migrations a database is missing; a current database costs one PRAGMA read"""
+    if conn.execute("PRAGMA user_version").fetchone()[0] >= SCHEMA_VERSION:
+        return False
+
+    with conn:
+        cursor = conn.cursor()
+        cursor.execute("BEGIN IMMEDIATE")
+        version = cursor.execute("PRAGMA user_version").fetchone()[0]  # Another process may have just migrated
+        for target, step in MIGRATIONS:
+            if version < target:
+                step(cursor)
+        cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    return True
+
+
+def create_summary_triggers(cursor):
+    """Triggers that keep daily_rollup and confusion_matrix current on every insert"""
+    # Single saves and the result writer keep the rollup current; bulk imports rebuild it instead
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_test_results_rollup
+        AFTER INSERT ON test_results
+        BEGIN
+            INSERT OR IGNORE INTO daily_rollup (day, mode)
+            VALUES (date(NEW.date, 'localtime'), NEW.difficulty);
+            UPDATE daily_rollup SET
+                test_count = test_count + 1,
+                wpm_sum = wpm_sum + NEW.wpm,
+                wpm_sumsq = wpm_sumsq + NEW.wpm * NEW.wpm,
+                accuracy_sum = accuracy_sum + NEW.accuracy,
+                accuracy_sumsq = accuracy_sumsq + NEW.accuracy * NEW.accuracy,
+                best_wpm = MAX(best_wpm, NEW.wpm),
+                best_accuracy = MAX(best_accuracy, NEW.accuracy),
+                total_duration = total_duration + NEW.test_duration
+            WHERE day = date(NEW.date, 'localtime') AND mode = NEW.difficulty;
+        END
+    ''')
+
+    # Bumped inside whichever transaction inserts the error rows
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_error_patterns_confusion
+        AFTER INSERT ON error_patterns
+        BEGIN
+            INSERT OR IGNORE INTO confusion_matrix (day, intended, typed)
+            VALUES ((SELECT date(date, 'localtime') FROM test_results WHERE id = NEW.test_id),
+                    NEW.character_intended, NEW.character_typed);
+            UPDATE confusion_matrix SET
+                count = count + 1,
+                finger_mapped = COALESCE(NEW.finger_mapped, finger_mapped),
+                bigram_context = COALESCE(NEW.bigram_context, bigram_context)
+            WHERE day = (SELECT date(date, 'localtime') FROM test_results WHERE id = NEW.test_id)
+              AND intended = NEW.character_intended AND typed = NEW.character_typed;
+        END
+    ''')
+
+
+def drop_summary_triggers(cursor):
+    cursor.execute("DROP TRIGGER IF EXISTS trg_test_results_rollup")
+    cursor.execute("DROP TRIGGER IF EXISTS trg_error_patterns_confusion")
+
+
+def fill_daily_rollup(cursor):
+    cursor.execute('''
+        INSERT INTO daily_rollup
+        SELECT date(date, 'localtime'), difficulty, COUNT(*),
+               SUM(wpm), SUM(wpm * wpm), SUM(accuracy), SUM(accuracy * accuracy),
+               MAX(wpm), MAX(accuracy), SUM(test_duration)
+        FROM test_results
+        GROUP BY 1, 2
+    ''')
+
+
+def fill_confusion_matrix(cursor):
+    cursor.execute('''
+        INSERT INTO confusion_matrix (day, intended, typed, count, finger_mapped, bigram_context)
+        SELECT date(tr.date, 'localtime'), ep.character_intended, ep.character_typed, COUNT(*),
+               MAX(ep.finger_mapped), MAX(ep.bigram_context)
+        FROM error_patterns ep
+        JOIN test_results tr ON ep.test_id = tr.id
+        GROUP BY 1, 2, 3
+    ''')
+
+
+def recompute_streak(cursor):
+    """Rebuild the cached streak row from daily_streaks with a gaps-and-islands pass"""
+    cursor.execute('''
+        WITH days AS (
+            SELECT date, julianday(date) - ROW_NUMBER() OVER (ORDER BY date) AS island
+            FROM daily_streaks
+            WHERE tests_completed > 0
+        ), islands AS (
+            SELECT MAX(date) AS last_day, COUNT(*) AS length
+            FROM days
+            GROUP BY island
+        )
+        SELECT (SELECT length FROM islands ORDER BY last_day DESC LIMIT 1),
+               (SELECT MAX(length) FROM islands),
+               (SELECT MAX(last_day) FROM islands)
+    ''')
+    current, longest, last_day = cursor.fetchone()
+    cursor.execute('''
+        INSERT OR REPLACE INTO streak_state (id, current_streak, longest_streak, last_day)
+        VALUES (1, ?, ?, ?)
+    ''', (current or 0, longest or 0, last_day))
+
+
+def advance_streak(cursor, day):
+    """Fold a date with a completed test into the cached streak row in O(1)"""
+    cursor.execute('SELECT current_streak, longest_streak, last_day FROM streak_state WHERE id = 1')
+    row = cursor.fetchone()
+    previous_day = (day - timedelta(days=1)).isoformat()
+    day = day.isoformat()
+    if row is None or (row[2] and day < row[2]):
+        recompute_streak(cursor)  # Out-of-order day, e.g. imported history
+        return
+
+    current, longest, last_day = row
+    if day == last_day:
+        return
+    current = current + 1 if last_day == previous_day else 1
+    cursor.execute('''
+        UPDATE streak_state SET current_streak = ?, longest_streak = ?, last_day = ? WHERE id = 1
+    ''', (current, max(longest, current), day))
+
+
+def live_streak(current, last_day, today=None):
+    """A cached current streak, or 0 once a day has been missed since last_day"""
+    today = today or date.today()
+    if last_day not in (today.isoformat(), (today - timedelta(days=1)).isoformat()):
+        return 0
+    return current or 0
+
+
+def read_streak(cursor):
+    """Current and longest streak and the last day with a test, from the cached streak row"""
+    cursor.execute('SELECT current_streak, longest_streak, last_day FROM streak_state WHERE id = 1')
+    row = cursor.fetchone()
+    if not row:
+        return {'current': 0, 'longest': 0, 'last_day': None}
+    current, longest, last_day = row
+    return {'current': live_streak(current, last_day), 'longest': longest, 'last_day': last_day}
+
+
+def rebuild_summaries(cursor):
+    """Recompute every derived table from test_results and error_patterns, then restore the triggers"""
+    cursor.execute("DELETE FROM daily_rollup")
+    fill_daily_rollup(cursor)
+    cursor.execute("DELETE FROM confusion_matrix")
+    fill_confusion_matrix(cursor)
+    cursor.execute('''
+        INSERT OR REPLACE INTO daily_streaks (date, tests_completed)
+        SELECT date(date, 'localtime'), COUNT(*) FROM test_results GROUP BY 1
+    ''')
+    recompute_streak(cursor)
+    create_summary_triggers(cursor)
+
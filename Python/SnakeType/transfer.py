@@ -0,0 +1,243 @@
+# Shared by the terminal game and the web app so both front ends read and write one export format
+import io
+import csv
+import json
+import base64
+import hashlib
+import sqlite3
+from datetime import datetime
+from itertools import chain
+
+try:
+    from . import schema
+    from .achievements import earned_by_history
+except ImportError:  # Run as a script from inside the package directory
+    import schema
+    from achievements import earned_by_history
+
+# Export record type, source table, paging key and exported columns
+EXPORT_TABLES = (
+    ("result", "test_results", "id", ("id", "date", "epoch", "wpm", "accuracy", "mistakes", "test_duration",
+                                      "difficulty", "word_count", "characters_typed", "correct_characters",
+                                      "raw_wpm", "consistency_score", "test_mode")),
+    ("error", "error_patterns", "id", ("id", "test_id", "character_intended", "character_typed", "position",
+                                       "word_context", "finger_mapped", "bigram_context")),
+    ("keystrokes", "keystroke_logs", "test_id", ("test_id", "key_count", "events")),
+    ("achievement", "achievements", "id", ("id", "achievement_id", "date_earned")),
+    ("setting", "user_settings", "id", ("id", "setting_key", "setting_value")),
+)
+EXPORT_BLOB_COLUMNS = {"events"}  # Written as base64 text
+EXPORT_CSV_FIELDS = ["type"] + list(dict.fromkeys(
+    column for *_, columns in EXPORT_TABLES for column in columns
+)) + ["export_date"]
+
+
+def iter_export_records(db_manager, batch_size=1000):
+    """Yield every exported row of a DatabaseManager's database as a flat dict, one page at a time"""
+    for record_type, table, key, columns in EXPORT_TABLES:
+        key_index = columns.index(key)
+        keys = ("type",) + columns
+        blob_columns = [column for column in columns if column in EXPORT_BLOB_COLUMNS]
+        last_key = -1
+        while True:
+            # Keyset paging: each page is a short indexed read, so memory stays flat and no
+            # read transaction is held open while the caller writes rows out. A sqlite3.Error
+            # propagates so the caller can discard the partial export instead of reporting success
+            with db_manager.get_connection() as conn:
+                rows = conn.execute(
+                    f"SELECT {', '.join(columns)} FROM {table} WHERE {key} > ? ORDER BY {key} LIMIT ?",
+                    (last_key, batch_size)
+                ).fetchall()
+
+            for row in rows:
+                record = dict(zip(keys, (record_type, *row)))
+                for column in blob_columns:
+                    record[column] = base64.b64encode(record[column]).decode("ascii")
+                yield record
+            if len(rows) < batch_size:
+                break
+            last_key = rows[-1][key_index]
+
+
+def _row_writer(stream, export_format):
+    """Function writing one export record to a text stream as an NDJSON line or a CSV row"""
+    if export_format == "csv":
+        writer = csv.DictWriter(stream, fieldnames=EXPORT_CSV_FIELDS, extrasaction="ignore")
+        writer.writeheader()
+        return writer.writerow
+    encode = json.JSONEncoder(ensure_ascii=False).encode
+    return lambda record: stream.write(encode(record) + "\n")
+
+
+def write_export(records, stream, export_format="ndjson"):
+    """Write export records to a text stream one row at a time as NDJSON or CSV; returns the row count"""
+    write_row = _row_writer(stream, export_format)
+    rows = 0
+    for record in records:
+        write_row(record)
+        rows += 1
+    return rows
+
+
+def iter_export_chunks(records, export_format="ndjson", chunk_rows=500):
+    """Encode export records as NDJSON or CSV text, yielding one chunk per chunk_rows rows"""
+    buffer = io.StringIO()
+    write_row = _row_writer(buffer, export_format)
+    for rows, record in enumerate(records, 1):
+        write_row(record)
+        if rows % chunk_rows == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+# Result columns that identify a test when importing; epoch is derived from date
+IMPORT_RESULT_FIELDS = (("date", str), ("wpm", float), ("accuracy", float), ("mistakes", int),
+                        ("test_duration", float), ("difficulty", str), ("word_count", int),
+                        ("characters_typed", int), ("correct_characters", int))
+IMPORT_TYPES = {"export"} | {record_type for record_type, *_ in EXPORT_TABLES}
+
+
+def _import_value(record, field, cast):
+    value = record.get(field)
+    return None if value is None or value == "" else cast(value)
+
+
+def _result_hash(values):
+    """Content hash used to skip results that are already stored"""
+    return hashlib.blake2b(repr(values).encode("utf-8"), digest_size=16).digest()
+
+
+def iter_import_records(stream):
+    """Yield export records from an NDJSON or CSV text stream, detected from the first line"""
+    first = stream.readline()
+    if first.lstrip().startswith("{"):
+        for number, line in enumerate(chain([first], stream), 1):
+            if line.strip():
+                record = json.loads(line)
+                if not isinstance(record, dict):
+                    raise ValueError(f"line {number} is not a JSON object")
+                yield record
+    else:
+        reader = csv.DictReader(chain([first], stream))
+        if not reader.fieldnames or "type" not in reader.fieldnames:
+            raise ValueError("not a SnakeType export (no \"type\" column)")
+        yield from reader
+
+
+def import_records(db_manager, records, batch_size=5000):
+    """Insert exported records in one transaction, skipping results already stored; returns counts or None"""
+    counts = {"results": 0, "duplicates": 0, "errors": 0, "keystrokes": 0, "achievements": 0, "settings": {}}
+    result_columns = ", ".join(field for field, _ in IMPORT_RESULT_FIELDS)
+    statements = {  # ?2 is the result date, reused when the record carries no epoch
+        "result": f'''
+            INSERT INTO test_results (id, {result_columns}, raw_wpm, consistency_score, test_mode, epoch)
+            VALUES (?, {", ".join("?" * len(IMPORT_RESULT_FIELDS))}, COALESCE(?, 0), COALESCE(?, 0),
+                    COALESCE(?, 'standard'), COALESCE(?, CAST(strftime('%s', ?2) AS INTEGER)))
+        ''',
+        "error": '''
+            INSERT INTO error_patterns
+            (test_id, character_intended, character_typed, position, word_context, finger_mapped, bigram_context)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''',
+        "keystrokes": 'INSERT OR REPLACE INTO keystroke_logs (test_id, key_count, events) VALUES (?, ?, ?)',
+        "achievement": '''
+            INSERT OR IGNORE INTO achievements (achievement_id, date_earned)
+            VALUES (?, COALESCE(?, CURRENT_TIMESTAMP))
+        ''',
+        "setting": 'INSERT OR REPLACE INTO user_settings (setting_key, setting_value) VALUES (?, ?)'
+    }
+    pending = {kind: [] for kind in statements}
+
+    try:
+        conn = db_manager.get_connection()
+        with conn:
+            cursor = conn.cursor()
+            cursor.execute('BEGIN IMMEDIATE')  # DDL below would otherwise autocommit
+            cursor.execute(f'SELECT {result_columns} FROM test_results')
+            seen = {_result_hash(row) for row in cursor}
+            cursor.execute('SELECT COALESCE(MAX(id), 0) FROM test_results')
+            next_id = cursor.fetchone()[0] + 1
+            id_map = {}  # Exported test id -> id assigned here
+            recognised = 0
+
+            # The summary tables are rebuilt once at the end instead of by per-row triggers
+            schema.drop_summary_triggers(cursor)
+
+            def flush():
+                for kind, rows in pending.items():  # Results first so foreign keys resolve
+                    if rows:
+                        cursor.executemany(statements[kind], rows)
+                        if kind == "achievement":
+                            counts["achievements"] += cursor.rowcount
+                        rows.clear()
+
+            for record in records:
+                kind = record.get("type")
+                if kind in IMPORT_TYPES:
+                    recognised += 1
+                if kind == "result":
+                    values = tuple(_import_value(record, field, cast) for field, cast in IMPORT_RESULT_FIELDS)
+                    digest = _result_hash(values)
+                    if digest in seen:
+                        counts["duplicates"] += 1
+                        continue
+                    seen.add(digest)
+                    exported_id = _import_value(record, "id", int)
+                    if exported_id is not None:  # Rows without one cannot own errors or keystrokes
+                        id_map[exported_id] = next_id
+                    pending[kind].append((next_id, *values, _import_value(record, "raw_wpm", float),
+                                          _import_value(record, "consistency_score", float),
+                                          record.get("test_mode") or None, _import_value(record, "epoch", int)))
+                    next_id += 1
+                    counts["results"] += 1
+                elif kind == "error":
+                    test_id = id_map.get(_import_value(record, "test_id", int))
+                    if test_id is None:
+                        continue  # Belongs to a skipped duplicate or to no exported result
+                    pending[kind].append((test_id, record.get("character_intended"), record.get("character_typed"),
+                                          _import_value(record, "position", int), record.get("word_context") or None,
+                                          record.get("finger_mapped") or None, record.get("bigram_context") or None))
+                    counts["errors"] += 1
+                elif kind == "keystrokes":
+                    test_id = id_map.get(_import_value(record, "test_id", int))
+                    if test_id is None:
+                        continue
+                    pending[kind].append((test_id, _import_value(record, "key_count", int),
+                                          base64.b64decode(record.get("events") or "")))
+                    counts["keystrokes"] += 1
+                elif kind == "achievement":
+                    pending[kind].append((record.get("achievement_id"), record.get("date_earned") or None))
+                elif kind == "setting":
+                    key, value = record.get("setting_key"), record.get("setting_value")
+                    if key is None or value is None:
+                        continue
+                    pending[kind].append((key, value))
+                    counts["settings"][key] = value
+                else:
+                    continue  # Export header
+                if len(pending[kind]) >= batch_size:
+                    flush()
+            flush()
+
+            if not recognised:
+                raise ValueError("not a SnakeType export (no record has a known type)")
+            schema.rebuild_summaries(cursor)
+
+            # Achievements are rebuilt once over the merged history rather than per imported row
+            cursor.execute('SELECT achievement_id FROM achievements')
+            unlocked = [row[0] for row in cursor.fetchall()]
+            history = conn.execute('SELECT wpm, accuracy, test_duration, epoch FROM test_results ORDER BY epoch, id')
+            earned = earned_by_history(
+                ((wpm, accuracy, duration, datetime.fromtimestamp(epoch) if epoch is not None else None)
+                 for wpm, accuracy, duration, epoch in history),
+                schema.read_streak(cursor)['longest'], unlocked
+            )
+            cursor.executemany('INSERT OR IGNORE INTO achievements (achievement_id) VALUES (?)',
+                               [(achievement_id,) for achievement_id in earned])
+            counts["achievements"] += len(earned)
+        return counts
+    except (sqlite3.Error, csv.Error, ValueError, TypeError) as e:  # binascii.Error is a ValueError
+        print(f"Error importing statistics: {e}")
+        return None
@@ -0,0 +1,81 @@
+"""History analytics on long histories: fetch, column load and summarize.
+
+Imports a synthetic history through DatabaseManager.import_records, then times
+get_result_history, ResultSeries.from_rows and summarize separately. Uses
+NumPy when it is installed; run with SNAKETYPE_ANALYTICS=python to time the
+pure-Python fallback on the same data.
+
+Usage (from the Python/ directory):
+    python benchmarks/bench_analytics.py [--tests 100000] [--repeat 5]
+    SNAKETYPE_ANALYTICS=python python benchmarks/bench_analytics.py
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from SnakeType import analytics  # noqa: E402
+from SnakeType.SnakeType import DatabaseManager  # noqa: E402
+
+
+def history_records(tests, seed=11):
+    """One test every ~10 minutes up to now, with a slow upward WPM drift"""
+    rng = random.Random(seed)
+    now = int(time.time())
+    for i in range(tests):
+        epoch = now - (tests - i) * 600
+        yield {
+            'type': 'result',
+            'date': datetime.fromtimestamp(epoch).isoformat(sep=' ', timespec='seconds'),
+            'epoch': epoch,
+            'wpm': 40 + 30 * i / tests + rng.gauss(0, 8),
+            'accuracy': min(100.0, rng.gauss(95, 3)),
+            'mistakes': rng.randint(0, 10),
+            'test_duration': 30.0,
+            'difficulty': 'manual',
+            'word_count': 50,
+            'characters_typed': 250,
+            'correct_characters': 240
+        }
+
+
+def best_ms(fn, repeat):
+    """Fastest of repeat calls, in milliseconds, and the last return value"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        value = fn()
+        best = min(best, (time.perf_counter() - start) * 1000)
+    return best, value
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SnakeType history analytics benchmark")
+    parser.add_argument('--tests', type=int, default=100000, help="tests in the synthetic history")
+    parser.add_argument('--repeat', type=int, default=5, help="timed calls per step (best is reported)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DatabaseManager(os.path.join(tmp, 'history.db'))
+        db.import_records(history_records(args.tests))
+
+        fetch_ms, rows = best_ms(db.get_result_history, args.repeat)
+        load_ms, series = best_ms(lambda: analytics.ResultSeries.from_rows(rows), args.repeat)
+        summarize_ms, summary = best_ms(lambda: analytics.summarize(series), args.repeat)
+        db.close()
+
+    print(f"backend: {analytics.BACKEND}, {summary['tests']} tests")
+    print(f"{'step':12} {'best ms':>9}")
+    for name, ms in (('fetch', fetch_ms), ('load', load_ms), ('summarize', summarize_ms)):
+        print(f"{name:12} {ms:9.2f}")
+    print(f"\nWPM p50 {summary['wpm']['p50']:.1f}, trend {summary['wpm_per_week']:+.3f} WPM/week, "
+          f"this week {summary['weekly'][0]['tests']} tests")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""Per-request SQLite latency: one connection per query versus the persistent connection manager.
+
+Replays the query sequence of a web /api/save_result request (insert, error
+patterns, 30-day statistics, streak, a round of achievement unlocks) against
+the terminal DatabaseManager.
+
+Usage (from the Python/ directory):
+    python benchmarks/bench_db.py [--requests 300] [--save results.json]
+"""
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from SnakeType.SnakeType import ACHIEVEMENTS, DatabaseManager  # noqa: E402
+
+
+class ConnectPerQueryDatabaseManager(DatabaseManager):
+    """The previous behaviour: a fresh connection and pragma round-trip for every query"""
+    def get_connection(self):
+        conn = sqlite3.connect(self.db_path, timeout=30.0)
+        conn.execute("PRAGMA foreign_keys = ON")
+        conn.execute("PRAGMA journal_mode = WAL")
+        return conn
+
+
+def simulate_request(db, i):
+    """The DatabaseManager calls made while saving one test result; returns the query count"""
+    db.save_completed_test({
+        'result': (40.0 + i % 50, 95.0, 3, 30.0, "medium", 50, 250, 245),
+        'errors': [("e", "r", 5, "hello"), ("t", "y", 9, "there")],
+        'achievements': list(ACHIEVEMENTS)[:9]
+    })
+    db.get_statistics(days=30)
+    db.get_streak_count()
+    db.get_achievements()
+    return 18
+
+
+def measure(manager_class, requests, tmp):
+    db = manager_class(os.path.join(tmp, f"{manager_class.__name__}.db"))
+    samples = []
+    queries = 0
+    for i in range(requests):
+        start = time.perf_counter_ns()
+        queries += simulate_request(db, i)
+        samples.append(time.perf_counter_ns() - start)
+    db.close()
+
+    ordered = sorted(samples)
+
+    def pct(p):
+        return ordered[min(len(ordered) - 1, int(p * len(ordered)))] / 1000
+
+    return {
+        'requests': requests,
+        'queries': queries,
+        'p50_us': pct(0.50),
+        'p90_us': pct(0.90),
+        'p99_us': pct(0.99),
+        'per_query_us': sum(samples) / queries / 1000
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SnakeType SQLite connection benchmark")
+    parser.add_argument('--requests', type=int, default=300, help="simulated save_result requests per variant")
+    parser.add_argument('--save', help="write results to this JSON file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        results = {
+            'connect_per_query': measure(ConnectPerQueryDatabaseManager, args.requests, tmp),
+            'persistent': measure(DatabaseManager, args.requests, tmp)
+        }
+
+    print(f"{'variant':20} {'p50 µs':>10} {'p90 µs':>10} {'p99 µs':>10} {'µs/query':>10}")
+    for name, r in results.items():
+        print(f"{name:20} {r['p50_us']:10.1f} {r['p90_us']:10.1f} {r['p99_us']:10.1f} {r['per_query_us']:10.1f}")
+    before, after = results['connect_per_query'], results['persistent']
+    print(f"\np50 speedup: {before['p50_us'] / after['p50_us']:.1f}x")
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+            f.write("\n")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,253 @@
+"""Micro-benchmarks for the SnakeType terminal engine hot paths.
+
+Usage (from the Python/ directory):
+    python benchmarks/bench_engine.py                          # run and print
+    python benchmarks/bench_engine.py --save benchmarks/baseline.json
+    python benchmarks/bench_engine.py --compare benchmarks/baseline.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from SnakeType.SnakeType import (  # noqa: E402
+    COMMON_WORDS, DatabaseManager, KeystrokeLog, PerformanceTracker, TypingGame
+)
+
+SEED = 1234
+WORD_COUNTS = (50, 200, 10000)
+MAX_KEYSTROKES = 3000  # Per-keystroke benchmarks stop here on long texts
+DISPLAY_SAMPLES = 200  # Screen builders are sampled at this many positions
+DB_ITERATIONS = 50
+
+
+def make_text(word_count, rng):
+    """Seeded target text drawn from the common word list"""
+    return " ".join(rng.choices(COMMON_WORDS, k=word_count))
+
+
+def make_keystream(text, rng, error_rate=0.03, backspace_rate=0.02, limit=MAX_KEYSTROKES):
+    """Synthetic (perf_counter_ns, key) stream with typos and corrections at ~70 WPM"""
+    keys = []
+    timestamp_ns = 1_000_000_000
+    for char in text[:limit]:
+        timestamp_ns += int(rng.gauss(170e6, 40e6)) if len(keys) else 0
+        if rng.random() < backspace_rate:
+            keys.append((timestamp_ns, rng.choice("abcdefghijklmnopqrstuvwxyz")))
+            timestamp_ns += int(rng.gauss(200e6, 50e6))
+            keys.append((timestamp_ns, '\x7f'))
+            timestamp_ns += int(rng.gauss(170e6, 40e6))
+        typed = rng.choice("abcdefghijklmnopqrstuvwxyz") if rng.random() < error_rate else char
+        keys.append((timestamp_ns, typed))
+    return keys
+
+
+def summarize(samples_ns, peak_bytes):
+    """Latency percentiles in microseconds plus the traced allocation peak"""
+    ordered = sorted(samples_ns)
+    n = len(ordered)
+
+    def pct(p):
+        return ordered[min(n - 1, int(p * n))] / 1000
+
+    return {
+        'calls': n,
+        'mean_us': sum(ordered) / n / 1000,
+        'p50_us': pct(0.50),
+        'p90_us': pct(0.90),
+        'p99_us': pct(0.99),
+        'max_us': ordered[-1] / 1000,
+        'peak_alloc_kib': peak_bytes / 1024
+    }
+
+
+def timed(make_calls):
+    """Per-call ns latencies and the traced allocation peak for a benchmark
+
+    make_calls sets up fresh state and returns the zero-argument callables to
+    run; it is invoked twice so tracemalloc overhead never skews the timings.
+    """
+    tracemalloc.start()
+    baseline, _ = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    for call in make_calls():
+        call()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    samples = []
+    clock = time.perf_counter_ns
+    for call in make_calls():
+        start = clock()
+        call()
+        samples.append(clock() - start)
+    return samples, max(0, peak - baseline)
+
+
+def new_game(db_path):
+    game = TypingGame(db_path)
+    game.headless = True
+    return game
+
+
+def bench_handle_key(game, text, keystream):
+    def make_calls():
+        game.start_test(text)
+        return [lambda k=key: game.handle_key(*k) for key in keystream]
+    return summarize(*timed(make_calls))
+
+
+def bench_calculate_stats(game, text, keystream):
+    def make_calls():
+        game.start_test(text)
+        calls = []
+        for timestamp_ns, char in keystream:
+            def call(ts=timestamp_ns, ch=char):
+                if not game.start_time:
+                    game.start_time = ts / 1e9
+                if ch == '\x7f':
+                    game.backspace()
+                else:
+                    game.type_char(ch)
+                game.calculate_stats(ts / 1e9)
+            calls.append(call)
+        return calls
+    return summarize(*timed(make_calls))
+
+
+def bench_display(game, text, keystream, builder_name):
+    game.start_test(text)
+    game.headless = True
+    for key in keystream:
+        if not game.handle_key(*key):
+            break
+    typed = game.user_input
+    builder = getattr(game, builder_name)
+    positions = sorted({int(len(typed) * i / DISPLAY_SAMPLES) for i in range(DISPLAY_SAMPLES)})
+
+    def call_at(position):
+        game.user_input = typed[:position]
+        builder()
+
+    return summarize(*timed(lambda: [lambda p=position: call_at(p) for position in positions]))
+
+
+def bench_add_keystroke(keystream):
+    def make_calls():
+        tracker = PerformanceTracker()
+        return [lambda ts=ts, i=i: tracker.add_keystroke(ts / 1e9, i)
+                for i, (ts, _) in enumerate(keystream)]
+    return summarize(*timed(make_calls))
+
+
+def bench_detect_patterns(game, text, keystream):
+    game.start_test(text)
+    for key in keystream:
+        if not game.handle_key(*key):
+            break
+    typed, target = game.user_input, game.current_text
+    return summarize(*timed(lambda: [lambda: PerformanceTracker().detect_typing_patterns(typed, target)
+                                     for _ in range(20)]))
+
+
+def bench_db_writes(db_path, rng):
+    db = DatabaseManager(db_path)
+    log = KeystrokeLog()
+    timestamp_ns = 0
+    for _ in range(300):
+        timestamp_ns += int(rng.gauss(170e6, 40e6))
+        log.record(timestamp_ns, rng.choice("abcdefgh "), KeystrokeLog.ACTION_TYPE)
+    errors = [("e", "r", i, "hello") for i in range(10)]
+
+    def write():
+        db.save_completed_test({'result': (72.5, 96.0, 10, 42.0, "manual", 50, 300, 290),
+                                'errors': errors, 'keystroke_log': log})
+
+    return summarize(*timed(lambda: [write] * DB_ITERATIONS))
+
+
+def run_benchmarks():
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        game = new_game(os.path.join(tmp, 'bench_game.db'))
+        for word_count in WORD_COUNTS:
+            rng = random.Random(SEED + word_count)
+            text = make_text(word_count, rng)
+            keystream = make_keystream(text, rng)
+            suffix = f"[{word_count}w]"
+            results['handle_key' + suffix] = bench_handle_key(game, text, keystream)
+            results['calculate_stats' + suffix] = bench_calculate_stats(game, text, keystream)
+            results['display_enhanced_text' + suffix] = bench_display(game, text, keystream, 'display_enhanced_text')
+            results['display_animated_progress_bar' + suffix] = bench_display(game, text, keystream, 'display_animated_progress_bar')
+            results['add_keystroke' + suffix] = bench_add_keystroke(keystream)
+            results['detect_typing_patterns' + suffix] = bench_detect_patterns(game, text, keystream)
+        results['db_write_test'] = bench_db_writes(os.path.join(tmp, 'bench_writes.db'), random.Random(SEED))
+    return results
+
+
+def print_results(results):
+    print(f"{'benchmark':45} {'calls':>6} {'p50 µs':>10} {'p90 µs':>10} {'p99 µs':>10} {'max µs':>10} {'peak KiB':>9}")
+    for name, r in results.items():
+        print(f"{name:45} {r['calls']:6d} {r['p50_us']:10.1f} {r['p90_us']:10.1f} "
+              f"{r['p99_us']:10.1f} {r['max_us']:10.1f} {r['peak_alloc_kib']:9.1f}")
+
+
+def compare(results, baseline, threshold):
+    """Print p50/p99 deltas against a baseline; returns the names that regressed"""
+    regressions = []
+    print(f"\n{'benchmark':45} {'p50 Δ%':>9} {'p99 Δ%':>9}")
+    for name, r in results.items():
+        base = baseline.get(name)
+        if not base:
+            print(f"{name:45} {'new':>9}")
+            continue
+        deltas = [(r[key] - base[key]) / base[key] * 100 if base[key] else 0 for key in ('p50_us', 'p99_us')]
+        flag = " REGRESSION" if deltas[0] > threshold else ""
+        if flag:
+            regressions.append(name)
+        print(f"{name:45} {deltas[0]:+9.1f} {deltas[1]:+9.1f}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SnakeType engine micro-benchmarks")
+    parser.add_argument('--save', help="write results to this baseline JSON file")
+    parser.add_argument('--compare', help="compare against a baseline JSON file")
+    parser.add_argument('--threshold', type=float, default=25.0,
+                        help="p50 slowdown (percent) reported as a regression")
+    args = parser.parse_args()
+
+    results = run_benchmarks()
+    print_results(results)
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({
+                'meta': {
+                    'created': datetime.now().isoformat(timespec='seconds'),
+                    'python': platform.python_version(),
+                    'platform': platform.platform(),
+                    'seed': SEED
+                },
+                'results': results
+            }, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"\nBaseline saved to {args.save}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['results']
+        if compare(results, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
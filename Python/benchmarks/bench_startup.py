@@ -0,0 +1,202 @@
+"""Cold-start cost of the terminal entry point: import time and wall-clock to the first menu.
+
+Each run launches a fresh interpreter on `from SnakeType import main; main()`
+in a scratch working directory, times how long it takes for the menu prompt
+to reach stdout, then answers Quit. "first launch" creates the database,
+"returning" reopens one that already holds a few weeks of results. A
+separate `-X importtime` run breaks the import down by module.
+
+Usage (from the Python/ directory):
+    python benchmarks/bench_startup.py                                  # run and print
+    python benchmarks/bench_startup.py --save benchmarks/startup_baseline.json
+    python benchmarks/bench_startup.py --compare benchmarks/startup_baseline.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+PYTHON_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, PYTHON_DIR)
+
+from SnakeType.SnakeType import DatabaseManager  # noqa: E402
+
+MENU_PROMPT = b"Enter your choice"
+QUIT_CHOICE = b"12\n"
+MENU_BUDGET_MS = 100.0
+HISTORY_TESTS = 600
+
+
+def child_env():
+    """Environment for the measured interpreter: package importable, bytecode cache allowed"""
+    env = dict(os.environ)
+    env.pop('PYTHONDONTWRITEBYTECODE', None)  # Otherwise every run recompiles the module
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [os.path.abspath(PYTHON_DIR), env.get('PYTHONPATH')]))
+    env['TERM'] = env.get('TERM', 'xterm')
+    return env
+
+
+def populate(db_path, tests=HISTORY_TESTS):
+    """A returning user's database: a few weeks of results, errors and achievements"""
+    rng = random.Random(7)
+    db = DatabaseManager(db_path)
+    for i in range(tests):
+        db.save_completed_test({
+            'result': (rng.uniform(20, 100), rng.uniform(80, 100), 2, 30.0, "manual", 50, 250, 245),
+            'errors': [("e", "r", 2, "there"), ("t", "y", 0, "the q")],
+            'achievements': ["speed_demon", "persistent", "consistent"] if i == 0 else []
+        })
+    db.close()
+
+
+def time_to_menu(workdir):
+    """Milliseconds from process launch until the menu prompt is written"""
+    start = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, '-c', 'from SnakeType import main; main()'],
+                            cwd=workdir, env=child_env(),
+                            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    output = b""
+    while MENU_PROMPT not in output:
+        chunk = os.read(proc.stdout.fileno(), 65536)
+        if not chunk:
+            proc.wait()
+            raise RuntimeError("SnakeType exited before showing the menu")
+        output += chunk
+    elapsed = (time.perf_counter() - start) * 1000
+    proc.communicate(QUIT_CHOICE)
+    return elapsed
+
+
+def interpreter_ms(runs):
+    """Median bare interpreter start, the floor under every other number"""
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-c', 'pass'], env=child_env(), check=True)
+        samples.append((time.perf_counter() - start) * 1000)
+    return sorted(samples)[len(samples) // 2]
+
+
+def import_profile(top=8):
+    """Total `import SnakeType` time and the slowest top-level imports, from -X importtime"""
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import SnakeType'],
+                          env=child_env(), capture_output=True, text=True, check=True)
+    modules = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        modules.append((name.rstrip(), int(self_us), int(cumulative_us)))
+    total = next(cumulative for name, _, cumulative in modules if name.strip() == 'SnakeType')
+    children = [(name.strip(), cumulative) for name, _, cumulative in modules
+                if len(name) - len(name.lstrip()) == 5]  # Imported directly by SnakeType.SnakeType
+    return total / 1000, sorted(children, key=lambda item: item[1], reverse=True)[:top]
+
+
+def summarize(samples):
+    ordered = sorted(samples)
+    return {
+        'runs': len(ordered),
+        'min_ms': ordered[0],
+        'p50_ms': ordered[len(ordered) // 2],
+        'max_ms': ordered[-1]
+    }
+
+
+def run_benchmarks(runs):
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        time_to_menu(tmp)  # Warm the OS file cache and write bytecode
+        first = []
+        for i in range(runs):
+            workdir = os.path.join(tmp, f"first{i}")
+            os.mkdir(workdir)
+            first.append(time_to_menu(workdir))
+        results['menu_first_launch'] = summarize(first)
+
+        returning = os.path.join(tmp, "returning")
+        os.mkdir(returning)
+        populate(os.path.join(returning, "typing_stats.db"))
+        results['menu_returning'] = summarize([time_to_menu(returning) for _ in range(runs)])
+
+    results['interpreter'] = {'p50_ms': interpreter_ms(runs)}
+    import_ms, slowest = import_profile()
+    results['import'] = {'p50_ms': import_ms}
+    return results, slowest
+
+
+def compare(results, baseline, threshold):
+    """Print p50 deltas against a baseline; returns the names that regressed"""
+    regressions = []
+    print(f"\n{'measurement':20} {'p50 Δ%':>9}")
+    for name, r in results.items():
+        base = baseline.get(name)
+        if not base:
+            print(f"{name:20} {'new':>9}")
+            continue
+        delta = (r['p50_ms'] - base['p50_ms']) / base['p50_ms'] * 100 if base['p50_ms'] else 0
+        flag = " REGRESSION" if delta > threshold else ""
+        if flag:
+            regressions.append(name)
+        print(f"{name:20} {delta:+9.1f}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SnakeType startup benchmark")
+    parser.add_argument('--runs', type=int, default=15, help="launches per measurement")
+    parser.add_argument('--save', help="write results to this baseline JSON file")
+    parser.add_argument('--compare', help="compare against a baseline JSON file")
+    parser.add_argument('--threshold', type=float, default=25.0,
+                        help="p50 slowdown (percent) reported as a regression")
+    parser.add_argument('--budget', type=float, default=MENU_BUDGET_MS,
+                        help="fail if a p50 time to menu exceeds this many milliseconds")
+    args = parser.parse_args()
+
+    results, slowest = run_benchmarks(args.runs)
+
+    print(f"{'measurement':20} {'min ms':>9} {'p50 ms':>9} {'max ms':>9}")
+    for name, r in results.items():
+        if 'min_ms' in r:
+            print(f"{name:20} {r['min_ms']:9.1f} {r['p50_ms']:9.1f} {r['max_ms']:9.1f}")
+        else:
+            print(f"{name:20} {'':9} {r['p50_ms']:9.1f}")
+    print("\nslowest imports (cumulative ms):")
+    for name, cumulative_us in slowest:
+        print(f"  {name:30} {cumulative_us / 1000:7.1f}")
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({
+                'meta': {
+                    'created': datetime.now().isoformat(timespec='seconds'),
+                    'python': platform.python_version(),
+                    'platform': platform.platform(),
+                    'runs': args.runs
+                },
+                'results': results
+            }, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"\nBaseline saved to {args.save}")
+
+    failed = [name for name in ('menu_first_launch', 'menu_returning') if results[name]['p50_ms'] > args.budget]
+    for name in failed:
+        print(f"\n{name}: p50 {results[name]['p50_ms']:.1f} ms is over the {args.budget:.0f} ms budget")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['results']
+        failed += compare(results, baseline, args.threshold)
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
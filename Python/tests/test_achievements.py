@@ -0,0 +1,59 @@
+"""The achievement engine reads the streak from streak_state instead of counting days itself."""
+import io
+import json
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from SnakeType import schema, transfer
+from SnakeType.achievements import AchievementEngine
+from SnakeType.SnakeType import DatabaseManager
+
+RESULT = (50.0, 95.0, 1, 30.0, "manual", 10, 50, 48)
+NOON = datetime(2026, 3, 4, 12, 0)  # A Wednesday, so no time-of-day or weekend rule fires
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = DatabaseManager(str(tmp_path / "stats.db"))
+    yield db
+    db.close()
+
+
+def test_record_leaves_the_streak_rule_to_check_streak():
+    engine = AchievementEngine()
+    assert "streak_master" not in engine.record(50, 95, 30, when=NOON)
+    assert engine.check_streak(6) == []
+    assert engine.check_streak(7) == ["streak_master"]
+    assert engine.check_streak(8) == []  # Already unlocked
+
+
+def test_saved_test_unlocks_streak_from_stored_state(db):
+    with db.get_connection() as conn:
+        cursor = conn.cursor()
+        for days_ago in range(6, 0, -1):
+            cursor.execute("INSERT INTO daily_streaks (date, tests_completed) VALUES (?, 1)",
+                           (date.today() - timedelta(days=days_ago),))
+        schema.recompute_streak(cursor)
+
+    engine = AchievementEngine(**db.get_achievement_counters())
+    achievements = engine.record(*RESULT[:2], RESULT[3], when=NOON)
+    test_id = db.save_completed_test({'result': RESULT, 'achievements': achievements,
+                                      'check_streak': engine.check_streak, 'date': date.today()})
+
+    assert test_id
+    assert achievements == ["streak_master"]  # Extended in place by the writer's transaction
+    assert [row[0] for row in db.get_achievements()] == ["streak_master"]
+
+
+def test_import_rebuilds_achievements_from_results(db):
+    results = [{"type": "result", "id": i, "date": f"2026-03-04 12:{i:02d}:00", "wpm": 85 + i, "accuracy": 99,
+                "mistakes": 0, "test_duration": 30, "difficulty": "manual", "word_count": 10,
+                "characters_typed": 50, "correct_characters": 50} for i in range(10)]
+    stream = io.StringIO("".join(json.dumps(record) + "\n" for record in results))
+
+    counts = db.import_records(transfer.iter_import_records(stream))
+
+    earned = {"speed_demon", "accuracy_master", "persistent", "consistent"}
+    assert counts["achievements"] == len(earned)
+    assert {row[0] for row in db.get_achievements()} == earned
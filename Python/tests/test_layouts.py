@@ -0,0 +1,26 @@
+"""Built-in layouts compile once; JSON layout files are recompiled after they change on disk."""
+import json
+import os
+
+from SnakeType.layouts import get_layout
+
+ROWS = ["`1234567890-=", "qwertyuiop[]", "asdfghjkl;'", "zxcvbnm,./"]
+
+
+def write_layout(path, name, mtime_ns):
+    path.write_text(json.dumps({"name": name, "rows": ROWS}), encoding="utf-8")
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def test_builtin_layout_is_cached():
+    assert get_layout("dvorak") is get_layout("dvorak")
+
+
+def test_edited_layout_file_is_reloaded(tmp_path):
+    path = tmp_path / "custom.json"
+    write_layout(path, "before", 1_000_000_000)
+    layout = get_layout(str(path))
+    assert get_layout(str(path)) is layout
+
+    write_layout(path, "after", 2_000_000_000)
+    assert get_layout(str(path)).name == "after"
@@ -0,0 +1,32 @@
+"""The live WPM keeps moving while the typist pauses, driven by the idle ticker's samples."""
+from SnakeType.SnakeType import PerformanceTracker
+
+
+def typed_tracker(keys=60, interval=0.15):
+    tracker = PerformanceTracker()
+    for i in range(1, keys + 1):
+        tracker.add_keystroke(i * interval, i)
+    return tracker, keys * interval
+
+
+def test_idle_samples_decay_live_wpm():
+    tracker, last_key = typed_tracker()
+    readings = [tracker.get_current_wpm()]
+    for tick in range(1, 9):
+        tracker.add_idle_sample(last_key + 0.5 * tick)
+        readings.append(tracker.get_current_wpm())
+    assert all(later < earlier for earlier, later in zip(readings, readings[1:]))
+
+
+def test_idle_sample_after_window_empties_decays_towards_zero():
+    tracker, last_key = typed_tracker()
+    for tick in range(1, 40):
+        tracker.add_idle_sample(last_key + 10 + tick)  # Every keystroke has left the 10 s window
+    assert tracker.get_current_wpm() < 1
+
+
+def test_idle_sample_before_any_wpm_is_ignored():
+    tracker = PerformanceTracker()
+    tracker.add_keystroke(1.0, 1)
+    tracker.add_idle_sample(5.0)
+    assert tracker.get_current_wpm() == 0
@@ -0,0 +1,61 @@
+"""The hot DatabaseManager queries must keep using their indexes.
+
+Each query runs through the real DatabaseManager method on a populated
+scratch database; the SQL it issues is captured and checked with EXPLAIN
+QUERY PLAN. A full table scan, or a plan that stops using the expected
+index, fails the test.
+"""
+import random
+
+import pytest
+
+from SnakeType.SnakeType import DatabaseManager
+
+# method name, arguments, index each SELECT on the hot table must use
+EXPECTED_PLANS = [
+    ('get_statistics', (30,), 'idx_test_results_epoch'),
+    ('get_recent_results', (30, 10), 'idx_test_results_epoch'),
+    ('get_result_history', (30,), 'idx_test_results_epoch'),
+    ('get_error_analysis', (30,), 'PRIMARY KEY'),
+    ('get_weak_ngrams', (30,), 'idx_error_patterns_test'),
+    ('get_rollup_summary', (30,), 'PRIMARY KEY'),
+    ('get_tests_today', (), 'PRIMARY KEY'),
+    ('get_streak_info', (), 'PRIMARY KEY'),
+]
+
+
+@pytest.fixture(scope='module')
+def db(tmp_path_factory):
+    db = DatabaseManager(str(tmp_path_factory.mktemp('plans') / 'plans.db'))
+    rng = random.Random(7)
+    for _ in range(500):
+        db.save_completed_test({
+            'result': (rng.uniform(20, 100), rng.uniform(80, 100), 2, 30.0, "manual", 50, 250, 245),
+            'errors': [("e", "r", 2, "there"), ("t", "y", 0, "the q")]
+        })
+    with db.get_connection() as conn:
+        conn.execute('ANALYZE')
+    yield db
+    db.close()
+
+
+def captured_selects(db, method, args):
+    statements = []
+    conn = db.get_connection()
+    conn.set_trace_callback(statements.append)
+    try:
+        getattr(db, method)(*args)
+    finally:
+        conn.set_trace_callback(None)
+    return [sql for sql in statements if sql.lstrip().upper().startswith('SELECT')]
+
+
+@pytest.mark.parametrize('method, args, index', EXPECTED_PLANS, ids=[plan[0] for plan in EXPECTED_PLANS])
+def test_query_uses_index(db, method, args, index):
+    selects = captured_selects(db, method, args)
+    assert selects, f"{method} issued no SELECT"
+    conn = db.get_connection()
+    for sql in selects:
+        plan = [row[3] for row in conn.execute('EXPLAIN QUERY PLAN ' + sql)]
+        scans = [step for step in plan if step.startswith('SCAN') and 'INDEX' not in step]
+        assert any(index in step for step in plan) and not scans, " | ".join(plan)
@@ -0,0 +1,121 @@
+"""IncrementalScorer must agree with a full rescan of the input after every edit.
+
+Random edit sequences mix typing (right and wrong characters), backspace
+and word-delete. After every step the scorer's counts and error list are
+compared with the full-rescan logic calculate_stats used before the scorer
+existed.
+"""
+import random
+
+import pytest
+
+from SnakeType.SnakeType import IncrementalScorer, TypingGame
+
+TARGET = "the quick brown fox jumps over the lazy dog while typing tests count every key"
+SEEDS = range(200)
+
+
+def rescan(target, typed):
+    """The original O(n) calculate_stats scoring: (correct, errors, accuracy)"""
+    correct = 0
+    errors = []
+    for i in range(min(len(typed), len(target))):
+        if typed[i] == target[i]:
+            correct += 1
+        else:
+            errors.append({
+                'position': i,
+                'expected': target[i],
+                'typed': typed[i],
+                'context': target[max(0, i-2):i+3]
+            })
+    accuracy = (correct / len(typed)) * 100 if typed else 100
+    return correct, errors, accuracy
+
+
+def word_start(typed):
+    """Length typed would have after deleting back over the last word (Ctrl+W)"""
+    end = len(typed.rstrip(" "))
+    return typed.rfind(" ", 0, end) + 1
+
+
+def edits(rng, steps=150):
+    """Random edit operations: ('type', char), ('backspace',) or ('word_delete',)"""
+    for _ in range(steps):
+        roll = rng.random()
+        if roll < 0.7:
+            yield ('type', None)
+        elif roll < 0.9:
+            yield ('backspace',)
+        else:
+            yield ('word_delete',)
+
+
+def next_char(rng, target, position):
+    """Usually the expected character, sometimes a typo, occasionally past the end of the target"""
+    if position < len(target) and rng.random() < 0.8:
+        return target[position]
+    return rng.choice("abcdefghijklmnopqrstuvwxyz ")
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_scorer_matches_rescan(seed):
+    rng = random.Random(seed)
+    scorer = IncrementalScorer(TARGET)
+    typed = ""
+    for op in edits(rng):
+        if op[0] == 'type':
+            char = next_char(rng, TARGET, len(typed))
+            typed += char
+            scorer.append(char)
+        elif op[0] == 'backspace':
+            typed = typed[:-1]
+            scorer.backspace()
+        else:
+            keep = word_start(typed)
+            while len(typed) > keep:
+                typed = typed[:-1]
+                scorer.backspace()
+
+        correct, errors, accuracy = rescan(TARGET, typed)
+        assert scorer.typed_length == len(typed)
+        assert scorer.correct_chars == correct
+        assert scorer.mistakes == len(errors)
+        assert scorer.get_error_positions() == errors
+        assert scorer.get_accuracy() == pytest.approx(accuracy)
+
+
+@pytest.fixture
+def game(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # The database opens lazily, but never next to the checkout
+    game = TypingGame()
+    game.current_text = TARGET
+    game.scorer.reset(TARGET)
+    game.start_time = 1.0
+    return game
+
+
+@pytest.mark.parametrize('seed', range(50))
+def test_game_stats_match_rescan(game, seed):
+    """Edits through the game, including wholesale user_input replacements, keep calculate_stats exact"""
+    rng = random.Random(seed)
+    for op in edits(rng):
+        roll = rng.random()
+        if op[0] == 'type':
+            game.type_char(next_char(rng, TARGET, len(game.user_input)))
+        elif op[0] == 'backspace':
+            game.backspace()
+        elif roll < 0.5:
+            game.user_input = game.user_input[:word_start(game.user_input)]
+        else:
+            # Same length, different content: a length-only resync check would miss this
+            game.user_input = "".join(rng.choice("xyz ") for _ in game.user_input)
+
+        game.calculate_stats(now=60.0)
+        if not game.user_input:
+            continue
+        correct, errors, accuracy = rescan(TARGET, game.user_input)
+        assert game.correct_chars == correct
+        assert game.mistakes == len(errors)
+        assert game.current_accuracy == pytest.approx(accuracy)
+        assert game._sync_scorer().get_error_positions() == errors
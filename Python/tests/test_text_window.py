@@ -0,0 +1,41 @@
+"""The live test screen styles only a window of wrapped lines that follows the cursor."""
+import pytest
+
+from SnakeType.SnakeType import TEXT_WINDOW_LINES, TypingGame, _wrap_text
+
+TEXT = " ".join(f"word{i:04d}" for i in range(2000))
+
+
+def line_text(line):
+    return "".join(glyph for _, glyph in line)
+
+
+@pytest.fixture
+def game(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    game = TypingGame()
+    game.current_text = TEXT
+    return game
+
+
+def test_wrap_drops_the_breaking_space_and_covers_the_text():
+    starts, ends = _wrap_text(TEXT, 80)
+    assert starts[0] == 0 and ends[-1] == len(TEXT)
+    for end, next_start in zip(ends, starts[1:]):
+        assert TEXT[end] == " " and next_start == end + 1
+
+
+@pytest.mark.parametrize('typed_fraction', [0, 0.5, 1])
+def test_window_follows_the_cursor(game, typed_fraction):
+    typed = int(len(TEXT) * typed_fraction)
+    game.user_input = TEXT[:typed]
+    starts, ends = _wrap_text(TEXT, game.text_wrap_width)
+    cursor_line = next(k for k in reversed(range(len(starts))) if starts[k] <= typed)
+
+    lines = game.display_enhanced_text()
+    text_lines = [line for line in lines if "│" in line_text(line)]
+    numbers = [int(line_text(line).split("│")[0]) for line in text_lines]
+
+    assert len(text_lines) == TEXT_WINDOW_LINES
+    assert numbers == list(range(numbers[0], numbers[0] + TEXT_WINDOW_LINES))
+    assert numbers[0] - 1 <= cursor_line < numbers[0] - 1 + TEXT_WINDOW_LINES
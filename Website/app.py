@@ -1,13 +1,28 @@
-from flask import Flask, render_template, request, jsonify, session, url_for
+from flask import Flask, render_template, request, jsonify, session, url_for, Response, stream_with_context
 from flask_socketio import SocketIO, emit
 import random
 import time
 import json
+import io
 import sqlite3
-from datetime import datetime
+from datetime import datetime, timedelta
+from itertools import chain
 import os
+import sys
+import atexit
+import threading
 from pathlib import Path
 
+# The repository's shared package comes first, so an older installed SnakeType can't shadow it
+REPO_PYTHON_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Python')
+if os.path.isdir(REPO_PYTHON_DIR):
+    sys.path.insert(0, REPO_PYTHON_DIR)
+
+from SnakeType.corpus import WordCorpus, iter_text_words
+from SnakeType.achievements import AchievementEngine
+from SnakeType.layouts import LAYOUTS, get_layout
+from SnakeType import schema, analytics, transfer
+
 app = Flask(__name__, static_folder='static', static_url_path='/static')
 app.config['SECRET_KEY'] = 'your-secret-key-here'
 socketio = SocketIO(app, cors_allowed_origins="*")
@@ -39,66 +54,7 @@ def init_database(db_path):
     """Initialize database tables"""
     try:
         conn = sqlite3.connect(db_path, timeout=30.0)
-        cursor = conn.cursor()
-
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS test_results (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                wpm REAL NOT NULL CHECK(wpm >= 0),
-                accuracy REAL NOT NULL CHECK(accuracy >= 0 AND accuracy <= 100),
-                mistakes INTEGER NOT NULL CHECK(mistakes >= 0),
-                test_duration REAL NOT NULL CHECK(test_duration > 0),
-                difficulty TEXT NOT NULL,
-                word_count INTEGER NOT NULL CHECK(word_count > 0),
-                characters_typed INTEGER NOT NULL CHECK(characters_typed >= 0),
-                correct_characters INTEGER NOT NULL CHECK(correct_characters >= 0),
-                raw_wpm REAL DEFAULT 0,
-                consistency_score REAL DEFAULT 0,
-                test_mode TEXT DEFAULT 'standard'
-            )
-        ''')
-
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS achievements (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                achievement_id TEXT NOT NULL,
-                date_earned TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                UNIQUE(achievement_id)
-            )
-        ''')
-
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS error_patterns (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                test_id INTEGER NOT NULL,
-                character_intended TEXT NOT NULL,
-                character_typed TEXT NOT NULL,
-                position INTEGER NOT NULL CHECK(position >= 0),
-                word_context TEXT,
-                finger_mapped TEXT,
-                bigram_context TEXT,
-                FOREIGN KEY (test_id) REFERENCES test_results (id) ON DELETE CASCADE
-            )
-        ''')
-
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS daily_streaks (
-                date DATE PRIMARY KEY,
-                tests_completed INTEGER DEFAULT 0 CHECK(tests_completed >= 0)
-            )
-        ''')
-
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS user_settings (
-                id INTEGER PRIMARY KEY,
-                setting_key TEXT UNIQUE NOT NULL,
-                setting_value TEXT NOT NULL,
-                last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-
-        conn.commit()
+        schema.migrate(conn)
         conn.close()
     except sqlite3.Error as e:
         print(f"Database initialization error: {e}")
@@ -131,6 +87,9 @@ HARD_WORDS = [
 
 COMMON_WORDS = ["the", "of", "and", "to", "a", "in", "is", "it", "you", "that", "he", "was", "for", "on", "are", "as", "with", "his", "they", "i", "at", "be", "this", "have", "from", "or", "one", "had", "by", "word", "but", "not", "what", "all", "were", "we", "when", "your", "can", "said", "there", "each", "which", "she", "do", "how", "their", "if", "will", "up", "other", "about", "out", "many", "then", "them", "these", "so", "some", "her", "would", "make", "like", "into", "him", "has", "two", "more", "very", "after", "words", "first", "where", "been", "who", "its", "now", "find", "long", "down", "way", "may", "come", "could", "people", "my", "than", "water", "part", "time", "work", "right", "new", "take", "get", "place", "made", "live", "where", "after", "back", "little", "only", "round", "man", "year", "came", "show", "every", "good", "me", "give", "our", "under", "name", "very", "through", "just", "form", "sentence", "great", "think", "say", "help", "low", "line", "differ", "turn", "cause", "much", "mean", "before", "move", "right", "boy", "old", "too", "same", "tell", "does", "set", "three", "want", "air", "well", "also", "play", "small", "end", "put", "home", "read", "hand", "port", "large", "spell", "add", "even", "land", "here", "must", "big", "high", "such", "follow", "act", "why", "ask", "men", "change", "went", "light", "kind", "off", "need", "house", "picture", "try", "us", "again", "animal", "point", "mother", "world", "near", "build", "self", "earth", "father", "head", "stand", "own", "page", "should", "country", "found", "answer", "school", "grow", "study", "still", "learn", "plant", "cover", "food", "sun", "four", "between", "state", "keep", "eye", "never", "last", "let", "thought", "city", "tree", "cross", "farm", "hard", "start", "might", "story", "saw", "far", "sea", "draw", "left", "late", "run", "don't", "while", "press", "close", "night", "real", "life", "few", "north", "open", "seem", "together", "next", "white", "children", "begin", "got", "walk", "example", "ease", "paper", "group", "always", "music", "those", "both", "mark", "often", "letter", "until", "mile", "river", "car", "feet", "care", "second", "book", "carry", "took", "science", "eat", "room", "friend", "began", "idea", "fish", "mountain", "stop", "once", "base", "hear", "horse", "cut", "sure", "watch", "color", "face", "wood", "main", "enough", "plain", "girl", "usual", "young", "ready", "above", "ever", "red", "list", "though", "feel", "talk", "bird", "soon", "body", "dog", "family", "direct", "pose", "leave", "song", "measure", "door", "product", "black", "short", "numeral", "class", "wind", "question", "happen", "complete", "ship", "area", "half", "rock", "order", "fire", "south", "problem", "piece", "told", "knew", "pass", "since", "top", "whole", "king", "space", "heard", "best", "hour", "better", "during", "hundred", "five", "remember", "step", "early", "hold", "west", "ground", "interest", "reach", "fast", "verb", "sing", "listen", "six", "table", "travel", "less", "morning", "ten", "simple", "several", "vowel", "toward", "war", "lay", "against", "pattern", "slow", "center", "love", "person", "money", "serve", "appear", "road", "map", "rain", "rule", "govern", "pull", "cold", "notice", "voice", "unit", "power", "town", "fine", "certain", "fly", "fall", "lead", "cry", "dark", "machine", "note", "wait", "plan", "figure", "star", "box", "noun", "field", "rest", "correct", "able", "pound", "done", "beauty", "drive", "stood", "contain", "front", "teach", "week", "final", "gave", "green", "oh", "quick", "develop", "ocean", "warm", "free", "minute", "strong", "special", "mind", "behind", "clear", "tail", "produce", "fact", "street", "inch", "multiply", "nothing", "course", "stay", "wheel", "full", "force", "blue", "object", "decide", "surface", "deep", "moon", "island", "foot", "system", "busy", "test", "record", "boat", "common", "gold", "possible", "plane", "stead", "dry", "wonder", "laugh", "thousands", "ago", "ran", "check", "game", "shape", "equate", "hot", "miss", "brought", "heat", "snow", "tire", "bring", "yes", "distant", "fill", "east", "paint", "language", "among"]
 
+# Optional large frequency list for 'common' tests, memory-mapped on first request
+word_corpus = WordCorpus(os.environ['SNAKETYPE_CORPUS']) if os.environ.get('SNAKETYPE_CORPUS') else None
+
 TYPING_LESSONS = {
     "home_row": {
         "name": "Home Row",
@@ -179,106 +138,100 @@ ACHIEVEMENTS = {
     "weekend_warrior": {"name": "Weekend Warrior", "desc": "Practice on weekends.", "icon": "🎮"}
 }
 
+def epoch_cutoff(days):
+    """Unix time days ago, for filters on the indexed epoch column"""
+    return int(time.time()) - int(days * 86400)
+
 class DatabaseManager:
-    def __init__(self, db_path=None):
+    def __init__(self, db_path=None, pool_size=4):
         self.db_path = db_path or get_db_path()
+        self.pool_size = pool_size
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._idle = []
+        self._connections = set()
+        self._generation = 0
         self.init_database()
 
     def get_connection(self):
-        """Get database connection with timeout and safety checks"""
-        try:
-            conn = sqlite3.connect(self.db_path, timeout=30.0)
-            conn.execute("PRAGMA foreign_keys = ON")  # Enable foreign key constraints
-            conn.execute("PRAGMA journal_mode = WAL")  # Better concurrency
+        """Get the calling thread's connection, reusing an idle pooled one before opening a new one"""
+        local = self._local
+        conn = getattr(local, 'conn', None)
+        if conn is not None and local.generation == self._generation:
             return conn
-        except sqlite3.Error as e:
-            print(f"Database connection error: {e}")
-            raise
+
+        with self._lock:
+            conn = self._idle.pop() if self._idle else None
+            generation = self._generation
+        if conn is None:
+            try:
+                # Each connection is used by one thread at a time; close() may run on any thread
+                conn = sqlite3.connect(self.db_path, timeout=30.0, check_same_thread=False, cached_statements=256)
+                conn.execute("PRAGMA foreign_keys = ON")  # Enable foreign key constraints
+                conn.execute("PRAGMA journal_mode = WAL")  # Better concurrency
+                conn.execute("PRAGMA synchronous = NORMAL")  # Safe with WAL, avoids an fsync per commit
+            except sqlite3.Error as e:
+                print(f"Database connection error: {e}")
+                raise
+            with self._lock:
+                self._connections.add(conn)
+
+        local.conn = conn
+        local.generation = generation
+        return conn
+
+    def release_connection(self):
+        """Return the calling thread's connection to the idle pool at the end of a request"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            return
+        self._local.conn = None
+        if self._local.generation != self._generation:
+            return
+
+        if conn.in_transaction:
+            conn.rollback()
+        with self._lock:
+            if len(self._idle) < self.pool_size:
+                self._idle.append(conn)
+                return
+            self._connections.discard(conn)
+        conn.close()
+
+    def close(self):
+        """Close every pooled and in-use connection; later calls reconnect on demand"""
+        with self._lock:
+            connections = list(self._connections)
+            self._connections.clear()
+            self._idle.clear()
+            self._generation += 1
+        for conn in connections:
+            try:
+                conn.close()
+            except sqlite3.Error as e:
+                print(f"Error closing database connection: {e}")
 
     def init_database(self):
-        """Initialize database with improved error handling"""
+        """Bring the database up to the shared schema version; a no-op apart from one PRAGMA when current"""
         try:
             os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+            schema.migrate(self.get_connection())
+        except sqlite3.Error as e:
+            print(f"Database initialization error: {e}")
+            raise
 
+    def rebuild_confusion_matrix(self):
+        """Recompute confusion_matrix from every stored error row; returns the number of cells"""
+        try:
             with self.get_connection() as conn:
                 cursor = conn.cursor()
-
-                cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS test_results (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        wpm REAL NOT NULL CHECK(wpm >= 0),
-                        accuracy REAL NOT NULL CHECK(accuracy >= 0 AND accuracy <= 100),
-                        mistakes INTEGER NOT NULL CHECK(mistakes >= 0),
-                        test_duration REAL NOT NULL CHECK(test_duration > 0),
-                        difficulty TEXT NOT NULL,
-                        word_count INTEGER NOT NULL CHECK(word_count > 0),
-                        characters_typed INTEGER NOT NULL CHECK(characters_typed >= 0),
-                        correct_characters INTEGER NOT NULL CHECK(correct_characters >= 0),
-                        raw_wpm REAL DEFAULT 0,
-                        consistency_score REAL DEFAULT 0,
-                        test_mode TEXT DEFAULT 'standard'
-                    )
-                ''')
-
-                cursor.execute('CREATE INDEX IF NOT EXISTS idx_test_results_date ON test_results(date)')
-
-                cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS achievements (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        achievement_id TEXT NOT NULL,
-                        date_earned TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        UNIQUE(achievement_id)
-                    )
-                ''')
-
-                cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS error_patterns (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        test_id INTEGER NOT NULL,
-                        character_intended TEXT NOT NULL,
-                        character_typed TEXT NOT NULL,
-                        position INTEGER NOT NULL CHECK(position >= 0),
-                        word_context TEXT,
-                        finger_mapped TEXT,
-                        bigram_context TEXT,
-                        FOREIGN KEY (test_id) REFERENCES test_results (id) ON DELETE CASCADE
-                    )
-                ''')
-
-                cursor.execute('CREATE INDEX IF NOT EXISTS idx_error_patterns_chars ON error_patterns(character_intended, character_typed)')
-
-                cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS daily_streaks (
-                        date DATE PRIMARY KEY,
-                        tests_completed INTEGER DEFAULT 0 CHECK(tests_completed >= 0)
-                    )
-                ''')
-
-                cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS user_settings (
-                        id INTEGER PRIMARY KEY,
-                        setting_key TEXT UNIQUE NOT NULL,
-                        setting_value TEXT NOT NULL,
-                        last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                    )
-                ''')
-
-                cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS performance_insights (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        test_id INTEGER NOT NULL,
-                        insight_type TEXT NOT NULL,
-                        insight_data TEXT NOT NULL,
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        FOREIGN KEY (test_id) REFERENCES test_results (id) ON DELETE CASCADE
-                    )
-                ''')
-
-                conn.commit()
+                cursor.execute('DELETE FROM confusion_matrix')
+                schema.fill_confusion_matrix(cursor)
+                cursor.execute('SELECT COUNT(*) FROM confusion_matrix')
+                return cursor.fetchone()[0]
         except sqlite3.Error as e:
-            print(f"Database initialization error: {e}")
-            raise
+            print(f"Error rebuilding confusion matrix: {e}")
+            return 0
 
     def save_test_result(self, wpm, accuracy, duration, words_typed, errors, difficulty, chars_typed=0, correct_chars=0, raw_wpm=0, consistency=0, test_mode='standard'):
         """Enhanced test result saving with additional metrics"""
@@ -288,8 +241,8 @@ class DatabaseManager:
                 cursor.execute('''
                     INSERT INTO test_results
                     (wpm, accuracy, mistakes, test_duration, difficulty, word_count, characters_typed,
-                     correct_characters, raw_wpm, consistency_score, test_mode)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                     correct_characters, raw_wpm, consistency_score, test_mode, epoch)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, CAST(strftime('%s', 'now') AS INTEGER))
                 ''', (wpm, accuracy, errors, duration, difficulty, words_typed, chars_typed, correct_chars, raw_wpm, consistency, test_mode))
 
                 test_id = cursor.lastrowid
@@ -299,6 +252,7 @@ class DatabaseManager:
                     INSERT OR REPLACE INTO daily_streaks (date, tests_completed)
                     VALUES (?, COALESCE((SELECT tests_completed FROM daily_streaks WHERE date = ?) + 1, 1))
                 ''', (today, today))
+                schema.advance_streak(cursor, today)
 
                 conn.commit()
                 return test_id
@@ -306,8 +260,8 @@ class DatabaseManager:
             print(f"Error saving test result: {e}")
             return None
 
-    def save_error_patterns(self, test_id, error_patterns):
-        """Save detailed error patterns for analysis"""
+    def save_error_patterns(self, test_id, error_patterns, layout=None):
+        """Save detailed error patterns for analysis, filling in the finger from layout when the client sent none"""
         if not test_id or not error_patterns:
             return
 
@@ -322,7 +276,8 @@ class DatabaseManager:
                             VALUES (?, ?, ?, ?, ?, ?, ?)
                         ''', (test_id, error.get('intended', ''), error.get('typed', ''),
                               error.get('position', 0), error.get('context', ''),
-                              error.get('finger', ''), error.get('bigram', '')))
+                              error.get('finger') or (layout.finger(error.get('intended', '')) if layout else ''),
+                              error.get('bigram', '')))
                     else:
                         if '->' in str(error):
                             intended, typed = str(error).split('->', 1)
@@ -330,7 +285,8 @@ class DatabaseManager:
                                 INSERT INTO error_patterns
                                 (test_id, character_intended, character_typed, position, word_context, finger_mapped, bigram_context)
                                 VALUES (?, ?, ?, ?, ?, ?, ?)
-                            ''', (test_id, intended.strip(), typed.strip(), 0, '', '', ''))
+                            ''', (test_id, intended.strip(), typed.strip(), 0, '',
+                                  layout.finger(intended) if layout else '', ''))
                 conn.commit()
         except sqlite3.Error as e:
             print(f"Error saving error patterns: {e}")
@@ -360,6 +316,38 @@ class DatabaseManager:
             print(f"Error getting achievements: {e}")
             return []
 
+    def unlock_achievements(self, achievement_ids):
+        """Record several newly earned achievements in one transaction"""
+        if not achievement_ids:
+            return
+        try:
+            with self.get_connection() as conn:
+                conn.executemany('INSERT OR IGNORE INTO achievements (achievement_id) VALUES (?)',
+                                 [(achievement_id,) for achievement_id in achievement_ids])
+        except sqlite3.Error as e:
+            print(f"Error unlocking achievements: {e}")
+
+    def get_achievement_counters(self):
+        """Seed values for AchievementEngine: unlocked ids, test count and the last 10 results"""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('SELECT achievement_id FROM achievements')
+                unlocked = [row[0] for row in cursor.fetchall()]
+                cursor.execute('SELECT COUNT(*) FROM test_results')
+                total_tests = cursor.fetchone()[0]
+                cursor.execute('SELECT wpm, accuracy FROM test_results ORDER BY epoch DESC LIMIT 10')
+                recent_results = cursor.fetchall()[::-1]  # Oldest first
+        except sqlite3.Error as e:
+            print(f"Error loading achievement counters: {e}")
+            return {}
+
+        return {
+            'unlocked': unlocked,
+            'total_tests': total_tests,
+            'recent_results': recent_results
+        }
+
     def get_recent_stats(self, limit=10):
         """Get recent statistics with enhanced data"""
         try:
@@ -369,7 +357,7 @@ class DatabaseManager:
                     SELECT wpm, accuracy, test_duration, word_count, mistakes, difficulty, date,
                            consistency_score, test_mode, raw_wpm
                     FROM test_results
-                    ORDER BY date DESC
+                    ORDER BY epoch DESC
                     LIMIT ?
                 ''', (limit,))
                 return cursor.fetchall()
@@ -377,6 +365,21 @@ class DatabaseManager:
             print(f"Error getting recent stats: {e}")
             return []
 
+    def get_result_history(self, days=None):
+        """(wpm, accuracy, epoch) of every test in the last days days (all when None), oldest first"""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    SELECT wpm, accuracy, epoch FROM test_results
+                    WHERE epoch >= ?
+                    ORDER BY epoch
+                ''', (epoch_cutoff(days) if days is not None else 0,))
+                return cursor.fetchall()
+        except sqlite3.Error as e:
+            print(f"Error getting result history: {e}")
+            return []
+
     def get_best_stats(self):
         """Get comprehensive best statistics"""
         try:
@@ -408,48 +411,54 @@ class DatabaseManager:
                     SELECT id, date, wpm, accuracy, mistakes, test_duration, difficulty,
                            word_count, characters_typed, correct_characters, consistency_score
                     FROM test_results
-                    WHERE date >= datetime('now', '-' || ? || ' days')
-                    ORDER BY date DESC
-                ''', (days,))
+                    WHERE epoch >= ?
+                    ORDER BY epoch DESC
+                ''', (epoch_cutoff(days),))
                 return cursor.fetchall()
         except sqlite3.Error as e:
             print(f"Error getting statistics: {e}")
             return []
 
     def get_error_analysis(self, days=30):
-        """Get comprehensive error analysis"""
+        """Top confusions over the last days calendar days, read from confusion_matrix"""
+        since = (datetime.now().date() - timedelta(days=days - 1)).isoformat()
         try:
             with self.get_connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
-                    SELECT character_intended, character_typed, COUNT(*) as frequency,
-                           finger_mapped, bigram_context
-                    FROM error_patterns ep
-                    JOIN test_results tr ON ep.test_id = tr.id
-                    WHERE tr.date >= datetime('now', '-' || ? || ' days')
-                    GROUP BY character_intended, character_typed, finger_mapped
+                    SELECT intended, typed, SUM(count) as frequency,
+                           MAX(finger_mapped), MAX(bigram_context)
+                    FROM confusion_matrix
+                    WHERE day >= ?
+                    GROUP BY intended, typed
                     ORDER BY frequency DESC
                     LIMIT 20
-                ''', (days,))
+                ''', (since,))
                 return cursor.fetchall()
         except sqlite3.Error as e:
             print(f"Error getting error analysis: {e}")
             return []
 
-    def get_streak_count(self):
-        """Get current streak count"""
+    def get_streak_info(self):
+        """Current and longest run of consecutive days with a test, read from the cached streak row"""
         try:
             with self.get_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute('''
-                    SELECT COUNT(*) FROM daily_streaks
-                    WHERE date >= date('now', '-7 days') AND tests_completed > 0
-                ''')
-                result = cursor.fetchone()
-                return result[0] if result else 0
+                return schema.read_streak(conn.cursor())
         except sqlite3.Error as e:
-            print(f"Error getting streak count: {e}")
-            return 0
+            print(f"Error getting streak info: {e}")
+            return {'current': 0, 'longest': 0, 'last_day': None}
+
+    def get_streak_count(self):
+        """Get current streak count"""
+        return self.get_streak_info()['current']
+
+    def iter_export_records(self, batch_size=1000):
+        """Yield every stored result, error, keystroke log, achievement and setting as a flat dict"""
+        return transfer.iter_export_records(self, batch_size)
+
+    def import_records(self, records, batch_size=5000):
+        """Insert exported records in one transaction, skipping results already stored; returns counts or None"""
+        return transfer.import_records(self, records, batch_size)
 
     def get_user_setting(self, key, default=None):
         """Get user setting value"""
@@ -484,13 +493,13 @@ class DatabaseManager:
             with self.get_connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
-                    SELECT DATE(date) as test_date, AVG(wpm) as avg_wpm, AVG(accuracy) as avg_accuracy,
+                    SELECT DATE(epoch, 'unixepoch') as test_date, AVG(wpm) as avg_wpm, AVG(accuracy) as avg_accuracy,
                            COUNT(*) as test_count, AVG(consistency_score) as avg_consistency
                     FROM test_results
-                    WHERE date >= datetime('now', '-' || ? || ' days')
-                    GROUP BY DATE(date)
+                    WHERE epoch >= ?
+                    GROUP BY test_date
                     ORDER BY test_date DESC
-                ''', (days,))
+                ''', (epoch_cutoff(days),))
                 return cursor.fetchall()
         except sqlite3.Error as e:
             print(f"Error getting performance trends: {e}")
@@ -498,6 +507,8 @@ class DatabaseManager:
 
 # Database instance - initialize lazily
 db = None
+achievement_engine = None
+achievement_lock = threading.Lock()
 
 def get_db():
     """Get database instance, initializing if needed"""
@@ -511,6 +522,33 @@ def get_db():
             return MockDatabase()
     return db
 
+def get_achievement_engine(database):
+    """Process-wide achievement counters, seeded from the database on first use"""
+    global achievement_engine
+    if achievement_engine is None:
+        achievement_engine = AchievementEngine(**database.get_achievement_counters())
+    return achievement_engine
+
+def get_keyboard_layout(database):
+    """Built-in layout named by the keyboard_layout setting (JSON-encoded, as exports write it), else QWERTY"""
+    try:
+        name = json.loads(database.get_user_setting('keyboard_layout') or '"qwerty"')
+    except ValueError:
+        name = None
+    # Layout files are only read by the terminal game; the server never opens paths from settings
+    return get_layout(name if isinstance(name, str) and name in LAYOUTS else 'qwerty')
+
+@app.teardown_appcontext
+def release_db_connection(exception=None):
+    """Hand this request's connection back to the pool"""
+    if db is not None:
+        db.release_connection()
+
+@atexit.register
+def close_db():
+    if db is not None:
+        db.close()
+
 class MockDatabase:
     """Mock database for error cases"""
     def get_best_stats(self):
@@ -519,25 +557,42 @@ class MockDatabase:
         return []
     def get_achievements(self):
         return []
+    def get_streak_info(self):
+        return {'current': 0, 'longest': 0, 'last_day': None}
     def get_streak_count(self):
         return 0
     def save_test_result(self, *args, **kwargs):
         return None
     def get_statistics(self, days=30):
         return []
+    def get_result_history(self, days=None):
+        return []
     def get_error_analysis(self, days=30):
         return []
     def get_performance_trends(self, days=30):
         return []
     def unlock_achievement(self, achievement_id):
         return False
-    def save_error_patterns(self, test_id, patterns):
+    def unlock_achievements(self, achievement_ids):
+        return None
+    def get_achievement_counters(self):
+        return {}
+    def save_error_patterns(self, test_id, patterns, layout=None):
         return None
     def get_user_setting(self, key, default=None):
         return default
+    def iter_export_records(self, batch_size=1000):
+        return []
+    def import_records(self, records, batch_size=5000):
+        return None
     def set_user_setting(self, key, value):
         return None
 
+@app.cli.command('rebuild-confusion-matrix')
+def rebuild_confusion_matrix_command():
+    """Recompute the confusion matrix from all stored error patterns"""
+    print(f"Confusion matrix rebuilt ({DatabaseManager().rebuild_confusion_matrix()} entries)")
+
 # Health check endpoint
 @app.route('/health')
 def health_check():
@@ -660,7 +715,7 @@ def get_words():
         return jsonify({'words': words, 'lesson_name': lesson['name']})
 
     if difficulty == 'adaptive':
-        recent_stats = db.get_recent_stats(5)
+        recent_stats = get_db().get_recent_stats(5)
         if recent_stats:
             avg_wpm = sum(stat[0] for stat in recent_stats) / len(recent_stats)
             avg_acc = sum(stat[1] for stat in recent_stats) / len(recent_stats)
@@ -672,6 +727,12 @@ def get_words():
             else:
                 difficulty = 'easy'
 
+    if difficulty == 'common' and word_corpus:
+        try:
+            return jsonify({'words': word_corpus.sample(count)})
+        except (OSError, ValueError) as e:
+            print(f"Error loading word corpus: {e}")
+
     if difficulty == 'easy':
         available_words = EASY_WORDS.copy()
     elif difficulty == 'hard':
@@ -711,56 +772,21 @@ def save_result():
     error_patterns = data.get('error_patterns', [])
 
     database = get_db()
+    with achievement_lock:
+        engine = get_achievement_engine(database)  # Seeded before this test is stored
     test_id = database.save_test_result(wpm, accuracy, duration, words_typed, errors,
                                 difficulty, chars_typed, correct_chars, raw_wpm,
                                 consistency, test_mode)
 
     if test_id and error_patterns:
-        database.save_error_patterns(test_id, error_patterns)
+        database.save_error_patterns(test_id, error_patterns, get_keyboard_layout(database))
 
     achievements_unlocked = []
-    stats = database.get_statistics(days=30)
-
-    if wpm >= 80 and database.unlock_achievement('speed_demon'):
-        achievements_unlocked.append('speed_demon')
-    if wpm >= 100 and database.unlock_achievement('speed_machine'):
-        achievements_unlocked.append('speed_machine')
-
-    if accuracy >= 98 and database.unlock_achievement('accuracy_master'):
-        achievements_unlocked.append('accuracy_master')
-    if accuracy == 100 and database.unlock_achievement('perfectionist'):
-        achievements_unlocked.append('perfectionist')
-
-    if duration >= 300 and database.unlock_achievement('marathon'):  # 5 minutes
-        achievements_unlocked.append('marathon')
-
-    if len(stats) >= 10 and database.unlock_achievement('persistent'):
-        achievements_unlocked.append('persistent')
-
-    from datetime import datetime
-    current_hour = datetime.now().hour
-    if current_hour < 8 and database.unlock_achievement('early_bird'):
-        achievements_unlocked.append('early_bird')
-    if current_hour >= 22 and database.unlock_achievement('night_owl'):
-        achievements_unlocked.append('night_owl')
-
-    if datetime.now().weekday() >= 5 and database.unlock_achievement('weekend_warrior'):
-        achievements_unlocked.append('weekend_warrior')
-
-    streak = database.get_streak_count()
-    if streak >= 7 and database.unlock_achievement('streak_master'):
-        achievements_unlocked.append('streak_master')
-
-    if len(stats) >= 5:
-        recent_accuracy = [stat[3] for stat in stats[:5]]
-        if all(acc > 90 for acc in recent_accuracy) and database.unlock_achievement('consistent'):
-            achievements_unlocked.append('consistent')
-
-    if len(stats) >= 10:
-        recent_wpm = [stat[2] for stat in stats[:5]]
-        older_wpm = [stat[2] for stat in stats[5:10]]
-        if sum(recent_wpm)/5 - sum(older_wpm)/5 >= 20 and database.unlock_achievement('improver'):
-            achievements_unlocked.append('improver')
+    if test_id:
+        streak = database.get_streak_count()  # Read after the save commits, so every worker sees the same streak
+        with achievement_lock:
+            achievements_unlocked = engine.record(wpm, accuracy, duration) + engine.check_streak(streak)
+        database.unlock_achievements(achievements_unlocked)
 
     return jsonify({
         'success': True,
@@ -798,23 +824,53 @@ def get_lessons():
 
 @app.route('/api/export_data')
 def export_data():
-    """Export user data as JSON"""
-    stats = db.get_statistics(days=365)  # Get full year of data
-    achievements = db.get_achievements()
-    error_analysis = db.get_error_analysis(days=365)
-
-    export_data = {
-        'stats': stats,
-        'achievements': achievements,
-        'error_analysis': error_analysis,
-        'export_date': datetime.now().isoformat()
-    }
+    """Stream every result, error pattern, keystroke log, achievement and setting as NDJSON or CSV"""
+    export_format = 'csv' if request.args.get('format') == 'csv' else 'ndjson'
+    database = get_db()
+    records = chain(
+        [{'type': 'export', 'export_date': datetime.now().isoformat()}],
+        database.iter_export_records()
+    )
+
+    # Encode the first chunk before any bytes are sent, so an unreadable database is a 500, not an
+    # empty download; a later read error aborts the stream and the client sees a failed transfer
+    chunks = transfer.iter_export_chunks(records, export_format)
+    try:
+        first_chunk = next(chunks)
+    except sqlite3.Error as e:
+        print(f"Error exporting data: {e}")
+        return jsonify({'error': 'Failed to export data'}), 500
+
+    filename = f"snaketype-data-{datetime.now().strftime('%Y-%m-%d')}.{export_format}"
+    return Response(
+        stream_with_context(chain([first_chunk], chunks)),
+        mimetype='text/csv' if export_format == 'csv' else 'application/x-ndjson',
+        headers={'Content-Disposition': f'attachment; filename={filename}'}
+    )
+
+@app.route('/api/import_data', methods=['POST'])
+def import_data():
+    """Import an NDJSON or CSV export, skipping tests that are already stored"""
+    if 'file' not in request.files:
+        return jsonify({'error': 'No file uploaded'}), 400
 
-    return jsonify(export_data)
+    file = request.files['file']
+    if file.filename == '':
+        return jsonify({'error': 'No file selected'}), 400
+
+    stream = io.TextIOWrapper(file.stream, encoding='utf-8', newline='')
+    counts = get_db().import_records(transfer.iter_import_records(stream))
+    if counts is None:
+        return jsonify({'error': 'Failed to import statistics'}), 400
+
+    global achievement_engine
+    with achievement_lock:
+        achievement_engine = None  # Reseed from the imported history
+    return jsonify({'success': True, **counts, 'settings': len(counts['settings'])})
 
 @app.route('/api/upload_text', methods=['POST'])
 def upload_text():
-    """Handle custom text upload"""
+    """Handle custom text upload, one segment at a time from a byte offset"""
     if 'file' not in request.files:
         return jsonify({'error': 'No file uploaded'}), 400
 
@@ -823,25 +879,26 @@ def upload_text():
         return jsonify({'error': 'No file selected'}), 400
 
     try:
-        content = file.read().decode('utf-8')
-        words = []
-        current_word = ""
-        for char in content.lower():
-            if char.isalnum():
-                current_word += char
-            else:
-                if current_word:
-                    words.append(current_word)
-                    current_word = ""
-        if current_word:
-            words.append(current_word)
+        start_offset = max(0, request.form.get('offset', 0, type=int))
+        segment_words = max(10, min(1000, request.form.get('segment_words', 200, type=int)))
 
-        words = words[:200]
+        words = []
+        next_offset = start_offset
+        eof = True
+        for word, offset in iter_text_words(file.stream, start_offset):
+            if len(words) >= segment_words:
+                eof = False  # Peeked one word past the segment
+                break
+            words.append(word)
+            next_offset = offset
 
         return jsonify({
             'success': True,
             'words': words,
-            'word_count': len(words)
+            'word_count': len(words),
+            'start_offset': start_offset,
+            'next_offset': next_offset,
+            'eof': eof
         })
 
     except Exception as e:
@@ -851,18 +908,15 @@ def upload_text():
 def get_performance_insights():
     """Get advanced performance insights"""
     database = get_db()
-    stats = database.get_statistics(days=30)
-    if not stats:
+    summary = analytics.summarize(analytics.ResultSeries.from_rows(database.get_result_history(days=30)))
+    if not summary:
         return jsonify({'insights': [], 'recommendations': []})
 
     insights = []
     recommendations = []
 
-    wpm_scores = [stat[2] for stat in stats]
-    accuracy_scores = [stat[3] for stat in stats]
-
-    avg_wpm = sum(wpm_scores) / len(wpm_scores)
-    avg_accuracy = sum(accuracy_scores) / len(accuracy_scores)
+    avg_wpm = summary['wpm']['mean']
+    avg_accuracy = summary['accuracy']['mean']
 
     if avg_wpm < 40:
         insights.append({
@@ -887,20 +941,17 @@ def get_performance_insights():
         })
         recommendations.append('Focus on accuracy over speed')
 
-    if len(stats) >= 10:
-        recent_wpm = sum(wpm_scores[:5]) / 5
-        older_wpm = sum(wpm_scores[5:10]) / 5
-
-        if recent_wpm > older_wpm + 2:
-            insights.append({
-                'type': 'trend',
-                'message': 'Great improvement! Your speed is increasing',
-                'icon': '🚀'
-            })
+    if summary['wpm_recent_delta'] is not None and summary['wpm_recent_delta'] > 2:
+        insights.append({
+            'type': 'trend',
+            'message': 'Great improvement! Your speed is increasing',
+            'icon': '🚀'
+        })
 
     return jsonify({
         'insights': insights,
-        'recommendations': recommendations
+        'recommendations': recommendations,
+        'summary': summary
     })
 
 @socketio.on('connect')
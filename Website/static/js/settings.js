@@ -45,6 +45,13 @@ function initializeSettingsControls() {
         }
     });
     
+    document.getElementById('import-data-file').addEventListener('change', function(event) {
+        if (event.target.files[0]) {
+            importData(event.target.files[0]);
+            event.target.value = '';
+        }
+    });
+    
     document.getElementById('theme-select').addEventListener('change', function() {
         previewTheme(this.value);
     });
@@ -138,6 +145,9 @@ function previewTheme(theme) {
 function handleCustomTextUpload(file) {
     const formData = new FormData();
     formData.append('file', file);
+    if (sessionStorage.getItem('customTextName') === file.name) {
+        formData.append('offset', sessionStorage.getItem('customTextOffset') || 0);
+    }
     
     fetch('/api/upload_text', {
         method: 'POST',
@@ -148,6 +158,8 @@ function handleCustomTextUpload(file) {
         if (data.success) {
             showSaveStatus(`Uploaded ${data.word_count} words successfully!`, 'success');
             sessionStorage.setItem('customText', JSON.stringify(data.words));
+            sessionStorage.setItem('customTextName', file.name);
+            sessionStorage.setItem('customTextOffset', data.eof ? 0 : data.next_offset);
         } else {
             showSaveStatus(`Upload failed: ${data.error}`, 'error');
         }
@@ -159,27 +171,37 @@ function handleCustomTextUpload(file) {
 }
 
 function exportData() {
-    fetch('/api/export_data')
-        .then(response => response.json())
-        .then(data => {
-            const blob = new Blob([JSON.stringify(data, null, 2)], {
-                type: 'application/json'
-            });
-            const url = URL.createObjectURL(blob);
-            const a = document.createElement('a');
-            a.href = url;
-            a.download = `snaketype-data-${new Date().toISOString().split('T')[0]}.json`;
-            document.body.appendChild(a);
-            a.click();
-            document.body.removeChild(a);
-            URL.revokeObjectURL(url);
-            
-            showSaveStatus('Data exported successfully!', 'success');
-        })
-        .catch(error => {
-            console.error('Error exporting data:', error);
-            showSaveStatus('Export failed', 'error');
-        });
+    // The server streams the export as an attachment; let the browser download it directly
+    const a = document.createElement('a');
+    a.href = '/api/export_data?format=ndjson';
+    a.download = `snaketype-data-${new Date().toISOString().split('T')[0]}.ndjson`;
+    document.body.appendChild(a);
+    a.click();
+    document.body.removeChild(a);
+    
+    showSaveStatus('Export started', 'success');
+}
+
+function importData(file) {
+    const formData = new FormData();
+    formData.append('file', file);
+    
+    fetch('/api/import_data', {
+        method: 'POST',
+        body: formData
+    })
+    .then(response => response.json())
+    .then(data => {
+        if (data.success) {
+            showSaveStatus(`Imported ${data.results} tests (${data.duplicates} already present)`, 'success');
+        } else {
+            showSaveStatus(data.error || 'Import failed', 'error');
+        }
+    })
+    .catch(error => {
+        console.error('Error importing data:', error);
+        showSaveStatus('Import failed', 'error');
+    });
 }
 
 function confirmReset() {